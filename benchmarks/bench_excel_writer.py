@@ -0,0 +1,140 @@
+"""
+Benchmark for the results workbook writer.
+
+Compares the streaming write-only ResultsWorkbook against the previous path
+(four DataFrames -> pd.ExcelWriter(openpyxl) -> BytesIO -> getvalue()) on a
+synthetic week, reporting wall time and peak traced memory, and checks that
+both produce the same sheets and cell values.
+
+    python -m benchmarks.bench_excel_writer --articles 2000
+"""
+import argparse
+import io
+import random
+import time
+import tracemalloc
+import pandas as pd
+from src.results import (
+    ResultsWorkbook, build_detailed_row, detailed_columns, _nonempty_text,
+    SIMPLE_COLS, ALL_ARTICLES_COLS,
+)
+
+FILLER = (
+    "The company said the plant would produce green steel using hydrogen direct reduced iron "
+    "and an electric arc furnace, with capacity of 2.5 million tonnes per year. "
+)
+
+
+def make_articles(n, text_chars, seed=3):
+    rng = random.Random(seed)
+    relevant, irrelevant = [], []
+    for i in range(n):
+        if rng.random() < 0.4:
+            irrelevant.append({"title": f"Irrelevant headline {i}", "url": f"https://news.example/{i}"})
+            continue
+        stage2 = rng.random() < 0.5
+        text = (FILLER * (text_chars // len(FILLER) + 1))[:text_chars]
+        relevant.append({
+            "title": f"Headline {i}",
+            "url": f"https://news.example/{i}",
+            "full_text": text,
+            "discard_reason": None if stage2 else "No project details",
+            "project_name": f"Project {i}" if stage2 else "",
+            "company": "Steel Co" if stage2 else "",
+            "scale": "full scale",
+            "timeline": "2027",
+            "technology": "H-DRI + EAF",
+            "cc_quote": "green steel using hydrogen",
+            "steel_capacity": "2.5 million tonnes per year",
+            "steel_quote": "capacity of 2.5 million tonnes per year",
+        })
+    return relevant, irrelevant
+
+
+def legacy_workbook_bytes(relevant_articles, irrelevant_articles, domain):
+    """The pre-streaming implementation: materialize every sheet as a DataFrame first."""
+    relevant_articles = pd.DataFrame(relevant_articles).to_dict("records")
+    irrelevant_articles = list(irrelevant_articles)
+    stage1, stage2 = [], []
+    for art in relevant_articles:
+        if _nonempty_text(art.get("company")) and _nonempty_text(art.get("project_name")):
+            stage2.append(art)
+        else:
+            stage1.append(art)
+    df_stage1 = pd.DataFrame(stage1, columns=SIMPLE_COLS)
+    df_irrelevant = pd.DataFrame(irrelevant_articles, columns=SIMPLE_COLS)
+    df_stage2 = pd.DataFrame([build_detailed_row(a, domain) for a in stage2], columns=detailed_columns(domain))
+    all_art = []
+    for art in stage1:
+        discarded = "Discarded before Stage 2"
+        if art.get("discard_reason"):
+            discarded += f" ({art['discard_reason']})"
+        all_art.append({"title": art.get("title", ""), "url": art.get("url", ""), "Discarded": discarded})
+    for art in stage2:
+        all_art.append({"title": art.get("title", ""), "url": art.get("url", ""), "Discarded": ""})
+    for art in irrelevant_articles:
+        all_art.append({"title": art.get("title", ""), "url": art.get("url", ""), "Discarded": "Discarded before Stage 1"})
+    df_all = pd.DataFrame(all_art, columns=ALL_ARTICLES_COLS)
+
+    buf = io.BytesIO()
+    with pd.ExcelWriter(buf, engine="openpyxl") as writer:
+        df_stage1.to_excel(writer, sheet_name="Relevant Stage 1", index=False)
+        df_stage2.to_excel(writer, sheet_name="Relevant Stage 2", index=False)
+        df_irrelevant.to_excel(writer, sheet_name="Irrelevant", index=False)
+        df_all.to_excel(writer, sheet_name="All Articles", index=False)
+    buf.seek(0)
+    return buf.getvalue()
+
+
+def streaming_workbook_bytes(relevant_articles, irrelevant_articles, domain):
+    workbook = ResultsWorkbook(domain)
+    for art in irrelevant_articles:
+        workbook.add_irrelevant(art)
+    for art in relevant_articles:
+        workbook.add_relevant(art)
+    with workbook.save() as f:
+        return f.read()
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    out = fn(*args)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return out, elapsed, peak
+
+
+def same_sheets(a: bytes, b: bytes) -> bool:
+    sa = pd.read_excel(io.BytesIO(a), sheet_name=None, dtype=str)
+    sb = pd.read_excel(io.BytesIO(b), sheet_name=None, dtype=str)
+    if list(sa) != list(sb):
+        return False
+    return all(sa[name].fillna("").equals(sb[name].fillna("")) for name in sa)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--articles", type=int, default=2000)
+    ap.add_argument("--text-chars", type=int, default=20_000)
+    ap.add_argument("--domain", default="steel")
+    args = ap.parse_args()
+
+    relevant, irrelevant = make_articles(args.articles, args.text_chars)
+    # the legacy path already had every article (and its full text) in memory; so does this benchmark
+    legacy, t_legacy, peak_legacy = measure(legacy_workbook_bytes, relevant, irrelevant, args.domain)
+    stream, t_stream, peak_stream = measure(streaming_workbook_bytes, relevant, irrelevant, args.domain)
+
+    mb = 1024 * 1024
+    print(f"{args.articles} articles ({len(relevant)} relevant), {args.text_chars} chars of text each")
+    print(f"  DataFrame + ExcelWriter : {t_legacy:7.2f}s  peak {peak_legacy / mb:8.1f} MiB")
+    print(f"  streaming write-only    : {t_stream:7.2f}s  peak {peak_stream / mb:8.1f} MiB")
+    ok = same_sheets(legacy, stream)
+    print(f"  identical sheets        : {ok}")
+    if not ok:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
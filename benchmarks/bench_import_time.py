@@ -0,0 +1,81 @@
+"""
+Import-time benchmark and cold-start guard.
+
+Runs `python -X importtime -c "import <module>"` in fresh interpreters, reports the
+total and the slowest modules by cumulative import time, and fails if any module in
+--forbid was imported (the extraction stack is meant to load lazily) or, with --max-ms,
+if the best total exceeds the budget.
+
+    python -m benchmarks.bench_import_time --module main --module scheduler --max-ms 4000
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Heavy dependencies that only specific code paths (PDFs, browser escalation, HTML extraction) need
+DEFAULT_FORBIDDEN = ["playwright", "camelot", "cv2", "fitz", "newspaper", "trafilatura", "bs4"]
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def measure(module):
+    """
+    Returns ({module name: cumulative us}, top-level total us, {module name: nesting depth})
+    for one cold import of `module`.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    cumulative, depth, total = {}, {}, 0
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if not m:
+            continue
+        cum, indent, name = int(m.group(2)), len(m.group(3)), m.group(4)
+        cumulative[name] = max(cumulative.get(name, 0), cum)
+        depth[name] = min(depth.get(name, indent), indent) // 2
+        if indent == 1:
+            total += cum
+    return cumulative, total, depth
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--module", action="append", help="module to import (repeatable; default: main)")
+    ap.add_argument("--runs", type=int, default=3, help="cold imports per module; the fastest is reported")
+    ap.add_argument("--top", type=int, default=15)
+    ap.add_argument("--max-ms", type=float, default=None, help="fail if the fastest total exceeds this")
+    ap.add_argument("--forbid", default=",".join(DEFAULT_FORBIDDEN),
+                    help="comma-separated top-level packages that must not be imported")
+    args = ap.parse_args()
+
+    forbidden = [f for f in args.forbid.split(",") if f]
+    failed = False
+    for module in args.module or ["main"]:
+        runs = [measure(module) for _ in range(max(1, args.runs))]
+        cumulative, total, depth = min(runs, key=lambda r: r[1])
+        print(f"import {module}: {total / 1000:.0f} ms (best of {len(runs)})")
+        # direct imports and their children; deeper entries just repeat their parents' cost
+        shallow = [(n, us) for n, us in cumulative.items() if depth[n] <= 1]
+        for name, us in sorted(shallow, key=lambda kv: -kv[1])[:args.top]:
+            print(f"  {us / 1000:8.1f} ms  {'  ' * depth[name]}{name}")
+
+        loaded = sorted({f for f in forbidden for name in cumulative if name == f or name.startswith(f + ".")})
+        if loaded:
+            print(f"  FAIL: eagerly imported {', '.join(loaded)}")
+            failed = True
+        if args.max_ms is not None and total / 1000 > args.max_ms:
+            print(f"  FAIL: {total / 1000:.0f} ms exceeds the {args.max_ms:.0f} ms budget")
+            failed = True
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
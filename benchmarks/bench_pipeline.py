@@ -0,0 +1,163 @@
+"""
+End-to-end offline benchmark of run_pipeline.
+
+Serves the recorded Inoreader items and article fixtures (benchmarks/mock_inoreader.py),
+an OpenAI-compatible stub with configurable latency (benchmarks/mock_openai.py) and the
+Graph upload endpoints (benchmarks/mock_graph.py) on localhost, points the pipeline at
+them through its environment variables and runs all folders without any network access.
+Playwright resolution is disabled; pipeline state goes to a throwaway directory unless
+--state-dir is given (to run against the screening history of an earlier run).
+
+Reports throughput (articles/min), per-stage latency percentiles from the run metrics
+and peak RSS, and checks that one workbook per folder was uploaded.
+
+    python -m benchmarks.bench_pipeline --copies 10 --gpt-latency-ms 400 --gpt-jitter-ms 300
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.mock_graph import MockGraphServer
+from benchmarks.mock_inoreader import MockInoreaderServer
+from benchmarks.mock_openai import MockOpenAIServer
+
+
+def peak_rss_bytes():
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def configure_env(state_dir, ino, gpt, graph, folder_workers=None, gpt_rpm=None, screen=None):
+    """Points the pipeline at the mocks; must run before any src module is imported."""
+    os.environ.update({
+        "PIPELINE_STATE_DIR": state_dir,
+        "INOREADER_API_URL": ino.api_url,
+        "INOREADER_LOGIN_URL": ino.login_url,
+        "USERNAME": "bench@example.com",
+        "PASSWORD": "bench",
+        "OPENAI_APIKEY": "sk-bench",
+        "OPENAI_BASE_URL": gpt.base_url,
+        "GRAPH_BASE_URL": graph.base_url + "/v1.0",
+        "GRAPH_LOGIN_URL": graph.base_url,
+        "OD_TENANT_ID": "tenant",
+        "OD_CLIENT_ID": "client",
+        "OD_CLIENT_VALUE": "secret",
+        "OD_DRIVE_ID": "drive",
+        "OD_PARENT_ITEM": "parent",
+        "RESOLVE_WITH_PLAYWRIGHT": "0",
+    })
+    os.environ.pop("TOKEN_CACHE_KEY", None)
+    if folder_workers:
+        os.environ["FOLDER_WORKERS"] = str(folder_workers)
+    if gpt_rpm:
+        os.environ["GPT_MAX_RPM"] = str(gpt_rpm)
+    if screen:
+        os.environ["HEADLINE_SCREEN"] = screen
+
+
+def run(copies=5, gpt_latency_s=0.3, gpt_jitter_s=0.2, article_latency_s=0.05, folder_workers=None, gpt_rpm=None,
+        screen=None, state_dir=None, gpt_error_rate=0.0):
+    """Runs the pipeline once against fresh mocks; returns the benchmark report dict."""
+    state_dir = state_dir or tempfile.mkdtemp(prefix="bench_pipeline_")
+    with MockInoreaderServer(copies=copies, article_latency_s=article_latency_s) as ino, \
+            MockOpenAIServer(latency_s=gpt_latency_s, jitter_s=gpt_jitter_s, error_rate=gpt_error_rate) as gpt, \
+            MockGraphServer() as graph:
+        configure_env(state_dir, ino, gpt, graph, folder_workers, gpt_rpm, screen)
+        import main
+        from src.metrics import metrics
+
+        t0 = time.perf_counter()
+        error = None
+        try:
+            main.run_pipeline()
+        except Exception as e:
+            error = str(e)
+        wall = time.perf_counter() - t0
+
+        articles = ino.article_count()
+        summary = metrics.run_summary()
+        return {
+            "articles": articles,
+            "wall_s": round(wall, 2),
+            "articles_per_min": round(articles / wall * 60, 1) if wall else None,
+            "peak_rss_mb": round((peak_rss_bytes() or 0) / 2 ** 20, 1),
+            "gpt_requests": gpt.requests,
+            "gpt_prompt_tokens": gpt.prompt_tokens,
+            "gpt_model_requests": dict(gpt.model_requests),
+            "embedding_inputs": gpt.embedding_inputs,
+            "article_requests": ino.article_requests,
+            "uploaded": sorted(graph.files),
+            "error": error,
+            "stages": summary["stages"],
+        }
+
+
+def print_report(report):
+    print(f"{report['articles']} articles in {report['wall_s']:.1f}s "
+          f"-> {report['articles_per_min']} articles/min, peak RSS {report['peak_rss_mb']} MB")
+    print(f"GPT requests: {report['gpt_requests']} ({report['gpt_prompt_tokens']} prompt tokens), "
+          f"embedded texts: {report['embedding_inputs']}, article GETs: {report['article_requests']}, "
+          f"workbooks uploaded: {len(report['uploaded'])}")
+    print("GPT requests by model: " + ", ".join(f"{m}={n}" for m, n in sorted(report["gpt_model_requests"].items())))
+    for stage, s in report["stages"].items():
+        if stage.endswith("_small"):
+            print(f"cascade {stage[:-len('_small')]}: answered={s.get('answered', 0)} escalated={s.get('escalated', 0)}")
+    policy = {k: sum(s.get(k, 0) for stage, s in report["stages"].items() if stage.startswith("gpt"))
+              for k in ("retries", "retries_exhausted", "hedged", "hedge_wins")}
+    policy["breaker_opened"] = report["stages"].get("gpt_breaker", {}).get("opened", 0)
+    print("GPT call policy: " + ", ".join(f"{k}={v}" for k, v in policy.items()))
+    screen = report["stages"].get("headline_screen")
+    if screen:
+        print("headline screen: " + ", ".join(f"{k}={screen.get(k, 0)}" for k in
+                                              ("confident", "borderline", "local", "agree", "disagree")))
+    print(f"{'stage':<24}{'n':>6}{'total s':>10}{'p50 s':>9}{'p95 s':>9}{'max s':>9}")
+    for stage, s in report["stages"].items():
+        print(f"{stage:<24}{s['count']:>6}{s['total_s']:>10.2f}{s['p50_s']:>9.3f}{s['p95_s']:>9.3f}{s['max_s']:>9.3f}")
+    if report["error"]:
+        print(f"pipeline error: {report['error']}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--copies", type=int, default=5, help="repeat each recorded feed item this many times")
+    ap.add_argument("--gpt-latency-ms", type=float, default=300)
+    ap.add_argument("--gpt-jitter-ms", type=float, default=200)
+    ap.add_argument("--article-latency-ms", type=float, default=50)
+    ap.add_argument("--folder-workers", type=int, default=None)
+    ap.add_argument("--gpt-error-rate", type=float, default=0.0, help="fraction of GPT requests the mock fails with a 500")
+    ap.add_argument("--gpt-rpm", type=int, default=None, help="override GPT_MAX_RPM (the pipeline's default applies otherwise)")
+    ap.add_argument("--screen", choices=["off", "shadow", "on"], default=None,
+                    help="HEADLINE_SCREEN mode for the embedding pre-screen (the pipeline's default applies otherwise)")
+    ap.add_argument("--state-dir", help="reuse pipeline state (e.g. the screening history) from an earlier run")
+    ap.add_argument("--json", metavar="PATH", help="also write the report as JSON")
+    args = ap.parse_args()
+
+    report = run(
+        copies=args.copies,
+        gpt_latency_s=args.gpt_latency_ms / 1000,
+        gpt_jitter_s=args.gpt_jitter_ms / 1000,
+        article_latency_s=args.article_latency_ms / 1000,
+        folder_workers=args.folder_workers,
+        gpt_rpm=args.gpt_rpm,
+        screen=args.screen,
+        state_dir=args.state_dir,
+        gpt_error_rate=args.gpt_error_rate,
+    )
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if report["error"] or len(report["uploaded"]) != 3:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
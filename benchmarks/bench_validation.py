@@ -0,0 +1,91 @@
+"""
+Benchmark for src.validation.get_check_results_flag on long, PDF-sized article texts.
+
+Compares the batched engine against the previous per-field implementation and checks
+that both produce the same flag and scores.
+
+    python -m benchmarks.bench_validation --chars 400000 --articles 20
+"""
+import argparse
+import random
+import time
+from rapidfuzz import fuzz
+from src.validation import STEEL_IRON_TECH, CEMENT_TECH, get_check_results_flag
+
+WORDS = (
+    "the plant will produce green steel using hydrogen direct reduced iron and an electric arc furnace "
+    "capacity million tonnes per year investment billion euros commissioning construction partners "
+    "TABLES: 2025\t2026\t2027 output\t1.2\t2.5 capture CO2 storage cement clinker calcined clay kiln"
+).split()
+
+
+def legacy_get_check_results_flag(extracted_details, article_text):
+    """The per-field implementation this benchmark measures against."""
+    threshold = 80
+    scores = {}
+    flagged_columns = []
+    for key, value in extracted_details.items():
+        if value.strip():
+            detail_to_check = value
+            if key.lower() == "technology":
+                for tech in STEEL_IRON_TECH + CEMENT_TECH:
+                    abbr = tech.split(" (")[0].strip()
+                    if abbr.lower() == value.strip().lower():
+                        detail_to_check = tech
+                        break
+            score = fuzz.partial_ratio(detail_to_check.strip().lower(), article_text.lower())
+            scores[key] = score
+            if score < threshold:
+                flagged_columns.append(key)
+    if flagged_columns:
+        return "CHECK RESULTS: " + ", ".join(flagged_columns), scores
+    return "", scores
+
+
+def make_article(rng, n_chars):
+    parts, size = [], 0
+    while size < n_chars:
+        w = rng.choice(WORDS)
+        parts.append(w)
+        size += len(w) + 1
+    return " ".join(parts).upper() if rng.random() < 0.2 else " ".join(parts)
+
+
+def make_details(rng):
+    return {
+        "project_name": rng.choice(["HYBRIT", "Stegra Boden plant", "green steel plant", "Project Nova"]),
+        "scale": rng.choice(["pilot", "demonstration", "full scale", ""]),
+        "timeline": rng.choice(["2026", "2030", ""]),
+        "technology": rng.choice(["H-DRI + EAF", "CCS", "Meca clay", "Electrowinning", "something else"]),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chars", type=int, default=400_000, help="characters per article")
+    ap.add_argument("--articles", type=int, default=20)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    cases = [(make_details(rng), make_article(rng, args.chars)) for _ in range(args.articles)]
+
+    t0 = time.perf_counter()
+    legacy = [legacy_get_check_results_flag(d, t) for d, t in cases]
+    t_legacy = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    batched = [get_check_results_flag(d, t) for d, t in cases]
+    t_batched = time.perf_counter() - t0
+
+    mismatches = sum(1 for a, b in zip(legacy, batched) if a != b)
+    print(f"{args.articles} articles x {args.chars} chars")
+    print(f"  per-field : {t_legacy:8.3f}s")
+    print(f"  batched   : {t_batched:8.3f}s  ({t_legacy / max(t_batched, 1e-9):.1f}x)")
+    print(f"  mismatches: {mismatches}")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
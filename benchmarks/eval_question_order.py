@@ -0,0 +1,78 @@
+"""
+Report on the learned order of the headline exclusion questions (src/question_order.py).
+
+For each folder, compares the expected GPT calls per headline when the questions are
+asked in source order against the learned order, both estimated from the persisted
+hit rates in .pipeline_state/question_stats.json, and lists the questions with the
+highest hit rates. With --runs, it also prints the observed calls per headline of
+every run that has a metrics file (.pipeline_state/runs/*.metrics.json), so that runs
+before and after the reordering can be compared.
+
+    python -m benchmarks.eval_question_order --runs
+"""
+import argparse
+import glob
+import json
+import os
+
+from src import question_order
+from src.questions import CEMENT_NO, IRON_NO, STEEL_NO
+from src.checkpoint import RUNS_DIR
+
+FOLDER_QUESTIONS = {"LeadIT-Cement": CEMENT_NO, "LeadIT-Iron": IRON_NO, "LeadIT-Steel": STEEL_NO}
+
+
+def folder_report(folder, questions):
+    rates = question_order.hit_rates(folder, questions)
+    learned = sorted(rates, reverse=True)
+    stats = question_order._load().get(folder, {})
+    return {
+        "folder": folder,
+        "answers": sum(e.get("asked", 0) for e in stats.values()),
+        "source_calls": question_order.expected_calls(rates),
+        "learned_calls": question_order.expected_calls(learned),
+        "top": sorted(zip(rates, questions), reverse=True)[:5],
+    }
+
+
+def observed_runs(runs_dir=RUNS_DIR):
+    """[(metrics file name, {folder: (calls, headlines)})] for runs that screened headlines with GPT."""
+    out = []
+    for path in sorted(glob.glob(os.path.join(runs_dir, "*.metrics.json"))):
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        per_folder = {}
+        for folder, stages in (data.get("folders") or {}).items():
+            s = stages.get("gpt_relevance") or {}
+            if s.get("headlines"):
+                per_folder[folder] = (s.get("questions", s["count"]), s["headlines"])
+        if per_folder:
+            out.append((os.path.basename(path), per_folder))
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", action="store_true", help="also list observed calls per headline per run")
+    args = ap.parse_args()
+
+    print(f"{'folder':<16}{'answers':>9}{'source order':>14}{'learned order':>15}{'saving':>9}")
+    for folder, questions in FOLDER_QUESTIONS.items():
+        r = folder_report(folder, questions)
+        saving = 1 - r["learned_calls"] / r["source_calls"] if r["source_calls"] else 0.0
+        print(f"{folder:<16}{r['answers']:>9}{r['source_calls']:>14.2f}{r['learned_calls']:>15.2f}{saving:>9.1%}")
+        for rate, question in r["top"]:
+            print(f"    {rate:6.1%}  {question[:90]}")
+
+    if args.runs:
+        print("\nobserved questions per headline")
+        for name, per_folder in observed_runs():
+            cells = ", ".join(f"{f} {c / h:.2f} ({h})" for f, (c, h) in sorted(per_folder.items()))
+            print(f"  {name:<40} {cells}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Offline agreement report for the embedding headline screen (src/screening.py).
+
+Replays the GPT-screened headlines stored in .pipeline_state/screening.sqlite with
+leave-one-out: every labelled headline is decided from all the other labels of its
+folder (and the folder's exclusion questions, when their embeddings are cached) and the
+local decision is compared with the GPT verdict it replaced. Reports per folder how many
+headlines would have been decided locally (coverage), how often those decisions agree
+with GPT, and the confusion counts, plus a sweep over the neighbour similarity threshold.
+Only cached embeddings are used; no API calls are made.
+
+    python -m benchmarks.eval_screening --sweep
+"""
+import argparse
+import os
+
+import numpy as np
+
+from src import screening
+from src.questions import CEMENT_NO, IRON_NO, STEEL_NO
+
+FOLDER_QUESTIONS = {"LeadIT-Cement": CEMENT_NO, "LeadIT-Iron": IRON_NO, "LeadIT-Steel": STEEL_NO}
+
+
+def load_folder(screen, folder):
+    """(headline embeddings, verdict == 'yes', question embeddings) from the cache."""
+    rows = screen._execute(
+        "SELECT e.vec, l.verdict FROM labels l JOIN embeddings e ON e.text_hash = l.text_hash AND e.model = ? "
+        "WHERE l.folder = ? ORDER BY l.updated_at",
+        (screen.model, folder),
+    )
+    if not rows:
+        return None
+    heads = np.vstack([np.frombuffer(v, dtype=np.float32) for v, _ in rows])
+    yes = np.array([verdict == "yes" for _, verdict in rows])
+    qvecs = []
+    for question in FOLDER_QUESTIONS.get(folder, []):
+        found = screen._execute("SELECT vec FROM embeddings WHERE model = ? AND text_hash = ?",
+                                (screen.model, screening._hash(question)))
+        if found:
+            qvecs.append(np.frombuffer(found[0][0], dtype=np.float32))
+    qmat = np.vstack(qvecs) if qvecs else np.zeros((0, heads.shape[1]), dtype=np.float32)
+    return heads, yes, qmat
+
+
+def evaluate(heads, yes, qmat):
+    decisions = screening.decide_matrix(heads, qmat, heads, yes, exclude_self=True)
+    local = [(d.verdict == "yes", truth) for d, truth in zip(decisions, yes) if d.verdict is not None]
+    agree = sum(p == t for p, t in local)
+    return {
+        "labels": len(yes),
+        "local": len(local),
+        "coverage": len(local) / len(yes) if len(yes) else 0.0,
+        "agreement": agree / len(local) if local else None,
+        "local_yes_gpt_no": sum(p and not t for p, t in local),
+        "local_no_gpt_yes": sum(t and not p for p, t in local),
+    }
+
+
+def _fmt(report):
+    agreement = "-" if report["agreement"] is None else f"{report['agreement']:.1%}"
+    return (f"{report['labels']:>7}{report['local']:>7}{report['coverage']:>10.1%}{agreement:>11}"
+            f"{report['local_yes_gpt_no']:>10}{report['local_no_gpt_yes']:>10}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default=os.path.join(screening.STATE_DIR, "screening.sqlite"))
+    ap.add_argument("--folder", action="append", help="folder to report (repeatable; default: all labelled)")
+    ap.add_argument("--sweep", action="store_true", help="also sweep SCREEN_NEIGHBOUR_SIM")
+    args = ap.parse_args()
+
+    screen = screening.HeadlineScreen(path=args.db)
+    folders = args.folder or [f for (f,) in screen._execute("SELECT DISTINCT folder FROM labels ORDER BY folder")]
+    header = f"{'folder':<16}{'labels':>7}{'local':>7}{'coverage':>10}{'agreement':>11}{'yes/GPTno':>10}{'no/GPTyes':>10}"
+    print(f"model {screen.model}, repeat sim {screening.REPEAT_SIM}, neighbour sim {screening.NEIGHBOUR_SIM}, "
+          f"agreement {screening.AGREEMENT}, question sim {screening.QUESTION_SIM}")
+    print(header)
+    data = {}
+    for folder in folders:
+        loaded = load_folder(screen, folder)
+        if loaded is None:
+            print(f"{folder:<16} no labelled headlines with cached embeddings")
+            continue
+        data[folder] = loaded
+        print(f"{folder:<16}{_fmt(evaluate(*loaded))}")
+
+    if args.sweep and data:
+        default = screening.NEIGHBOUR_SIM
+        print("\nneighbour sim sweep (all folders)")
+        print(f"{'sim':<16}{'labels':>7}{'local':>7}{'coverage':>10}{'agreement':>11}{'yes/GPTno':>10}{'no/GPTyes':>10}")
+        try:
+            for sim in (0.75, 0.8, 0.85, 0.9, 0.95):
+                screening.NEIGHBOUR_SIM = sim
+                reports = [evaluate(*d) for d in data.values()]
+                labels = sum(r["labels"] for r in reports)
+                local = sum(r["local"] for r in reports)
+                agreed = sum(r["agreement"] * r["local"] for r in reports if r["agreement"] is not None)
+                total = {
+                    "labels": labels,
+                    "local": local,
+                    "coverage": local / labels if labels else 0.0,
+                    "agreement": agreed / local if local else None,
+                    "local_yes_gpt_no": sum(r["local_yes_gpt_no"] for r in reports),
+                    "local_no_gpt_yes": sum(r["local_no_gpt_yes"] for r in reports),
+                }
+                print(f"{sim:<16}{_fmt(total)}")
+        finally:
+            screening.NEIGHBOUR_SIM = default
+    screen.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Local mock of the Microsoft Graph endpoints the pipeline uses: the client-credentials
+token endpoint, drive-item upload sessions (createUploadSession + chunked PUTs) and the
+simple content PUT used for empty files.
+
+Uploaded files are kept in memory in `MockGraphServer.files`. Set `fail_every` to make
+every n-th chunk PUT fail with a 503 (after part of it was received), which exercises
+the resume path.
+
+    python -m benchmarks.mock_graph --selftest
+"""
+import argparse
+import json
+import os
+import re
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "MockGraph/1.0"
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def do_POST(self):
+        graph = self.server.graph
+        body = self._read_body()
+        if self.path.endswith("/oauth2/v2.0/token"):
+            graph.token_requests += 1
+            return self._send_json(200, {"access_token": graph.token, "expires_in": 3599, "token_type": "Bearer"})
+        m = re.match(r"^/v1\.0/drives/([^/]+)/items/([^/]+):/(.+):/createUploadSession$", self.path)
+        if not m:
+            return self._send_json(404, {"error": {"code": "itemNotFound"}})
+        if self.headers.get("Authorization") != f"Bearer {graph.token}":
+            return self._send_json(401, {"error": {"code": "InvalidAuthenticationToken"}})
+        session_id = uuid.uuid4().hex
+        with graph.lock:
+            graph.sessions[session_id] = {"name": m.group(3), "data": bytearray(), "total": None}
+        json.loads(body or b"{}")
+        upload_url = f"http://{self.server.server_address[0]}:{self.server.server_address[1]}/upload/{session_id}"
+        return self._send_json(200, {"uploadUrl": upload_url, "nextExpectedRanges": ["0-"]})
+
+    def do_GET(self):
+        graph = self.server.graph
+        m = re.match(r"^/upload/([0-9a-f]+)$", self.path)
+        session = graph.sessions.get(m.group(1)) if m else None
+        if session is None:
+            return self._send_json(404, {"error": {"code": "itemNotFound"}})
+        return self._send_json(200, {"nextExpectedRanges": [f"{len(session['data'])}-"]})
+
+    def do_PUT(self):
+        graph = self.server.graph
+        simple = re.match(r"^/v1\.0/drives/([^/]+)/items/([^/]+):/(.+):/content$", self.path)
+        if simple:
+            body = self._read_body()
+            if self.headers.get("Authorization") != f"Bearer {graph.token}":
+                return self._send_json(401, {"error": {"code": "InvalidAuthenticationToken"}})
+            with graph.lock:
+                graph.files[simple.group(3)] = body
+            return self._send_json(201, {"id": uuid.uuid4().hex, "name": os.path.basename(simple.group(3)),
+                                         "size": len(body)})
+        m = re.match(r"^/upload/([0-9a-f]+)$", self.path)
+        session = graph.sessions.get(m.group(1)) if m else None
+        body = self._read_body()
+        if session is None:
+            return self._send_json(404, {"error": {"code": "itemNotFound"}})
+        if "Authorization" in self.headers:
+            return self._send_json(401, {"error": {"code": "unauthenticated", "message": "no auth on upload URLs"}})
+        rng = re.match(r"^bytes (\d+)-(\d+)/(\d+)$", self.headers.get("Content-Range", ""))
+        if not rng:
+            return self._send_json(400, {"error": {"code": "invalidRange"}})
+        start, end, total = (int(x) for x in rng.groups())
+        with graph.lock:
+            graph.chunk_puts += 1
+            inject = graph.fail_every and graph.chunk_puts % graph.fail_every == 0
+            if start != len(session["data"]) or end - start + 1 != len(body):
+                return self._send_json(416, {"error": {"code": "invalidRange"},
+                                             "nextExpectedRanges": [f"{len(session['data'])}-"]})
+            if inject:
+                # keep half of the chunk, as a dropped connection would
+                session["data"].extend(body[: len(body) // 2])
+                return self._send_json(503, {"error": {"code": "serviceNotAvailable"}})
+            session["data"].extend(body)
+            session["total"] = total
+            if len(session["data"]) < total:
+                return self._send_json(202, {"nextExpectedRanges": [f"{len(session['data'])}-"]})
+            graph.files[session["name"]] = bytes(session["data"])
+            del graph.sessions[m.group(1)]
+        return self._send_json(201, {"id": uuid.uuid4().hex, "name": os.path.basename(session["name"]), "size": total})
+
+
+class MockGraphServer:
+    """Runs the mock Graph API on a background thread; use as a context manager."""
+
+    def __init__(self, host="127.0.0.1", port=0, fail_every=0, token="mock-graph-token"):
+        self.token = token
+        self.fail_every = fail_every
+        self.lock = threading.Lock()
+        self.sessions = {}
+        self.files = {}
+        self.chunk_puts = 0
+        self.token_requests = 0
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.graph = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def _selftest():
+    from src import onedrive
+
+    payloads = {f"LeadIT-{d}/results_test.xlsx": os.urandom(3 * onedrive.UPLOAD_CHUNK_BYTES + 12345)
+                for d in ("Cement", "Iron", "Steel")}
+    payloads["LeadIT-Steel/empty.xlsx"] = b""
+    with MockGraphServer(fail_every=3) as graph:
+        onedrive.GRAPH_BASE_URL = graph.base_url + "/v1.0"
+        onedrive.GRAPH_LOGIN_URL = graph.base_url
+        onedrive.UPLOAD_BACKOFF_S = 0.01
+        token = onedrive.get_graph_api_token("tenant", "client", "secret")
+        results = {name: onedrive.upload_file_to_onedrive(data, "drive", "parent", name, token)
+                   for name, data in payloads.items()}
+        ok = all(results[name] and graph.files.get(name) == data for name, data in payloads.items())
+        print(f"uploaded {len(payloads)} files in {graph.chunk_puts} chunk PUTs "
+              f"(every 3rd failed and was resumed): {'OK' if ok else 'MISMATCH'}")
+        if not ok:
+            raise SystemExit(1)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--selftest", action="store_true", help="upload through src.onedrive with injected failures")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--fail-every", type=int, default=0)
+    args = ap.parse_args()
+    if args.selftest:
+        return _selftest()
+    server = MockGraphServer(port=args.port, fail_every=args.fail_every)
+    print(f"Mock Graph listening on {server.base_url} (set GRAPH_BASE_URL={server.base_url}/v1.0 "
+          f"and GRAPH_LOGIN_URL={server.base_url})")
+    server._httpd.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
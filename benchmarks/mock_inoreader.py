@@ -0,0 +1,169 @@
+"""
+Local mock of the Inoreader endpoints the pipeline uses (ClientLogin and paginated
+stream contents), which also hosts the article pages the feed items link to.
+
+Feed items come from benchmarks/fixtures/inoreader_items.json and article bodies from
+benchmarks/fixtures/articles/. With `copies` > 1 every item is repeated under a new id
+and a distinct URL (`?copy=n`), so larger weeks can be simulated from the same fixtures.
+
+    python -m benchmarks.mock_inoreader --port 8766 --copies 10
+"""
+import argparse
+import json
+import mimetypes
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+PAGE_SIZE_MAX = 100
+
+
+def load_items(base_url, copies=1, path=None):
+    """Returns {folder: [Inoreader item dicts]} with hrefs pointing at `base_url`."""
+    with open(path or os.path.join(FIXTURES_DIR, "inoreader_items.json"), encoding="utf-8") as f:
+        recorded = json.load(f)
+    folders = {}
+    for folder, items in recorded.items():
+        out = []
+        for copy in range(copies):
+            for item in items:
+                item = json.loads(json.dumps(item).replace("{base}", base_url))
+                if copy:
+                    item["id"] = f"{item['id']}-{copy}"
+                    for key in ("canonical", "alternate"):
+                        for link in item.get(key, []):
+                            link["href"] = f"{link['href']}?copy={copy}"
+                out.append(item)
+        folders[folder] = out
+    return folders
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "MockInoreader/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, payload):
+        self._send(status, json.dumps(payload).encode(), "application/json")
+
+    def do_POST(self):
+        mock = self.server.mock
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        if self.path.startswith("/accounts/ClientLogin"):
+            mock.logins += 1
+            return self._send(200, f"SID=null\nLSID=null\nAuth={mock.token}\n".encode(), "text/plain")
+        return self._send_json(404, {"error": "not found"})
+
+    def do_GET(self):
+        mock = self.server.mock
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        m = re.match(r"^/reader/api/0/stream/contents/(.+)$", parsed.path)
+        if m:
+            if self.headers.get("Authorization") != f"GoogleLogin auth={mock.token}":
+                return self._send(401, b"AppId or AppKey or token not valid", "text/plain")
+            folder = unquote(m.group(1)).rsplit("/", 1)[-1]
+            items = mock.items.get(folder, [])
+            n = min(int((query.get("n") or [20])[0]), PAGE_SIZE_MAX)
+            start = int((query.get("c") or [0])[0])
+            page = {"direction": "ltr", "id": unquote(m.group(1)), "items": items[start:start + n]}
+            if start + n < len(items):
+                page["continuation"] = str(start + n)
+            with mock.lock:
+                mock.stream_requests += 1
+            return self._send_json(200, page)
+
+        m = re.match(r"^/articles/([\w.-]+)$", parsed.path)
+        if m:
+            path = os.path.join(FIXTURES_DIR, "articles", m.group(1))
+            if not os.path.exists(path):
+                return self._send(404, b"<html><body>Not found</body></html>", "text/html")
+            if mock.article_latency_s:
+                time.sleep(mock.article_latency_s)
+            with open(path, "rb") as f:
+                body = f.read()
+            ctype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            if ctype == "text/html":
+                ctype += "; charset=utf-8"
+            with mock.lock:
+                mock.article_requests += 1
+            return self._send(200, body, ctype)
+        return self._send_json(404, {"error": "not found"})
+
+
+class MockInoreaderServer:
+    """Runs the mock Inoreader API and article host on a background thread; use as a context manager."""
+
+    def __init__(self, host="127.0.0.1", port=0, copies=1, article_latency_s=0.0, token="mock-inoreader-token"):
+        self.token = token
+        self.article_latency_s = article_latency_s
+        self.lock = threading.Lock()
+        self.logins = 0
+        self.stream_requests = 0
+        self.article_requests = 0
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.mock = self
+        self.items = load_items(self.base_url, copies)
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_url(self):
+        return f"{self.base_url}/reader/api/0"
+
+    @property
+    def login_url(self):
+        return f"{self.base_url}/accounts/ClientLogin"
+
+    def article_count(self):
+        return sum(len(items) for items in self.items.values())
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8766)
+    ap.add_argument("--copies", type=int, default=1)
+    ap.add_argument("--article-latency-ms", type=float, default=0)
+    args = ap.parse_args()
+    server = MockInoreaderServer(port=args.port, copies=args.copies, article_latency_s=args.article_latency_ms / 1000)
+    print(f"Mock Inoreader listening on {server.base_url} (set INOREADER_API_URL={server.api_url} "
+          f"and INOREADER_LOGIN_URL={server.login_url})")
+    server._httpd.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+Local OpenAI-compatible stub for /v1/chat/completions and /v1/embeddings with
+configurable latency.
+
+Answers are derived deterministically from the prompt so a full pipeline run behaves
+plausibly: market/price headlines are screened out by the exclusion questions about
+markets or prices, articles about a plant or project pass the project gate, and the
+detail/numeric prompts get JSON with values and verbatim quotes taken from the article text. Embeddings are hashed bags of words and word pairs,
+so headlines that share wording come out similar. Token usage is estimated at ~4
+characters per token. With logprobs requested, yes/no answers carry token logprobs whose
+confidence is low for a deterministic ~1 in LOW_CONFIDENCE_EVERY prompts, so the model
+cascade in src/query_gpt.py escalates some calls.
+
+    python -m benchmarks.mock_openai --port 8767 --latency-ms 400 --jitter-ms 300
+"""
+import argparse
+import base64
+import hashlib
+import json
+import math
+import random
+import struct
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_OFF_TOPIC = re.compile(r"\b(prices?|shares?|futures|market|stocks?)\b", re.IGNORECASE)
+_MARKET_QUESTION = re.compile(r"\b(market|prices)\b", re.IGNORECASE)
+_PROJECT = re.compile(r"\b(plant|project|facility|demonstration)\b", re.IGNORECASE)
+_YEAR = re.compile(r"\b(20[2-4]\d)\b")
+_NAME = re.compile(r"\b([A-Z][A-Za-z0-9]*(?:[- ][A-Z0-9][A-Za-z0-9]*)*)\b")
+_CAPACITY = re.compile(r"[^.]*?\b(\d[\d.,]*\s+(?:million\s+)?tonnes\b[^.,]*)", re.IGNORECASE)
+_INVESTMENT = re.compile(r"[^.]*?\b((?:SEK|NOK|EUR|USD)?\s?\d[\d.,]*\s+(?:billion|million)\s+(?:euros?|US dollars|SEK|NOK)?)",
+                         re.IGNORECASE)
+_WORD = re.compile(r"[a-z0-9]+")
+EMBEDDING_DIM = 256
+LOW_CONFIDENCE_EVERY = 10
+_COUNTRIES = {
+    "Sweden": "Europe", "Germany": "Europe", "Norway": "Europe", "Brazil": "South America",
+    "China": "Asia", "India": "Asia", "United States": "North America", "Australia": "Oceania",
+}
+
+
+def _article_text(prompt):
+    m = re.search(r'(?:Article text|Text):\n"""\n(.*)\n"""', prompt, re.DOTALL)
+    return m.group(1) if m else prompt
+
+
+def _first_name(text):
+    for m in _NAME.finditer(text):
+        if m.group(1) not in ("The", "A", "An", "This", "In", "On"):
+            return m.group(1)
+    return ""
+
+
+def _yes_no(prompt):
+    if "Here is the headline:" in prompt:
+        question, headline = prompt.split("Here is the headline:", 1)
+        # only the exclusion questions about markets and prices catch market headlines
+        return "yes" if _OFF_TOPIC.search(headline) and _MARKET_QUESTION.search(question) else "no"
+    return "yes" if _PROJECT.search(_article_text(prompt)) else "no"
+
+
+def _core_details(text):
+    year = _YEAR.search(text)
+    return {
+        "scale": "demonstration" if "demonstration" in text.lower() else ("pilot" if "pilot" in text.lower() else "full scale"),
+        "project_name": _first_name(text),
+        "timeline": year.group(1) if year else "",
+        "technology": "",
+    }
+
+
+def _additional_details(text):
+    country = next((c for c in _COUNTRIES if c in text), "")
+    return {
+        "company": _first_name(text),
+        "projects mentioned": "one main one",
+        "partners": "",
+        "continent": _COUNTRIES.get(country, ""),
+        "country": country,
+        "project_status": "Announced",
+    }
+
+
+def _numeric_facts(prompt, text):
+    keys = re.findall(r'^\s*"(\w+)":', prompt.split("Formatting rules", 1)[0], re.MULTILINE)
+    out = {k: "" for k in keys}
+    cap = _CAPACITY.search(text)
+    inv = _INVESTMENT.search(text)
+    for key in keys:
+        if key.endswith("_capacity") and cap and key.split("_")[0] in cap.group(0).lower():
+            out[key] = cap.group(1).strip()
+            out[key.replace("_capacity", "_quote")] = cap.group(1).strip()
+    if inv and "investment" in out:
+        out["investment"] = inv.group(1).strip()
+        out["investment_quote"] = inv.group(1).strip()
+    return out
+
+
+def answer(messages):
+    """Returns the assistant content the stub replies with for `messages`."""
+    system = next((m.get("content") or "" for m in messages if m.get("role") == "system"), "")
+    prompt = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+    if "single word response" in system:
+        return json.dumps({"answer": _yes_no(prompt)})
+    text = _article_text(prompt)
+    if "record of a known project" in prompt:
+        return json.dumps({"about_known_project": "yes", **_core_details(text), **_additional_details(text)})
+    if "core details" in prompt:
+        return json.dumps(_core_details(text))
+    if "additional project details" in prompt:
+        return json.dumps(_additional_details(text))
+    if "extraction assistant" in prompt:
+        return json.dumps(_numeric_facts(prompt, text))
+    return json.dumps({"answer": "no"})
+
+
+def logprobs(messages, content, top=0):
+    """Chat logprobs for `content` split into JSON-ish tokens; only the yes/no token is uncertain."""
+    prompt = "".join(m.get("content") or "" for m in messages)
+    low = int.from_bytes(hashlib.md5(prompt.encode()).digest()[:4], "little") % LOW_CONFIDENCE_EVERY == 0
+    tokens = []
+    for token in re.findall(r'\w+|[^\w\s]+|\s+', content):
+        word = token.lower()
+        if word in ("yes", "no"):
+            p = 0.6 if low else 0.995
+            other = "no" if word == "yes" else "yes"
+            alternatives = [(token, p), (other, 1 - p)]
+        else:
+            alternatives = [(token, 1.0)]
+        tokens.append({
+            "token": token,
+            "logprob": math.log(alternatives[0][1]),
+            "bytes": list(token.encode()),
+            "top_logprobs": [{"token": t, "logprob": math.log(q), "bytes": list(t.encode())}
+                             for t, q in alternatives[:top]],
+        })
+    return {"content": tokens, "refusal": None}
+
+
+def embedding(text):
+    """Unit-length feature-hashed vector of the words and word pairs in `text`."""
+    words = _WORD.findall(text.lower())
+    vec = [0.0] * EMBEDDING_DIM
+    for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+        h = int.from_bytes(hashlib.md5(feature.encode()).digest()[:4], "little")
+        vec[h % EMBEDDING_DIM] += 1.0 if h & 1 << 31 else -1.0
+    norm = sum(v * v for v in vec) ** 0.5 or 1.0
+    return [v / norm for v in vec]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "MockOpenAI/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        mock = self.server.mock
+        length = int(self.headers.get("Content-Length") or 0)
+        req = json.loads(self.rfile.read(length) or b"{}")
+        if self.path.rstrip("/").endswith("/embeddings"):
+            return self._embeddings(req)
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            return self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+
+        mock.sleep()
+        with mock.lock:
+            mock.requests += 1
+            fail = mock.error_rate and mock.rng.random() < mock.error_rate
+        if fail:
+            return self._send_json(500, {"error": {"message": "injected failure", "type": "server_error"}})
+
+        messages = req.get("messages") or []
+        content = answer(messages)
+        prompt_tokens = sum(len(m.get("content") or "") for m in messages) // 4 + 8
+        completion_tokens = len(content) // 4 + 1
+        model = req.get("model", "mock")
+        with mock.lock:
+            mock.prompt_tokens += prompt_tokens
+            mock.completion_tokens += completion_tokens
+            mock.model_requests[model] = mock.model_requests.get(model, 0) + 1
+        return self._send_json(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "logprobs": logprobs(messages, content, req.get("top_logprobs") or 0) if req.get("logprobs") else None,
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": 0},
+            },
+        })
+
+
+    def _embeddings(self, req):
+        mock = self.server.mock
+        mock.sleep()
+        inputs = req.get("input") or []
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        tokens = sum(len(t) for t in inputs) // 4 + 1
+        with mock.lock:
+            mock.embedding_requests += 1
+            mock.embedding_inputs += len(inputs)
+        data = []
+        for i, text in enumerate(inputs):
+            vec = embedding(text)
+            if req.get("encoding_format") == "base64":
+                vec = base64.b64encode(struct.pack(f"<{len(vec)}f", *vec)).decode()
+            data.append({"object": "embedding", "index": i, "embedding": vec})
+        return self._send_json(200, {
+            "object": "list",
+            "data": data,
+            "model": req.get("model", "mock"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        })
+
+
+class MockOpenAIServer:
+    """
+    Runs the stub on a background thread; use as a context manager.
+    Each request waits `latency_s` plus an exponential jitter with mean `jitter_s`;
+    `error_rate` is the fraction of requests answered with a 500.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency_s=0.0, jitter_s=0.0, error_rate=0.0, seed=0):
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.embedding_requests = 0
+        self.embedding_inputs = 0
+        self.model_requests = {}
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.mock = self
+        self._thread = None
+
+    def sleep(self):
+        with self.lock:
+            delay = self.latency_s + (self.rng.expovariate(1 / self.jitter_s) if self.jitter_s else 0.0)
+        if delay:
+            time.sleep(delay)
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8767)
+    ap.add_argument("--latency-ms", type=float, default=0)
+    ap.add_argument("--jitter-ms", type=float, default=0)
+    ap.add_argument("--error-rate", type=float, default=0)
+    args = ap.parse_args()
+    server = MockOpenAIServer(port=args.port, latency_s=args.latency_ms / 1000,
+                              jitter_s=args.jitter_ms / 1000, error_rate=args.error_rate)
+    print(f"Mock OpenAI listening on {server.base_url} (set OPENAI_BASE_URL={server.base_url})")
+    server._httpd.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,43 @@
 import os
+import glob
+import json
 import time
+import argparse
 import logging
 import traceback
-import pandas as pd
 from dotenv import load_dotenv
 import datetime
-from src.inoreader import build_df_for_folder, fetch_full_article_text, resolve_with_playwright
-from src.query_gpt import new_openai_session, query_gpt_for_relevance_iterative, query_gpt_for_project_details, fetch_variable_info, extract_numeric_facts_with_quotes
-from src.results import output_results_excel, get_output_fname
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from src.inoreader import build_batch_for_folder, fetch_full_article_text, resolve_url, prefetch_archived_articles
+from src.query_gpt import SMALL_MODEL, new_openai_session, query_gpt_for_relevance, query_gpt_for_project_details, query_gpt_for_project_update, fetch_variable_info
+from src.results import ResultsWorkbook, upload_results, get_output_fname, RUN_METRICS_SHEET
 from src.questions import STEEL_NO, IRON_NO, CEMENT_NO, CEMENT_TECH, STEEL_IRON_TECH
 from src.ino_client_login import client_login
+from src.checkpoint import RunCheckpoint, new_run_id, RUNS_DIR
+from src.article import ArticleBatch
+from src import extraction_cache, question_order, text_store, priority
+from src.project_index import project_index
+from src.screening import headline_screen
+from src.metrics import metrics
+from src.rate_limit import CircuitOpenError
+from src.budget import run_budget, BudgetExceededError
+from src.profiling import profiler
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Folder pipelines run concurrently, one worker thread per folder
+FOLDER_WORKERS = int(os.getenv("FOLDER_WORKERS", 3))
+# Run left with deferred or failed articles, continued by `python main.py --resume-pending`
+PENDING_RUN_PATH = os.path.join(RUNS_DIR, "pending_run.json")
+# A pending run is given up (and the next invocation starts fresh) after this many resumes
+PENDING_MAX_RESUMES = int(os.getenv("PENDING_MAX_RESUMES", 2))
+
 def obtain_inoreader_token():
     """
     Returns a valid Inoreader access token using the legacy ClientLogin method.
+    The token comes from the shared token cache (src/tokens.py) when one is still valid,
+    so scheduled runs do not log in again every time.
     """
     # 1) Pull creds out of the environment
     username  = os.getenv("USERNAME")
@@ -49,8 +70,425 @@ def obtain_inoreader_token():
 
 
 
-def run_pipeline():
-    logger.info("Pipeline started.")
+def process_article(folder, article, openai_client, gpt_model):
+    """
+    Runs full-text fetch, the project gate and detail extraction for one screened article.
+    Fills in the Article in place (outcome 'relevant' or 'irrelevant', gate 'yes' / 'no' /
+    None when not asked, full text, GPT details) and returns it.
+    """
+    url = article.url
+    discard_reason = None
+
+    if article.relevant == "no":
+        article.outcome = "irrelevant"
+        return article
+
+    # Fetch full text
+    try:
+        full_text = fetch_full_article_text({"url": url})
+        if full_text == "":
+            discard_reason = "Failed to fetch text"
+    except Exception as e:
+        discard_reason = "source blocks web scraping bots"
+        logger.error("Error fetching article from %s: %s", url, e)
+        full_text = ""
+
+    domain_local = folder.removeprefix("LeadIT-") if hasattr(str, "removeprefix") else (
+        folder[7:] if folder.startswith("LeadIT-") else folder
+    )
+
+    project_query = (
+        f"Based on the article below, is this about a project, plant, or demonstration in {domain_local}? "
+        f"Does it mention a project, plant, or demonstration in green {domain_local}? "
+        "This can include funding or contract/partnership updates and does it include some details about that project? "
+        "Answer ONLY as JSON with exactly one key “answer” whose value is “yes” or “no”.\n\n"
+        "Article text:\n\"\"\"\n" + run_budget.truncate(full_text) + "\n\"\"\""
+    )
+
+    gate = None
+    try:
+        resp = fetch_variable_info(openai_client, gpt_model, project_query, run_on_full_text=True, stage="gpt_project_gate")
+        is_project = resp.get("answer", "").strip().lower() == "yes"
+        gate = "yes" if is_project else "no"
+    except (CircuitOpenError, BudgetExceededError):
+        raise
+    except Exception as e:
+        logger.exception("Project yes/no gate failed for %s: %s", url, e)
+        is_project = False
+        if discard_reason is None:
+            discard_reason = f"Project classification failed: {e}"
+
+    if is_project:
+        if folder == "LeadIT-Cement":
+            technologies = CEMENT_TECH
+        else:
+            technologies = STEEL_IRON_TECH
+
+        # an article about an already tracked project only needs its record updated
+        known = project_index.match(folder, (article.title or "") + "\n" + full_text)
+        try:
+            details = None
+            if known is not None:
+                details = query_gpt_for_project_update(
+                    openai_client,
+                    gpt_model,
+                    full_text,
+                    known,
+                    technologies,
+                    domain_local,
+                )
+                if details is None:
+                    logger.info("%s matched known project %r but is not about it; running the full extraction.",
+                                url, known.get("project_name"))
+                    known = None
+            if details is None:
+                details = query_gpt_for_project_details(
+                    openai_client,
+                    gpt_model,
+                    full_text,
+                    technologies,
+                    domain_local,
+                )
+        except (CircuitOpenError, BudgetExceededError):
+            raise
+        except Exception as e:
+            logger.exception("Project detail extraction failed for %s: %s", url, e)
+            details = {}
+            if discard_reason is None:
+                discard_reason = f"Project detail extraction failed: {e}"
+
+        # the index only speeds up later articles; its failures must not cost these details
+        try:
+            project_index.learn(folder, details, known)
+        except Exception as e:
+            logger.exception("Could not add %s to the known-project index: %s", url, e)
+
+    else:
+        details = {}
+        if discard_reason is None:
+            discard_reason = f"This article did not seem to be about a green {domain_local} project."
+
+    article.outcome = "relevant"
+    article.gate = gate
+    article.discard_reason = discard_reason
+    # keep only a handle; the text itself stays in the run's text store until the checks need it
+    article.full_text = extraction_cache.handle(url) or text_store.put(full_text)
+    article.details = details
+    return article
+
+
+def _screen_headlines(folder, keys, texts, target_questions, openai_client, gpt_model, checkpoint):
+    """
+    Relevance verdict per headline. Headlines without a checkpointed verdict are first
+    scored by the embedding screen (src/screening.py); in HEADLINE_SCREEN=on mode its
+    confident decisions are used directly, everything else goes through the GPT questions.
+    """
+    verdicts = [checkpoint.relevance(folder, key) for key in keys]
+    todo = [i for i, v in enumerate(verdicts) if v is None]
+    decisions = headline_screen.decide(openai_client, folder, [texts[i] for i in todo], target_questions)
+    local = 0
+    for i, decision in zip(todo, decisions):
+        if headline_screen.use_local(decision, texts[i]):
+            relevant = decision.verdict
+            local += 1
+        elif run_budget.defer_new_work():
+            # left unscreened (and unchecked) for a resume; the article loop defers it
+            continue
+        else:
+            try:
+                relevant = query_gpt_for_relevance(
+                    texts[i],
+                    target_questions=target_questions,
+                    run_on_full_text=True,
+                    gpt_client=openai_client,
+                    gpt_model=gpt_model,
+                    folder=folder,
+                )
+            except BudgetExceededError:
+                continue
+            headline_screen.record(folder, texts[i], relevant, decision)
+        checkpoint.record_relevance(folder, keys[i], relevant)
+        verdicts[i] = relevant
+    question_order.save_stats()
+    if todo and headline_screen.enabled:
+        logger.info("Headline screen for %s: %d of %d headlines decided locally (%d confident).",
+                    folder, local, len(todo), sum(d.verdict is not None for d in decisions))
+    return verdicts
+
+
+def _defer(article):
+    """
+    Marks an article left out because the run budget is (nearly) spent or the run's
+    deadline has passed. It is not checkpointed and its folder is not marked uploaded, so
+    resuming the run processes it and replaces the folder's workbook.
+    """
+    run_budget.note("deferred")
+    article.outcome = "irrelevant"
+    article.discard_reason = f"Deferred: {run_budget.deferral_reason()} (resume the run to process it)"
+
+
+def process_folder(folder, target_questions, access_token, openai_client, gpt_model, checkpoint):
+    """
+    Runs the full pipeline for one Inoreader folder and uploads its workbook.
+    Returns False when the folder produced no headlines; raises on any other failure.
+    Safe to run concurrently with other folders: GPT calls share one rate limiter and
+    HTTP fetches share one connection pool.
+
+    Every stage output is checkpointed per article, so when resuming a run only the
+    articles that had not finished are processed again. A folder whose workbook still has
+    deferred or failed articles is not marked uploaded: a resume processes those and
+    uploads the workbook again under the same name, replacing the partial one.
+    """
+    domain = folder.split("-")[-1].lower()
+    logger.info("Processing folder: %s", folder)
+
+    if checkpoint.folder_uploaded(folder):
+        logger.info("Folder %s was already uploaded in run %s; skipping.", folder, checkpoint.run_id)
+        return True
+
+    records = checkpoint.load_headlines(folder)
+    if records is None:
+        with metrics.timed("inoreader_fetch"):
+            headlines = build_batch_for_folder(folder, access_token)
+        logger.info("Fetched %d headlines from folder %s.", len(headlines), folder)
+
+        if not len(headlines):
+            logger.error("No headlines fetched for folder: %s", folder)
+            # Treat this as a failure for alerting, but continue to other folders
+            return False
+        checkpoint.save_headlines(folder, headlines.to_records())
+    else:
+        headlines = ArticleBatch.from_records(records)
+        logger.info("Resuming folder %s with %d checkpointed headlines.", folder, len(headlines))
+
+    keys = headlines.keys
+
+    # Resolve redirect URLs (checkpointed per article)
+    resolved = []
+    for key, url in zip(keys, headlines.urls):
+        final_url = checkpoint.resolved_url(folder, key)
+        if final_url is None:
+            final_url = resolve_url(url)
+            checkpoint.record_resolved_url(folder, key, final_url)
+        resolved.append(final_url)
+    headlines.urls = resolved
+
+    # Headline relevance screen (checkpointed per article)
+    verdicts = _screen_headlines(folder, keys, headlines.screen_texts(), target_questions,
+                                 openai_client, gpt_model, checkpoint)
+
+    # Most promising articles first (src/priority.py), so a run cut short by its deadline
+    # or budget has fetched and extracted those; the workbook rows follow the same order
+    order = priority.order_articles(folder, headlines, verdicts,
+                                    CEMENT_TECH if folder == "LeadIT-Cement" else STEEL_IRON_TECH)
+
+    # Kick off Archive.org fetches for relevant articles on domains known to block us
+    prefetch_archived_articles([
+        headlines.urls[i] for i in order
+        if verdicts[i] != "no" and not checkpoint.is_finished(folder, keys[i])
+    ])
+
+    # rows are streamed into the workbook as each article finishes
+    workbook = ResultsWorkbook(domain)
+    unfinished = 0
+
+    for idx in order:
+        article = headlines.article(idx, verdicts[idx])
+        finished = checkpoint.finished_article(folder, article.key)
+        if finished is not None:
+            article = finished
+        elif run_budget.defer_new_work():
+            _defer(article)
+            unfinished += 1
+        else:
+            try:
+                process_article(folder, article, openai_client, gpt_model)
+                checkpoint.record_article(folder, article)
+                priority.record_outcome(folder, article)
+            except BudgetExceededError:
+                _defer(article)
+                unfinished += 1
+            except CircuitOpenError:
+                # OpenAI stayed down past the breaker's pause: fail the folder (a resume
+                # picks it up) instead of discarding every remaining article
+                raise
+            except Exception as article_exc:
+                # One article is bad; log & move on (not checkpointed, so a resume retries it)
+                logger.exception(
+                    "Error processing article '%s' in folder %s: %s",
+                    article.title or "Unknown Title",
+                    folder,
+                    article_exc,
+                )
+                article.outcome = "irrelevant"
+                article.discard_reason = f"Pipeline error: {article_exc}"
+                unfinished += 1
+
+        if article.outcome == "relevant":
+            workbook.add_relevant(article)
+        else:
+            workbook.add_irrelevant(article)
+        # the workbook row and the checkpoint have what they need
+        article.release_text()
+    priority.save_stats()
+    project_index.save()
+
+    if RUN_METRICS_SHEET:
+        workbook.add_metrics_sheet(metrics.sheet_rows(folder))
+
+    # Upload as soon as this folder is done, independently of the others
+    # a resumed folder replaces the partial workbook it uploaded before
+    output_fname = checkpoint.output_name(folder) or get_output_fname(folder, filetype="xlsx")
+    checkpoint.record_output_name(folder, output_fname)
+    with workbook.save() as workbook_file:
+        upload_results(workbook_file, output_fname)
+    if unfinished:
+        logger.warning("%d articles in %s were deferred or failed; resume run %s to process them "
+                       "and replace %s.", unfinished, folder, checkpoint.run_id, output_fname)
+    else:
+        checkpoint.mark_folder_uploaded(folder)
+    return True
+
+
+def _run_folder(folder, *args):
+    """process_folder with everything it records in the run metrics labelled by folder."""
+    with metrics.folder_scope(folder):
+        return process_folder(folder, *args)
+
+
+def _artifact_prefix(run_id, resumed):
+    """Path prefix for this invocation's metrics/profile files, next to the run's checkpoint."""
+    name = f"{run_id}.resume_{new_run_id()}" if resumed else run_id
+    return os.path.join(RUNS_DIR, name)
+
+
+def _prior_spend(run_id):
+    """(USD, tokens) the earlier invocations of run `run_id` charged to its budget."""
+    usd, tokens = 0.0, 0
+    for path in glob.glob(os.path.join(RUNS_DIR, f"{run_id}.metrics.json")) + \
+            glob.glob(os.path.join(RUNS_DIR, f"{run_id}.resume_*.metrics.json")):
+        try:
+            with open(path, encoding="utf-8") as f:
+                budget = json.load(f).get("budget") or {}
+        except (OSError, ValueError):
+            continue
+        # each resume starts from what was spent before it, so the latest total wins
+        usd, tokens = max(usd, budget.get("spent_usd", 0.0)), max(tokens, budget.get("spent_tokens", 0))
+    return usd, tokens
+
+
+def _write_run_metrics(prefix, checkpoint, resumed):
+    """Writes the per-run metrics summary and logs the stage totals."""
+    summary = metrics.write_json(
+        f"{prefix}.metrics.json",
+        extra={"resumed": resumed, "articles": checkpoint.summary(), "budget": run_budget.state()},
+    )
+    for stage, s in summary["stages"].items():
+        logger.info(
+            "Stage %-22s n=%-5d total=%8.1fs p50=%6.2fs p95=%6.2fs%s",
+            stage, s["count"], s["total_s"], s["p50_s"], s["p95_s"],
+            "".join(f" {k}={s[k]}" for k in ("bytes", "prompt_tokens", "completion_tokens",
+                                             "cached_tokens", "retries", "cost_usd") if s.get(k)),
+        )
+    relevance = summary["stages"].get("gpt_relevance")
+    if relevance and relevance.get("headlines"):
+        logger.info("Relevance screen: %.2f questions per headline (%d headlines)",
+                    relevance.get("questions", relevance["count"]) / relevance["headlines"], relevance["headlines"])
+    for stage, s in summary["stages"].items():
+        if stage.endswith("_small") and (s.get("answered") or s.get("escalated")):
+            large = summary["stages"].get(stage[:-len("_small")], {})
+            logger.info(
+                "Cascade %s: %d answered by %s, %d escalated (%d low confidence, %d bad JSON, %d errors); "
+                "small %.1fs $%.4f, large %.1fs $%.4f",
+                stage[:-len("_small")], s.get("answered", 0), SMALL_MODEL, s.get("escalated", 0),
+                s.get("escalated_low_confidence", 0), s.get("escalated_bad_json", 0), s.get("escalated_error", 0),
+                s["total_s"], s.get("cost_usd", 0.0), large.get("total_s", 0.0), large.get("cost_usd", 0.0),
+            )
+    index = summary["stages"].get("project_index")
+    if index:
+        logger.info("Known-project index: %d of %d project articles matched (lighter update extraction), "
+                    "%d of them not about the matched project (full extraction)",
+                    index.get("matched", 0), index["count"],
+                    summary["stages"].get("gpt_project_update", {}).get("not_same_project", 0))
+    for stage, s in summary["stages"].items():
+        replies = s.get("parsed", 0) + s.get("parse_failures", 0)
+        if s.get("parse_failures"):
+            logger.warning("Structured output on %s: %d of %d replies unusable (%.1f%%)",
+                           stage, s["parse_failures"], replies, 100.0 * s["parse_failures"] / replies)
+    logger.info("GPT cost this run: $%.4f", sum(s.get("cost_usd", 0.0) for s in summary["stages"].values()))
+    budget = summary["budget"]
+    logger.info("Run budget: $%.4f of $%.2f spent (%.0f%%, level %s)%s", budget["spent_usd"], budget["cap_usd"],
+                100 * budget["fraction"], budget["level"],
+                "".join(f" {k}={v}" for k, v in sorted(budget["events"].items())))
+
+
+def _load_pending_run():
+    """(run_id, resumes so far) of the pending run, or (None, 0) if there is none to resume."""
+    try:
+        with open(PENDING_RUN_PATH, encoding="utf-8") as f:
+            pending = json.load(f)
+    except FileNotFoundError:
+        return None, 0
+    except Exception as e:
+        logger.warning("Could not read the pending run from %s: %s", PENDING_RUN_PATH, e)
+        return None, 0
+    run_id, resumes = pending.get("run_id"), int(pending.get("resumes", 0))
+    if not run_id or not RunCheckpoint.exists(run_id):
+        return None, 0
+    if resumes >= PENDING_MAX_RESUMES:
+        logger.warning("Run %s is still unfinished after %d resumes; starting a fresh run.", run_id, resumes)
+        return None, 0
+    return run_id, resumes
+
+
+def _save_pending_run(run_id, resumes, open_folders):
+    """Records `run_id` for --resume-pending while folders are left open, clears it otherwise."""
+    if open_folders and run_budget.level not in ("defer", "exhausted"):
+        os.makedirs(RUNS_DIR, exist_ok=True)
+        with open(PENDING_RUN_PATH, "w", encoding="utf-8") as f:
+            json.dump({"run_id": run_id, "resumes": resumes, "open_folders": open_folders}, f)
+        return
+    if open_folders:
+        # resuming under the same budget would only defer the articles again
+        logger.warning("Run %s is not queued for --resume-pending: its budget is spent.", run_id)
+    try:
+        os.remove(PENDING_RUN_PATH)
+    except FileNotFoundError:
+        pass
+
+
+def run_pipeline(resume_run_id=None, profile=False, resume_pending=False):
+    """
+    Runs all folders. Pass `resume_run_id` to continue a previous run from its
+    checkpoint instead of starting a fresh one. With `resume_pending`, the run recorded
+    by an earlier invocation that left deferred or failed articles (PENDING_RUN_PATH) is
+    resumed if there is one; otherwise a fresh run starts. The scheduled workflow uses
+    this so work deferred at the run deadline continues in the next job.
+
+    With `profile` (or PIPELINE_PROFILE=1) the extraction and Excel stages are run under
+    cProfile and tracemalloc; see src/profiling.py. Metrics and profiles are written to
+    .pipeline_state/runs/<run_id>.metrics.json and <run_id>.profile/.
+    """
+    resumes = 0
+    if resume_pending and not resume_run_id:
+        resume_run_id, resumes = _load_pending_run()
+        resumes += bool(resume_run_id)
+    if resume_run_id:
+        if not RunCheckpoint.exists(resume_run_id):
+            raise RuntimeError(f"No checkpoint found for run {resume_run_id}.")
+        run_id = resume_run_id
+        logger.info("Pipeline resumed (run %s).", run_id)
+    else:
+        run_id = new_run_id()
+        logger.info("Pipeline started (run %s; resume with: python main.py --resume %s).", run_id, run_id)
+    checkpoint = RunCheckpoint(run_id)
+    metrics.reset(run_id)
+    run_budget.start_run(*(_prior_spend(run_id) if resume_run_id else (0.0, 0)))
+    text_store.open_run_store(run_id)
+    headline_screen.start_run()
+    if profile:
+        profiler.enable()
+    profiler.start()
     openai_key = os.getenv("OPENAI_APIKEY")
 
     # Step 1: Get a valid token.
@@ -64,154 +502,64 @@ def run_pipeline():
         "LeadIT-Steel": STEEL_NO,
     }
 
-    # Create GPT client
+    # Create GPT client (thread-safe; shared by all folder workers)
     openai_client, gpt_model, _ = new_openai_session(openai_key)
 
     any_folder_failed = False
 
-    for folder, target_questions in folder_questions.items():
-        domain = folder.split("-")[-1].lower()
-        logger.info("Processing folder: %s", folder)
-
-        try:
-            headlines = build_df_for_folder(folder, access_token)
-            logger.info("Fetched %d headlines from folder %s.", len(headlines), folder)
-
-            if headlines.empty:
-                logger.error("No headlines fetched for folder: %s", folder)
-                # Treat this as a failure for alerting, but continue to other folders
-                any_folder_failed = True
-                continue
-
-            headlines["url"] = headlines["url"].apply(resolve_with_playwright)
-            headlines["text_column"] = headlines["title"] + " " + headlines.get("summary", "")
-
-            relevance_df = query_gpt_for_relevance_iterative(
-                df=headlines,
-                target_questions=target_questions,
-                run_on_full_text=True,
-                gpt_client=openai_client,
-                gpt_model=gpt_model,
-            )
-
-            relevant_articles = []
-            irrelevant_articles = []
-
-            for _, row in relevance_df.iterrows():
-                article_row = headlines.loc[row["index"]].copy()
-                article_row["title"] = article_row["title"].split(" - ")[0].strip()
-                url = article_row["url"]
-                discard_reason = None
-
+    # Folders are dominated by network and API waits, so run them side by side
+    try:
+        with ThreadPoolExecutor(max_workers=FOLDER_WORKERS, thread_name_prefix="folder") as pool:
+            futures = {
+                pool.submit(_run_folder, folder, target_questions, access_token, openai_client, gpt_model, checkpoint): folder
+                for folder, target_questions in folder_questions.items()
+            }
+            for future in as_completed(futures):
+                folder = futures[future]
                 try:
-                    if row["relevant"] != "no":
-                        # Fetch full text
-                        try:
-                            full_text = fetch_full_article_text({"url": url})
-                            if full_text == "":
-                                discard_reason = "Failed to fetch text"
-                        except Exception as e:
-                            discard_reason = "source blocks web scraping bots"
-                            logger.error("Error fetching article from %s: %s", url, e)
-                            full_text = ""
-
-                        domain_local = folder.removeprefix("LeadIT-") if hasattr(str, "removeprefix") else (
-                            folder[7:] if folder.startswith("LeadIT-") else folder
-                        )
-
-                        project_query = (
-                            f"Based on the article below, is this about a project, plant, or demonstration in {domain_local}? "
-                            f"Does it mention a project, plant, or demonstration in green {domain_local}? "
-                            "This can include funding or contract/partnership updates and does it include some details about that project? "
-                            "Answer ONLY as JSON with exactly one key “answer” whose value is “yes” or “no”.\n\n"
-                            "Article text:\n\"\"\"\n" + full_text + "\n\"\"\""
-                        )
-
-                        try:
-                            resp = fetch_variable_info(openai_client, gpt_model, project_query, run_on_full_text=True)
-                            is_project = resp.get("answer", "").strip().lower() == "yes"
-                        except Exception as e:
-                            logger.exception("Project yes/no gate failed for %s: %s", url, e)
-                            is_project = False
-                            if discard_reason is None:
-                                discard_reason = f"Project classification failed: {e}"
-
-                        if is_project:
-                            if folder == "LeadIT-Cement":
-                                technologies = CEMENT_TECH
-                            else:
-                                technologies = STEEL_IRON_TECH
-
-                            try:
-                                details = query_gpt_for_project_details(
-                                    openai_client,
-                                    gpt_model,
-                                    full_text,
-                                    technologies,
-                                    domain_local,
-                                )
-                            except Exception as e:
-                                logger.exception("Project detail extraction failed for %s: %s", url, e)
-                                details = {}
-                                if discard_reason is None:
-                                    discard_reason = f"Project detail extraction failed: {e}"
-
-                        else:
-                            details = {}
-                            if discard_reason is None:
-                                discard_reason = f"This article did not seem to be about a green {domain_local} project."
-
-                        article_info = {
-                            "title": article_row["title"],
-                            "url": url,
-                            "full_text": full_text,
-                            "discard_reason": discard_reason,
-                            **details,
-                        }
-                        relevant_articles.append(article_info)
-
-                    else:
-                        irrelevant_articles.append(
-                            {
-                                "title": article_row["title"],
-                                "url": url,
-                                "discard_reason": discard_reason,
-                            }
-                        )
-
-                except Exception as article_exc:
-                    # One article is bad; log & move on
-                    logger.exception(
-                        "Error processing article '%s' in folder %s: %s",
-                        article_row.get("title", "Unknown Title"),
-                        folder,
-                        article_exc,
-                    )
-                    irrelevant_articles.append(
-                        {
-                            "title": article_row.get("title", "Unknown Title"),
-                            "url": url,
-                            "discard_reason": f"Pipeline error: {article_exc}",
-                        }
-                    )
-
-            folder_df = pd.DataFrame(relevant_articles)
-            output_fname = get_output_fname(folder, filetype="xlsx")
-            output_results_excel(folder_df, irrelevant_articles, output_fname, domain=domain)
-
-        except Exception as folder_exc:
-            any_folder_failed = True
-            logger.exception("Folder %s failed: %s", folder, folder_exc)
+                    if not future.result():
+                        any_folder_failed = True
+                except Exception as folder_exc:
+                    any_folder_failed = True
+                    logger.exception("Folder %s failed: %s", folder, folder_exc)
+    finally:
+        prefix = _artifact_prefix(run_id, resumed=bool(resume_run_id))
+        _write_run_metrics(prefix, checkpoint, resumed=bool(resume_run_id))
+        if profiler.enabled:
+            summary_path = profiler.write_report(f"{prefix}.profile")
+            if summary_path:
+                logger.info("Profile summary: %s", summary_path)
+            profiler.stop()
+        _save_pending_run(run_id, resumes, [f for f in folder_questions if not checkpoint.folder_uploaded(f)])
+        checkpoint.close()
+        # cached texts point into the run's store, so both go together
+        extraction_cache.clear()
+        text_store.close_run_store()
 
     if any_folder_failed:
         # This makes the overall pipeline fail in CI while still producing partial outputs.
-        raise RuntimeError("One or more folders failed. See logs for details.")
+        raise RuntimeError(
+            f"One or more folders failed. See logs for details; resume with: python main.py --resume {run_id}"
+        )
     else:
         logger.info("Pipeline completed successfully.")
+    deferred = run_budget.state()["events"].get("deferred", 0)
+    if deferred:
+        logger.warning("%d articles were deferred (%s); resume with: python main.py --resume %s "
+                       "(raising GPT_RUN_BUDGET_USD if the budget ran out)", deferred, run_budget.deferral_reason(), run_id)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the headline processing pipeline.")
+    parser.add_argument("--resume", metavar="RUN_ID", help="continue a previous run from its checkpoint")
+    parser.add_argument("--resume-pending", action="store_true",
+                        help="continue the last run left with deferred or failed articles, if any; else start a new run")
+    parser.add_argument("--profile", action="store_true", help="profile extraction and Excel stages (cProfile + tracemalloc)")
+    return parser.parse_args(argv)
 
 if __name__ == "__main__":
+    args = parse_args()
     try:
-        run_pipeline()
+        run_pipeline(resume_run_id=args.resume, profile=args.profile, resume_pending=args.resume_pending)
     except Exception:
         logger.exception("Pipeline failed.")
-        raise
\ No newline at end of file
+        raise
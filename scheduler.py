@@ -1,20 +1,207 @@
+"""
+Long-lived pipeline worker.
+
+Runs the weekly job from a single process so imports, the shared HTTP session, the
+OpenAI client, the Playwright browsers and the domain profiles stay warm between runs.
+Large per-run buffers (extracted article texts, archive snapshots) are dropped after
+every run.
+
+A small HTTP endpoint on localhost (WORKER_HTTP_PORT, default 8787; 0 disables it)
+reports on the worker and accepts ad-hoc runs:
+
+    GET  /health            status, uptime, current/last run and next scheduled run
+    GET  /metrics           stage metrics of the running or the last finished run
+    POST /run[?resume=ID]   start a run now (409 while one is in progress)
+"""
+import gc
+import os
+import sys
+import json
+import time
+import ctypes
 import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
 import pytz
 from apscheduler.schedulers.blocking import BlockingScheduler
 from main import run_pipeline
+from src import archive, extraction_cache
+from src.inoreader import browsers_running, shutdown_browsers
+from src.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+WORKER_HTTP_HOST = os.getenv("WORKER_HTTP_HOST", "127.0.0.1")
+WORKER_HTTP_PORT = int(os.getenv("WORKER_HTTP_PORT", 8787))
+
+
+def _rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return round(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20, 1)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def release_run_buffers():
+    """
+    Drops the caches that only matter within a run and hands freed heap back to the OS,
+    so a worker idling between weekly jobs does not hold on to a run's article texts.
+    Warm state (HTTP pool, OpenAI client, browsers, domain profiles) is kept.
+    """
+    extraction_cache.clear()
+    archive.clear_cache()
+    gc.collect()
+    if sys.platform.startswith("linux"):
+        try:
+            ctypes.CDLL("libc.so.6").malloc_trim(0)
+        except (OSError, AttributeError):
+            pass
+
+
+class PipelineWorker:
+    """Runs the pipeline at most once at a time, for the scheduler and for ad-hoc requests."""
+
+    def __init__(self, scheduler=None):
+        self.scheduler = scheduler
+        self.started_at = time.time()
+        self.runs = 0
+        self.current = None
+        self.last = None
+        self.last_metrics = None
+        self._lock = threading.Lock()
+
+    def _claim(self, resume_run_id, trigger):
+        with self._lock:
+            if self.current is not None:
+                logger.warning("Skipping %s run: a %s run is still in progress.", trigger, self.current["trigger"])
+                return False
+            self.current = {"trigger": trigger, "resume": resume_run_id, "started_at": time.time()}
+            return True
+
+    def run(self, resume_run_id=None, trigger="schedule"):
+        """Runs the pipeline on the calling thread; returns False if a run is already in progress."""
+        if not self._claim(resume_run_id, trigger):
+            return False
+        self._execute(resume_run_id)
+        return True
+
+    def _execute(self, resume_run_id):
+        status, error = "ok", None
+        try:
+            run_pipeline(resume_run_id=resume_run_id)
+        except Exception as e:
+            status, error = "failed", str(e)
+            logger.exception("Pipeline run failed.")
+        finally:
+            summary = metrics.run_summary()
+            with self._lock:
+                finished = dict(self.current, run_id=summary["run_id"], finished_at=time.time(),
+                                status=status, error=error)
+                finished["wall_s"] = round(finished["finished_at"] - finished["started_at"], 1)
+                self.last, self.last_metrics, self.current = finished, summary, None
+                self.runs += 1
+            release_run_buffers()
+            logger.info("Run %s finished (%s) in %.1fs; RSS after release: %s MB",
+                        finished["run_id"], status, finished["wall_s"], _rss_mb())
+
+    def start_adhoc(self, resume_run_id=None):
+        """Starts a run on a background thread; returns False if one is already in progress."""
+        if not self._claim(resume_run_id, "adhoc"):
+            return False
+        threading.Thread(target=self._execute, args=(resume_run_id,), name="adhoc-run", daemon=True).start()
+        return True
+
+    def health(self):
+        with self._lock:
+            current = dict(self.current, run_id=metrics.run_id) if self.current else None
+            state = {
+                "status": "running" if current else "idle",
+                "uptime_s": round(time.time() - self.started_at, 1),
+                "runs": self.runs,
+                "current_run": current,
+                "last_run": self.last,
+            }
+        state["rss_mb"] = _rss_mb()
+        state["browsers"] = browsers_running()
+        if self.scheduler is not None:
+            jobs = [job.next_run_time for job in self.scheduler.get_jobs() if job.next_run_time]
+            state["next_run"] = min(jobs).isoformat() if jobs else None
+        return state
+
+    def run_metrics(self):
+        with self._lock:
+            if self.current is not None:
+                return metrics.run_summary()
+            return self.last_metrics or {}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "PipelineWorker/1.0"
+
+    def log_message(self, fmt, *args):
+        logger.debug("worker http: " + fmt, *args)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, indent=2, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        worker = self.server.worker
+        path = urlparse(self.path).path.rstrip("/")
+        if path == "/health":
+            return self._send_json(200, worker.health())
+        if path == "/metrics":
+            return self._send_json(200, worker.run_metrics())
+        return self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        worker = self.server.worker
+        parsed = urlparse(self.path)
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if parsed.path.rstrip("/") != "/run":
+            return self._send_json(404, {"error": "not found"})
+        resume = (parse_qs(parsed.query).get("resume") or [None])[0]
+        if not worker.start_adhoc(resume_run_id=resume):
+            return self._send_json(409, {"error": "a run is already in progress", "health": worker.health()})
+        return self._send_json(202, {"accepted": True, "resume": resume})
+
+
+def serve_http(worker, host=WORKER_HTTP_HOST, port=WORKER_HTTP_PORT):
+    """Starts the health/metrics endpoint on a daemon thread; returns the server."""
+    httpd = ThreadingHTTPServer((host, port), _Handler)
+    httpd.daemon_threads = True
+    httpd.worker = worker
+    threading.Thread(target=httpd.serve_forever, name="worker-http", daemon=True).start()
+    logger.info("Worker endpoint on http://%s:%d (/health, /metrics, POST /run)", *httpd.server_address[:2])
+    return httpd
+
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
-    
+
     # Set the timezone to Eastern Time
     eastern = pytz.timezone("US/Eastern")
     scheduler = BlockingScheduler(timezone=eastern)
-    
+    worker = PipelineWorker(scheduler)
+
     # Schedule to run every Monday at midnight (00:00 ET)
-    scheduler.add_job(run_pipeline, 'cron', day_of_week='mon', hour=1, minute=13)
-    
+    scheduler.add_job(worker.run, 'cron', day_of_week='mon', hour=1, minute=13,
+                      max_instances=1, coalesce=True, misfire_grace_time=3600)
+    httpd = serve_http(worker) if WORKER_HTTP_PORT else None
+
     logging.info("Scheduler started; pipeline will run every Monday at midnight ET.")
     try:
         scheduler.start()
     except (KeyboardInterrupt, SystemExit):
         logging.info("Scheduler stopped.")
+    finally:
+        if httpd is not None:
+            httpd.shutdown()
+        shutdown_browsers()
@@ -0,0 +1,81 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+import requests
+from src.http_pool import get_session
+
+logger = logging.getLogger(__name__)
+
+AVAILABILITY_API = "https://archive.org/wayback/available"
+ARCHIVE_WORKERS = 8
+LOOKUP_TIMEOUT_S = 15
+
+_lock = threading.Lock()
+_executor = None
+# original url -> snapshot dict ({"original", "timestamp", "url"}) or None when nothing is archived
+_snapshots = {}
+
+
+def executor() -> ThreadPoolExecutor:
+    """Shared pool for archive lookups and snapshot downloads."""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=ARCHIVE_WORKERS, thread_name_prefix="archive")
+        return _executor
+
+
+def raw_snapshot_url(snapshot: dict) -> str:
+    """
+    The `id_` variant of a snapshot serves the archived bytes as captured,
+    without the Wayback toolbar or iframe wrapper.
+    """
+    return f"https://web.archive.org/web/{snapshot['timestamp']}id_/{snapshot['original']}"
+
+
+def _query_availability(url: str, sess: requests.Session):
+    api = f"{AVAILABILITY_API}?url={quote(url, safe='')}"
+    try:
+        r = sess.get(api, timeout=LOOKUP_TIMEOUT_S)
+        r.raise_for_status()
+        closest = r.json().get("archived_snapshots", {}).get("closest", {})
+    except Exception as e:
+        logger.warning("Wayback availability lookup failed for %s: %s", url, e)
+        return None
+    if not closest.get("available") or not closest.get("timestamp"):
+        return {"original": url, "timestamp": None, "url": None}
+    return {"original": url, "timestamp": closest["timestamp"], "url": closest.get("url")}
+
+
+def lookup_snapshots(urls) -> dict:
+    """
+    Resolves the latest snapshot for every url in `urls` concurrently.
+    Results (including misses) are cached for the life of the process; failed lookups are not.
+    Returns {url: snapshot or None}.
+    """
+    with _lock:
+        todo = [u for u in dict.fromkeys(urls) if u not in _snapshots]
+    if todo:
+        sess = get_session()
+        if len(todo) == 1:
+            # single lookups run inline so pool workers never block on the pool
+            found = [_query_availability(todo[0], sess)]
+        else:
+            found = executor().map(lambda u: _query_availability(u, sess), todo)
+        for url, snap in zip(todo, found):
+            if snap is None:
+                continue
+            with _lock:
+                _snapshots[url] = snap if snap["timestamp"] else None
+    with _lock:
+        return {u: _snapshots.get(u) for u in urls}
+
+
+def lookup_snapshot(url: str):
+    return lookup_snapshots([url]).get(url)
+
+
+def clear_cache():
+    with _lock:
+        _snapshots.clear()
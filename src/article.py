@@ -0,0 +1,120 @@
+from typing import Iterator, List, Optional
+
+
+class Article:
+    """
+    One feed item as it moves through the stages of a folder run: headline screen,
+    full-text fetch, project gate and detail extraction.
+
+    Uses __slots__ rather than a dict per article (Python 3.9 has no dataclass(slots=True)).
+    `full_text` is a TextHandle into the run's text store (src/text_store.py), or a
+    plain string for articles restored from a checkpoint; release_text() drops it once
+    the workbook row and the checkpoint have been written. GPT details (core, additional
+    and numeric facts) are kept in `details`, and get() reads fields and details alike,
+    so the workbook code can treat an Article like the article dicts it used to get.
+    """
+
+    __slots__ = ("key", "title", "url", "relevant", "outcome", "gate",
+                 "discard_reason", "full_text", "details")
+
+    def __init__(self, key: str, title: str = "", url: str = "", relevant: Optional[str] = None):
+        self.key = key
+        self.title = title
+        self.url = url
+        self.relevant = relevant
+        self.outcome = None
+        self.gate = None
+        self.discard_reason = None
+        self.full_text = None
+        self.details = {}
+
+    def __repr__(self):
+        return f"Article({self.key!r}, outcome={self.outcome!r}, title={self.title[:40]!r})"
+
+    def get(self, name: str, default=None):
+        if name in Article.__slots__:
+            value = getattr(self, name)
+            return default if value is None else value
+        return self.details.get(name, default)
+
+    def release_text(self):
+        self.full_text = None
+
+    def to_record(self) -> dict:
+        """What the checkpoint stores to rebuild the workbook row (full text excluded)."""
+        record = {"title": self.title, "url": self.url, "discard_reason": self.discard_reason}
+        record.update(self.details)
+        return record
+
+    @classmethod
+    def from_record(cls, key: str, outcome: str, record: dict, full_text: Optional[str] = None):
+        record = dict(record)
+        article = cls(key, record.pop("title", ""), record.pop("url", ""))
+        article.outcome = outcome
+        article.discard_reason = record.pop("discard_reason", None)
+        article.full_text = full_text
+        article.details = record
+        return article
+
+
+class ArticleBatch:
+    """
+    Columnar container for one folder's feed items: one list per column instead of a
+    DataFrame, so the per-article loop does no row copies or Series lookups.
+    Records in and out use the same keys as the Inoreader feed parser
+    (title, url, date_published, tags, id), so headline checkpoints stay compatible.
+    The feed's summary HTML is not kept; no stage reads it.
+    """
+
+    def __init__(self, ids: List[str], titles: List[str], urls: List[str],
+                 published: List[str], tags: List[str]):
+        self.ids = ids
+        self.titles = titles
+        self.urls = urls
+        self.published = published
+        self.tags = tags
+        self.keys = [_article_key(i, u, n) for n, (i, u) in enumerate(zip(ids, urls))]
+
+    @classmethod
+    def from_records(cls, records: List[dict]) -> "ArticleBatch":
+        def column(name):
+            return [_as_str(r.get(name)) for r in records]
+        return cls(column("id"), column("title"), column("url"), column("date_published"), column("tags"))
+
+    def to_records(self) -> List[dict]:
+        return [
+            {"id": i, "title": t, "url": u, "date_published": p, "tags": g}
+            for i, t, u, p, g in zip(self.ids, self.titles, self.urls, self.published, self.tags)
+        ]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def screen_texts(self) -> List[str]:
+        """Headline text sent to the relevance screen (title incl. source suffix, as before)."""
+        return [f"{title} " for title in self.titles]
+
+    def article(self, idx: int, relevant: Optional[str] = None) -> Article:
+        """Builds the Article for row `idx`, with the ' - Source' suffix stripped from the title."""
+        return Article(self.keys[idx], self.titles[idx].split(" - ")[0].strip(), self.urls[idx], relevant)
+
+    def articles(self, verdicts: List[str]) -> Iterator[Article]:
+        for idx, relevant in enumerate(verdicts):
+            yield self.article(idx, relevant)
+
+
+def _as_str(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float) and value != value:  # NaN from older DataFrame-based checkpoints
+        return ""
+    return str(value)
+
+
+def _article_key(item_id: str, url: str, idx: int) -> str:
+    """Stable per-article id for checkpoints: the Inoreader item id, else the feed URL, else the row index."""
+    for val in (item_id, url):
+        if val and val != "Unknown":
+            return val
+    return f"row-{idx}"
+
@@ -0,0 +1,142 @@
+import os
+import time
+import logging
+import threading
+
+from src.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Per-run cap on OpenAI spend in USD (priced at src/metrics.MODEL_PRICES); 0 disables it
+RUN_BUDGET_USD = float(os.getenv("GPT_RUN_BUDGET_USD", "20"))
+# Optional cap on prompt + completion tokens per run; 0 disables it
+RUN_BUDGET_TOKENS = int(os.getenv("GPT_RUN_BUDGET_TOKENS", "0"))
+
+# Degradation levels, entered at these fractions of the budget:
+#   truncate  - article text in the gate and extraction prompts is cut to TRUNCATE_CHARS
+#   lean      - numeric-fact extraction is skipped as well
+#   defer     - no new articles or headlines are started; they are left for a resume
+#   exhausted - every further GPT call raises BudgetExceededError
+LEVELS = ["normal", "truncate", "lean", "defer", "exhausted"]
+TRUNCATE_AT = float(os.getenv("BUDGET_TRUNCATE_AT", "0.7"))
+LEAN_AT = float(os.getenv("BUDGET_LEAN_AT", "0.85"))
+DEFER_AT = float(os.getenv("BUDGET_DEFER_AT", "0.95"))
+TRUNCATE_CHARS = int(os.getenv("BUDGET_TRUNCATE_CHARS", "12000"))
+
+# Wall-clock budget per run invocation in minutes (0: none). Past it no new articles are
+# started, so the workbooks are still uploaded before e.g. the CI job limit ends the run.
+RUN_DEADLINE_MIN = float(os.getenv("PIPELINE_DEADLINE_MIN", "0"))
+
+
+class BudgetExceededError(RuntimeError):
+    """Raised instead of sending a GPT call once the run budget is spent."""
+
+
+class RunBudget:
+    """
+    Tracks what a run spends on OpenAI (per stage and per folder) against the per-run caps,
+    and the run's wall-clock deadline, and tells the pipeline how far to degrade. Spending
+    is charged by the GPT call wrapper in src/query_gpt.py after every response; calls in
+    flight when a threshold is crossed still complete, so a run can end slightly over its cap.
+    """
+
+    def __init__(self, usd: float = RUN_BUDGET_USD, tokens: int = RUN_BUDGET_TOKENS):
+        self.usd = usd
+        self.tokens = tokens
+        self._lock = threading.Lock()
+        self.start_run()
+
+    def start_run(self, spent_usd: float = 0.0, spent_tokens: int = 0, deadline_min: float = RUN_DEADLINE_MIN):
+        """Resets the tracker; a resumed run passes what its earlier invocations spent."""
+        with self._lock:
+            self.deadline = time.monotonic() + deadline_min * 60 if deadline_min > 0 else None
+            self.spent_usd = spent_usd
+            self.spent_tokens = spent_tokens
+            self.by_stage = {}
+            self.by_folder = {}
+            self.events = {}
+            self._level = 0
+        self._update_level()
+
+    def fraction(self) -> float:
+        """Share of the tighter of the two caps spent so far (0.0 without caps)."""
+        usd = self.spent_usd / self.usd if self.usd > 0 else 0.0
+        tokens = self.spent_tokens / self.tokens if self.tokens > 0 else 0.0
+        return max(usd, tokens)
+
+    def _update_level(self):
+        f = self.fraction()
+        level = 4 if f >= 1.0 else 3 if f >= DEFER_AT else 2 if f >= LEAN_AT else 1 if f >= TRUNCATE_AT else 0
+        with self._lock:
+            if level <= self._level:
+                return
+            self._level = level
+        logger.warning("Run budget %.0f%% spent ($%.2f of $%.2f); degrading to level '%s'.",
+                       100 * f, self.spent_usd, self.usd, LEVELS[level])
+
+    def charge(self, stage: str, cost_usd: float, tokens: int):
+        folder = metrics.current_folder()
+        with self._lock:
+            self.spent_usd += cost_usd
+            self.spent_tokens += tokens
+            self.by_stage[stage] = self.by_stage.get(stage, 0.0) + cost_usd
+            if folder:
+                self.by_folder[folder] = self.by_folder.get(folder, 0.0) + cost_usd
+        self._update_level()
+
+    @property
+    def level(self) -> str:
+        return LEVELS[self._level]
+
+    def note(self, event: str):
+        """Counts a degradation applied (e.g. 'truncated', 'numeric_skipped', 'deferred')."""
+        with self._lock:
+            self.events[event] = self.events.get(event, 0) + 1
+
+    def check(self, stage: str):
+        if self._level >= 4:
+            self.note("calls_refused")
+            raise BudgetExceededError(
+                f"run budget spent (${self.spent_usd:.2f} of ${self.usd:.2f}); {stage} call not sent")
+
+    def truncate(self, text: str) -> str:
+        """`text`, cut to TRUNCATE_CHARS once the budget reaches the truncate level."""
+        if self._level >= 1 and text and len(text) > TRUNCATE_CHARS:
+            self.note("truncated")
+            return text[:TRUNCATE_CHARS]
+        return text
+
+    def skip_numeric(self) -> bool:
+        if self._level >= 2:
+            self.note("numeric_skipped")
+            return True
+        return False
+
+    def past_deadline(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def defer_new_work(self) -> bool:
+        return self._level >= 3 or self.past_deadline()
+
+    def deferral_reason(self) -> str:
+        return f"run budget {self.level}" if self._level >= 3 else "run deadline reached"
+
+    def state(self) -> dict:
+        """Budget section of the run summary."""
+        with self._lock:
+            return {
+                "cap_usd": self.usd,
+                "cap_tokens": self.tokens,
+                "spent_usd": round(self.spent_usd, 6),
+                "spent_tokens": self.spent_tokens,
+                "fraction": round(self.fraction(), 4),
+                "level": LEVELS[self._level],
+                "past_deadline": self.past_deadline(),
+                "events": dict(self.events),
+                "by_stage": {k: round(v, 6) for k, v in sorted(self.by_stage.items())},
+                "by_folder": {k: round(v, 6) for k, v in sorted(self.by_folder.items())},
+            }
+
+
+# The budget of the current run (one run at a time per process)
+run_budget = RunBudget()
@@ -0,0 +1,180 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from src.article import Article
+from src.text_store import read_text
+
+logger = logging.getLogger(__name__)
+
+RUNS_DIR = os.path.join(os.getenv("PIPELINE_STATE_DIR", ".pipeline_state"), "runs")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS run_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS folders (
+    folder TEXT PRIMARY KEY,
+    headlines TEXT,
+    status TEXT,
+    updated_at REAL
+);
+CREATE TABLE IF NOT EXISTS articles (
+    folder TEXT NOT NULL,
+    article_key TEXT NOT NULL,
+    resolved_url TEXT,
+    relevant TEXT,
+    outcome TEXT,
+    text_hash TEXT,
+    full_text BLOB,
+    gate TEXT,
+    article TEXT,
+    updated_at REAL,
+    PRIMARY KEY (folder, article_key)
+);
+"""
+
+
+def new_run_id() -> str:
+    return datetime.now().strftime("%Y%m%d_%H%M%S")
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256((text or "").encode("utf-8", "replace")).hexdigest()
+
+
+class RunCheckpoint:
+    """
+    Per-run SQLite store of stage outputs, written as each article completes, so a
+    crashed run can be continued with `python main.py --resume <run_id>`.
+
+    Per folder it keeps the fetched headlines, the name its workbook is uploaded under and
+    whether that workbook is complete (no article deferred or failed).
+    Per article (keyed by Inoreader item id) it keeps the resolved URL, the headline
+    relevance verdict and, once the article is finished, its outcome
+    ('relevant' | 'irrelevant'), project gate result, the article dict written to the
+    workbook (details, discard reason) and its full text (zlib) with a SHA-256 hash.
+    """
+
+    def __init__(self, run_id: str, runs_dir: str = None):
+        self.run_id = run_id
+        self.path = os.path.join(runs_dir or RUNS_DIR, f"{run_id}.sqlite")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._db.execute(
+            "INSERT OR IGNORE INTO run_meta (key, value) VALUES ('created_at', ?)", (datetime.now().isoformat(),)
+        )
+
+    @classmethod
+    def exists(cls, run_id: str, runs_dir: str = None) -> bool:
+        return os.path.exists(os.path.join(runs_dir or RUNS_DIR, f"{run_id}.sqlite"))
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # -------------------- folders --------------------
+    def save_headlines(self, folder: str, records: list):
+        self._execute(
+            "INSERT INTO folders (folder, headlines, status, updated_at) VALUES (?, ?, 'started', ?) "
+            "ON CONFLICT(folder) DO UPDATE SET headlines = excluded.headlines, updated_at = excluded.updated_at",
+            (folder, json.dumps(records, default=str), time.time()),
+        )
+
+    def load_headlines(self, folder: str):
+        """Headline records saved for `folder`, or None if the folder was never fetched in this run."""
+        rows = self._execute("SELECT headlines FROM folders WHERE folder = ?", (folder,))
+        if not rows or rows[0][0] is None:
+            return None
+        return json.loads(rows[0][0])
+
+    def mark_folder_uploaded(self, folder: str):
+        self._execute("UPDATE folders SET status = 'uploaded', updated_at = ? WHERE folder = ?", (time.time(), folder))
+
+    def folder_uploaded(self, folder: str) -> bool:
+        rows = self._execute("SELECT status FROM folders WHERE folder = ?", (folder,))
+        return bool(rows) and rows[0][0] == "uploaded"
+
+    def output_name(self, folder: str):
+        """OneDrive name of the folder's workbook if it was uploaded before in this run, else None."""
+        rows = self._execute("SELECT value FROM run_meta WHERE key = ?", (f"output:{folder}",))
+        return rows[0][0] if rows else None
+
+    def record_output_name(self, folder: str, name: str):
+        self._execute("INSERT OR REPLACE INTO run_meta (key, value) VALUES (?, ?)", (f"output:{folder}", name))
+
+    # -------------------- articles --------------------
+    def _upsert(self, folder: str, key: str, **fields):
+        fields["updated_at"] = time.time()
+        cols = ", ".join(fields)
+        marks = ", ".join("?" for _ in fields)
+        updates = ", ".join(f"{c} = excluded.{c}" for c in fields)
+        self._execute(
+            f"INSERT INTO articles (folder, article_key, {cols}) VALUES (?, ?, {marks}) "
+            f"ON CONFLICT(folder, article_key) DO UPDATE SET {updates}",
+            (folder, key, *fields.values()),
+        )
+
+    def resolved_url(self, folder: str, key: str):
+        rows = self._execute(
+            "SELECT resolved_url FROM articles WHERE folder = ? AND article_key = ?", (folder, key)
+        )
+        return rows[0][0] if rows else None
+
+    def record_resolved_url(self, folder: str, key: str, url: str):
+        self._upsert(folder, key, resolved_url=url)
+
+    def relevance(self, folder: str, key: str):
+        rows = self._execute("SELECT relevant FROM articles WHERE folder = ? AND article_key = ?", (folder, key))
+        return rows[0][0] if rows else None
+
+    def record_relevance(self, folder: str, key: str, relevant: str):
+        self._upsert(folder, key, relevant=relevant)
+
+    def record_article(self, folder: str, article: Article):
+        """Marks an article finished, storing what the workbook needs to rebuild its row."""
+        full_text = read_text(article.full_text)
+        self._upsert(
+            folder, article.key,
+            outcome=article.outcome,
+            gate=article.gate,
+            text_hash=text_hash(full_text) if full_text else None,
+            full_text=zlib.compress(full_text.encode("utf-8")) if full_text else None,
+            article=json.dumps(article.to_record(), default=str),
+        )
+
+    def is_finished(self, folder: str, key: str) -> bool:
+        rows = self._execute(
+            "SELECT outcome IS NOT NULL FROM articles WHERE folder = ? AND article_key = ?", (folder, key)
+        )
+        return bool(rows and rows[0][0])
+
+    def finished_article(self, folder: str, key: str):
+        """Returns the finished Article (incl. full_text) for `key`, else None."""
+        rows = self._execute(
+            "SELECT outcome, article, full_text FROM articles WHERE folder = ? AND article_key = ?", (folder, key)
+        )
+        if not rows or not rows[0][0]:
+            return None
+        outcome, article_json, blob = rows[0]
+        full_text = zlib.decompress(blob).decode("utf-8") if blob else None
+        return Article.from_record(key, outcome, json.loads(article_json or "{}"), full_text)
+
+    def summary(self) -> dict:
+        rows = self._execute(
+            "SELECT folder, COUNT(*), SUM(outcome IS NOT NULL) FROM articles GROUP BY folder"
+        )
+        return {folder: {"articles": total, "finished": done or 0} for folder, total, done in rows}
@@ -0,0 +1,126 @@
+import os
+import json
+import time
+import logging
+import threading
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+STATE_DIR = os.getenv("PIPELINE_STATE_DIR", ".pipeline_state")
+PROFILE_PATH = os.getenv("DOMAIN_PROFILE_PATH", os.path.join(STATE_DIR, "domain_profiles.json"))
+
+# Fetch routes and extractors in the order the fetcher tries them by default
+ROUTES = ["direct", "archive"]
+EXTRACTORS = ["trafilatura", "newspaper", "soup"]
+
+# Every REPROBE_EVERY-th article from a domain ignores the learned profile and walks the full chain
+REPROBE_EVERY = 10
+# Weight of the newest observation in the moving average of timings
+TIMING_ALPHA = 0.3
+
+_lock = threading.Lock()
+_profiles = None
+
+
+def domain_of(url: str) -> str:
+    try:
+        netloc = urlparse(url).netloc.lower()
+    except Exception:
+        return ""
+    netloc = netloc.split("@")[-1].split(":")[0]
+    return netloc[4:] if netloc.startswith("www.") else netloc
+
+
+def _load():
+    global _profiles
+    if _profiles is None:
+        try:
+            with open(PROFILE_PATH, "r", encoding="utf-8") as f:
+                _profiles = json.load(f)
+        except FileNotFoundError:
+            _profiles = {}
+        except Exception as e:
+            logger.warning("Could not read domain profiles from %s: %s", PROFILE_PATH, e)
+            _profiles = {}
+    return _profiles
+
+
+def _profile(domain: str) -> dict:
+    profiles = _load()
+    prof = profiles.get(domain)
+    if prof is None:
+        prof = {"seen": 0, "route": None, "extractor": None, "routes": {}, "extractors": {}}
+        profiles[domain] = prof
+    return prof
+
+
+def save_profiles():
+    """Atomically writes the in-memory profiles to PROFILE_PATH."""
+    with _lock:
+        if _profiles is None:
+            return
+        data = json.dumps(_profiles, indent=1, sort_keys=True)
+    try:
+        os.makedirs(os.path.dirname(PROFILE_PATH) or ".", exist_ok=True)
+        tmp_path = f"{PROFILE_PATH}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, PROFILE_PATH)
+    except Exception as e:
+        logger.warning("Could not persist domain profiles to %s: %s", PROFILE_PATH, e)
+
+
+def start_article(domain: str) -> bool:
+    """
+    Counts an article for `domain` and returns True when it should be re-probed,
+    i.e. run through the full default chain instead of the learned strategy.
+    """
+    with _lock:
+        prof = _profile(domain)
+        prof["seen"] += 1
+        return prof["seen"] % REPROBE_EVERY == 0
+
+
+def preferred_route(domain: str):
+    """Returns the route that last succeeded for `domain`, or None if unknown."""
+    with _lock:
+        return _profile(domain).get("route")
+
+
+def extractor_order(domain: str) -> list:
+    """Default extractor order with the last winner for `domain` moved to the front."""
+    with _lock:
+        winner = _profile(domain).get("extractor")
+    if winner in EXTRACTORS:
+        return [winner] + [e for e in EXTRACTORS if e != winner]
+    return list(EXTRACTORS)
+
+
+def _record(stats: dict, name: str, ok: bool, seconds: float):
+    st = stats.setdefault(name, {"ok": 0, "fail": 0, "avg_s": None, "last_ok": None})
+    if ok:
+        st["ok"] += 1
+        st["last_ok"] = int(time.time())
+    else:
+        st["fail"] += 1
+    prev = st["avg_s"]
+    st["avg_s"] = round(seconds if prev is None else (1 - TIMING_ALPHA) * prev + TIMING_ALPHA * seconds, 3)
+
+
+def record_route(domain: str, route: str, ok: bool, seconds: float):
+    with _lock:
+        prof = _profile(domain)
+        _record(prof["routes"], route, ok, seconds)
+        if ok:
+            prof["route"] = route
+        elif prof.get("route") == route:
+            prof["route"] = None
+
+
+def record_extractor(domain: str, extractor: str, ok: bool, seconds: float):
+    with _lock:
+        prof = _profile(domain)
+        _record(prof["extractors"], extractor, ok, seconds)
+        if ok:
+            prof["extractor"] = extractor
@@ -0,0 +1,89 @@
+import logging
+import threading
+from collections import OrderedDict
+from src import text_store
+
+logger = logging.getLogger(__name__)
+
+MAX_ENTRIES = 2000
+PENDING_WAIT_S = 120
+
+_lock = threading.Lock()
+# url -> TextHandle of the extracted article text in the run's text store (only non-empty results are kept)
+_texts = OrderedDict()
+# url -> Future resolving to extracted text, for background fetches still in flight
+_pending = {}
+
+
+def put(url: str, text: str):
+    if not url or not text:
+        return
+    handle = text_store.put(text)
+    with _lock:
+        _texts[url] = handle
+        _texts.move_to_end(url)
+        while len(_texts) > MAX_ENTRIES:
+            _texts.popitem(last=False)
+
+
+def put_pending(url: str, future):
+    """Registers a background fetch for `url`; its non-empty result is cached when it completes."""
+    with _lock:
+        _pending[url] = future
+
+    def _done(f):
+        with _lock:
+            if _pending.get(url) is not f:
+                # superseded, or dropped by clear() at the end of the run: caching the text
+                # now would open a fresh text store that outlives the run
+                return
+            del _pending[url]
+        try:
+            put(url, f.result())
+        except Exception as e:
+            logger.warning("Background extraction failed for %s: %s", url, e)
+
+    future.add_done_callback(_done)
+
+
+def has(url: str) -> bool:
+    with _lock:
+        return url in _texts or url in _pending
+
+
+def handle(url: str):
+    """TextHandle of the cached text for `url` (None on a miss); does not wait for background fetches."""
+    with _lock:
+        return _texts.get(url)
+
+
+def get(url: str):
+    """
+    Returns the cached text for `url`, waiting for an in-flight background fetch if
+    there is one. Returns None on a miss (including background fetches that came back empty).
+    """
+    with _lock:
+        fut = _pending.get(url)
+        if fut is None:
+            handle = _texts.get(url)
+            if handle is None:
+                return None
+            _texts.move_to_end(url)
+    if fut is None:
+        try:
+            return handle.read()
+        except ValueError:
+            # the run's store was closed underneath a stale entry
+            return None
+    try:
+        text = fut.result(timeout=PENDING_WAIT_S)
+    except Exception as e:
+        logger.warning("Waiting on background extraction for %s failed: %s", url, e)
+        return None
+    return text or None
+
+
+def clear():
+    with _lock:
+        _texts.clear()
+        _pending.clear()
@@ -0,0 +1,36 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+# Connection pool sized for the folder workers plus the archive prefetch pool
+POOL_CONNECTIONS = 32
+POOL_MAXSIZE = 32
+
+_lock = threading.Lock()
+_session = None
+
+
+def get_session() -> requests.Session:
+    """
+    Process-wide requests.Session with a shared, bounded keep-alive pool.
+    Callers pass their own headers and timeouts per request and must not mutate
+    the session's defaults (headers, cookies, auth).
+    """
+    global _session
+    with _lock:
+        if _session is None:
+            sess = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+            sess.mount("http://", adapter)
+            sess.mount("https://", adapter)
+            _session = sess
+        return _session
+
+
+def reset_session():
+    """Closes the shared session and its pooled connections; the next get_session() opens a new one."""
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+            _session = None
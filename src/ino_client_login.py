@@ -3,6 +3,7 @@ import os
 import requests
 import logging
 from dotenv import load_dotenv
+from src.tokens import get_token_manager
 
 # Load environment variables from your .env file
 load_dotenv()
@@ -10,16 +11,19 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def client_login():
+# ClientLogin does not report an expiry; tokens stay valid until revoked, so re-login weekly
+CLIENT_LOGIN_TTL_S = int(os.getenv("INOREADER_TOKEN_TTL_S", 7 * 24 * 60 * 60))
+
+def _request_client_login():
     """
     Use the ClientLogin endpoint to get an Auth token.
     Returns:
-        auth_token (str): The authentication token for API requests.
+        (auth_token, ttl_seconds), or (None, 0) on failure.
     """
     # Read credentials from the environment
     USERNAME = os.getenv("USERNAME")
     PASSWORD = os.getenv("PASSWORD")
-    CLIENT_LOGIN_URL = "https://www.inoreader.com/accounts/ClientLogin"
+    CLIENT_LOGIN_URL = os.getenv("INOREADER_LOGIN_URL", "https://www.inoreader.com/accounts/ClientLogin")
     
     # Set up the required form data
     data = {
@@ -42,14 +46,29 @@ def client_login():
                 break
         if auth_token:
             logger.info("Successfully obtained auth token from ClientLogin.")
-            return auth_token
+            return auth_token, CLIENT_LOGIN_TTL_S
         else:
             logger.error("Auth token not found in ClientLogin response.")
-            return None
+            return None, 0
     else:
         # Handle various errors (503 if backend unreachable, 401 if credentials are invalid)
         logger.error("ClientLogin failed with status %s: %s", response.status_code, response.text)
-        return None
+        return None, 0
+
+def _token_name():
+    return f"inoreader:{os.getenv('USERNAME')}"
+
+def client_login():
+    """
+    Use the ClientLogin endpoint to get an Auth token, reusing a cached token while it is valid.
+    Returns:
+        auth_token (str): The authentication token for API requests.
+    """
+    return get_token_manager().get(_token_name(), _request_client_login)
+
+def invalidate_client_login():
+    """Forgets the cached ClientLogin token, e.g. after Inoreader answered 401."""
+    get_token_manager().invalidate(_token_name())
 
 if __name__ == "__main__":
     token = client_login()
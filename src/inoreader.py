@@ -1,23 +1,32 @@
 import os
 import time
+import queue
+import atexit
 import logging
+import importlib
+import threading
+from concurrent.futures import Future
 import urllib.parse
 from dotenv import load_dotenv
 from requests.exceptions import HTTPError
-from playwright.sync_api import sync_playwright
-from newspaper import Article
 import requests
-import camelot
-import fitz
 import pandas as pd
-import trafilatura
-from src.read_json import parse_inoreader_feed
+from src.read_json import parse_inoreader_items
+from src.article import ArticleBatch
+from src import archive, domain_profiles, extraction_cache
+from src.ino_client_login import client_login, invalidate_client_login
+from src.http_pool import get_session
+from src.metrics import metrics
+from src.profiling import profiled
 
 import io
 import re
 import tempfile
-from urllib.parse import urlparse, urljoin, quote
-from bs4 import BeautifulSoup
+from urllib.parse import urlparse, urljoin
+
+# playwright, newspaper, camelot (OpenCV), fitz, trafilatura and bs4 are imported on first
+# use (see _lazy_import), so importing this module stays cheap for runs and the scheduler
+# that never touch a PDF or a browser.
 
 load_dotenv()
 
@@ -25,21 +34,77 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 CLIENT_ID = os.getenv("INOREADER_CLIENT_ID")
 APP_KEY = os.getenv("INOREADER_KEY")
+# Overridable so runs can be pointed at a local mock (see benchmarks/bench_pipeline.py)
+INOREADER_API_URL = os.getenv("INOREADER_API_URL", "https://www.inoreader.com/reader/api/0").rstrip("/")
+# Set to 0 to never launch a browser; feed URLs are then resolved through HTTP redirects only
+RESOLVE_WITH_PLAYWRIGHT = os.getenv("RESOLVE_WITH_PLAYWRIGHT", "1").lower() not in ("0", "false", "no")
+# Hosts whose links only redirect through JavaScript, so plain HTTP cannot resolve them
+JS_REDIRECT_HOSTS = {"news.google.com", "www.google.com", "google.com"}
+RESOLVE_TIMEOUT_S = 15
+# Headless browsers kept open for JavaScript redirects (one thread each)
+PLAYWRIGHT_BROWSERS = int(os.getenv("PLAYWRIGHT_BROWSERS", 2))
+PLAYWRIGHT_RESOLVE_TIMEOUT_S = 90
 ALLOW_PDF = True
 CAMELOT_PRIMARY_FLAVOR = "lattice"
 CAMELOT_FALLBACK_FLAVOR = "stream"
 CAMELOT_MIN_ROWS = 2
 CAMELOT_MIN_COLS = 2
 
+# Download budgets: bodies are streamed and abandoned once they exceed these
+MAX_HTML_BYTES = 5 * 1024 * 1024
+MAX_PDF_BYTES = 40 * 1024 * 1024
+ARTICLE_DEADLINE_S = 60
+REQUEST_TIMEOUT_S = 20
+STREAM_CHUNK_BYTES = 64 * 1024
+SNIFF_BYTES = 2048
+
+# Media we can never turn into article text; abort as soon as they are seen
+_UNUSABLE_CTYPE_PREFIXES = ("image/", "video/", "audio/", "font/")
+_UNUSABLE_CTYPES = {
+    "application/zip", "application/x-zip-compressed", "application/gzip",
+    "application/x-gzip", "application/x-tar", "application/x-7z-compressed",
+    "application/vnd.rar", "application/x-rar-compressed",
+    "application/vnd.ms-excel", "application/msword", "application/x-msdownload",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+}
+_UNUSABLE_MAGIC = (
+    b"PK\x03\x04",          # zip / office docs
+    b"\x1f\x8b",            # gzip
+    b"\x89PNG",
+    b"\xff\xd8\xff",         # jpeg
+    b"GIF8",
+    b"RIFF",                # webp / wav / avi
+    b"ID3",                 # mp3
+    b"Rar!",
+    b"7z\xbc\xaf",
+    b"\xd0\xcf\x11\xe0",     # legacy office docs
+)
+_META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset=["']?([A-Za-z0-9_.:-]+)""", re.IGNORECASE)
+
+_lazy_modules = {}
+
+def _lazy_import(name: str):
+    """Imports a heavy extraction dependency on first use; None if it is not installed."""
+    if name in _lazy_modules:
+        return _lazy_modules[name]
+    try:
+        # importlib serializes concurrent imports of the same module
+        module = importlib.import_module(name)
+    except ImportError as e:
+        logger.warning(f"{name} is not available: {e}")
+        module = None
+    _lazy_modules[name] = module
+    return module
+
+def _soup(html: str):
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(html, "html.parser")
+
 def _clean_ws(s: str) -> str:
     return re.sub(r"\s+", " ", (s or "")).strip()
 
-def _looks_like_pdf_path(url: str) -> bool:
-    try:
-        return urlparse(url).path.lower().endswith(".pdf")
-    except Exception:
-        return False
-
 def _response_is_pdf(resp) -> bool:
     ctype = (resp.headers.get("content-type") or "").split(";")[0].strip().lower()
     if ctype == "application/pdf":
@@ -47,7 +112,143 @@ def _response_is_pdf(resp) -> bool:
     dispo = (resp.headers.get("content-disposition") or "").lower()
     return ".pdf" in dispo
 
-def _wayback_resolve_latest(url: str, sess: requests.Session, timeout: int = 15) -> str:
+# -------------------- Bounded streamed downloads --------------------
+def _content_type(resp) -> str:
+    return (resp.headers.get("content-type") or "").split(";")[0].strip().lower()
+
+def _ctype_is_unusable(ctype: str) -> bool:
+    return ctype.startswith(_UNUSABLE_CTYPE_PREFIXES) or ctype in _UNUSABLE_CTYPES
+
+def _sniff_kind(head: bytes, resp) -> str:
+    """
+    Classify a body as 'pdf', 'html' or 'unusable' from its first bytes,
+    falling back to the response headers when the bytes are inconclusive.
+    """
+    stripped = head.lstrip()
+    if stripped.startswith(b"%PDF-"):
+        return "pdf"
+    if head.startswith(_UNUSABLE_MAGIC) or head[4:8] == b"ftyp":   # ftyp: mp4 / mov
+        return "unusable"
+    if stripped.startswith(b"<"):
+        return "html"
+    if _response_is_pdf(resp) or b"%PDF-" in head[:1024]:
+        return "pdf"
+    if _ctype_is_unusable(_content_type(resp)):
+        return "unusable"
+    return "html"
+
+def _decode_html(body: bytes, resp) -> str:
+    enc = None
+    if "charset=" in (resp.headers.get("content-type") or "").lower():
+        enc = resp.encoding
+    if not enc:
+        m = _META_CHARSET_RE.search(body[:4096])
+        enc = m.group(1).decode("ascii", "ignore") if m else "utf-8"
+    try:
+        return body.decode(enc, errors="replace")
+    except LookupError:
+        return body.decode("utf-8", errors="replace")
+
+def _remaining(deadline: float) -> float:
+    return deadline - time.monotonic()
+
+@metrics.instrument("http_download")
+def _bounded_get(sess: requests.Session, url: str, headers: dict, deadline: float):
+    """
+    Streams a GET for `url` without ever holding more than the per-type byte budget.
+
+    Returns a dict with keys: status, url, kind ('html' | 'pdf' | 'unusable' | 'error'),
+    html (decoded text, for 'html') and pdf_path (temp file the caller must remove, for 'pdf').
+    Non-2xx responses are returned without reading their body. Returns None on
+    network errors or when the article deadline runs out.
+    """
+    left = _remaining(deadline)
+    if left <= 0:
+        logger.error(f"Article deadline exceeded before fetching {url}")
+        return None
+    timeout = min(REQUEST_TIMEOUT_S, left)
+    try:
+        resp = sess.get(url, headers=headers, timeout=timeout, allow_redirects=True, stream=True)
+    except Exception as e:
+        logger.error(f"Error fetching {url}: {e}")
+        return None
+
+    out = {"status": resp.status_code, "url": resp.url or url, "kind": "error", "html": "", "pdf_path": None}
+    with resp:
+        if not resp.ok:
+            return out
+        ctype = _content_type(resp)
+        if _ctype_is_unusable(ctype):
+            logger.info(f"Skipping unusable media type {ctype} for {out['url']}")
+            out["kind"] = "unusable"
+            return out
+
+        chunks = resp.iter_content(chunk_size=STREAM_CHUNK_BYTES)
+        head = b""
+        try:
+            while len(head) < SNIFF_BYTES:
+                chunk = next(chunks, b"")
+                if not chunk:
+                    break
+                head += chunk
+        except Exception as e:
+            logger.error(f"Error reading body of {out['url']}: {e}")
+            return None
+
+        kind = _sniff_kind(head, resp)
+        if kind == "pdf" and not ALLOW_PDF:
+            kind = "unusable"
+        if kind == "unusable":
+            logger.info(f"Aborting download of unusable content from {out['url']}")
+            out["kind"] = "unusable"
+            return out
+
+        budget = MAX_PDF_BYTES if kind == "pdf" else MAX_HTML_BYTES
+        size = len(head)
+        sink = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) if kind == "pdf" else io.BytesIO()
+        try:
+            sink.write(head[:budget])
+            truncated = size > budget
+            for chunk in chunks:
+                if truncated:
+                    break
+                if _remaining(deadline) <= 0:
+                    raise TimeoutError(f"article deadline of {ARTICLE_DEADLINE_S}s exceeded")
+                size += len(chunk)
+                if size > budget:
+                    sink.write(chunk[:budget - (size - len(chunk))])
+                    truncated = True
+                    break
+                sink.write(chunk)
+            metrics.add("http_download", bytes=size)
+
+            if kind == "pdf":
+                sink.close()
+                if truncated:
+                    # a cut-off PDF cannot be parsed; give up rather than waste the parser's time
+                    logger.error(f"PDF at {out['url']} exceeds {MAX_PDF_BYTES} bytes; skipping")
+                    os.remove(sink.name)
+                    out["kind"] = "unusable"
+                    return out
+                out["pdf_path"] = sink.name
+            else:
+                if truncated:
+                    logger.warning(f"HTML at {out['url']} exceeds {MAX_HTML_BYTES} bytes; truncating")
+                out["html"] = _decode_html(sink.getvalue(), resp)
+            out["kind"] = kind
+            return out
+        except Exception as e:
+            logger.error(f"Error streaming {out['url']}: {e}")
+            if kind == "pdf":
+                sink.close()
+                try:
+                    os.remove(sink.name)
+                except Exception:
+                    pass
+            return None
+
+def _wayback_resolve_latest(url: str) -> str:
+    """Turns a timestampless /web/<original> wrapper into the raw (`id_`) latest snapshot URL."""
     try:
         pr = urlparse(url)
         if pr.netloc != "web.archive.org":
@@ -57,33 +258,33 @@ def _wayback_resolve_latest(url: str, sess: requests.Session, timeout: int = 15)
         if len(parts) >= 3 and parts[2] and parts[2][0].isdigit():
             return url
         # timestampless wrapper (/web/https://original)
-        if len(parts) >= 3 and (parts[2].startswith("http://") or parts[2].startswith("https://")):
-            original = parts[2]
-        else:
+        original = url.split("/web/", 1)[1] if "/web/" in url else ""
+        if not (original.startswith("http://") or original.startswith("https://")):
             return url
-        api = f"https://web.archive.org/wayback/available?url={quote(original, safe='')}"
-        r = sess.get(api, timeout=timeout)
-        closest = r.json().get("archived_snapshots", {}).get("closest", {})
-        return closest.get("url") or url
+        snap = archive.lookup_snapshot(original)
+        return archive.raw_snapshot_url(snap) if snap else url
     except Exception:
         return url
 
-def _wayback_follow_iframe(html: str, sess: requests.Session, timeout: int = 15) -> str:
+def _wayback_follow_iframe(html: str, sess: requests.Session, timeout: int = 15, deadline: float = None) -> str:
     try:
-        soup = BeautifulSoup(html, "html.parser")
+        soup = _soup(html)
         iframe = soup.find("iframe", src=lambda s: s and "/web/" in s)
         if not iframe:
             return html
         src = iframe.get("src", "")
         frame_url = urljoin("https://web.archive.org", src)
-        r = sess.get(frame_url, timeout=timeout, allow_redirects=True)
-        r.raise_for_status()
-        return r.text or html
+        if deadline is None:
+            deadline = time.monotonic() + timeout
+        dl = _bounded_get(sess, frame_url, {}, min(deadline, time.monotonic() + timeout))
+        if not dl or dl["kind"] != "html" or not 200 <= dl["status"] < 300:
+            return html
+        return dl["html"] or html
     except Exception:
         return html
 
 # -------------------- HTML table extraction --------------------
-def _nearest_caption_text(node: BeautifulSoup):
+def _nearest_caption_text(node: "BeautifulSoup"):
     cap = node.find("caption")
     if cap:
         t = cap.get_text(" ", strip=True)
@@ -108,7 +309,7 @@ def _nearest_caption_text(node: BeautifulSoup):
         hops += 1
     return ""
 
-def _table_to_tsv_bs(tbl: BeautifulSoup):
+def _table_to_tsv_bs(tbl: "BeautifulSoup"):
     html_str = str(tbl)
     if pd is not None:
         try:
@@ -129,7 +330,7 @@ def _table_to_tsv_bs(tbl: BeautifulSoup):
         return None
     return "\n".join("\t".join(c or "" for c in r) for r in rows_out)
 
-def _aria_table_to_tsv(node: BeautifulSoup):
+def _aria_table_to_tsv(node: "BeautifulSoup"):
     rows_out = []
     for r in node.find_all(attrs={"role": "row"}, recursive=True):
         cells = r.find_all(attrs={"role": ["cell", "columnheader", "rowheader"]}, recursive=False) \
@@ -141,8 +342,9 @@ def _aria_table_to_tsv(node: BeautifulSoup):
         return None
     return "\n".join("\t".join(c or "" for c in r) for r in rows_out)
 
+@profiled("html_tables")
 def _extract_tables_from_html(html: str):
-    soup = BeautifulSoup(html, "html.parser")
+    soup = _soup(html)
     for tag in soup(["script", "style", "noscript", "svg", "form", "iframe"]):
         tag.decompose()
 
@@ -180,10 +382,11 @@ def _extract_tables_from_html(html: str):
     return "\n\n".join(parts)
 
 # -------------------- PDF helpers (Camelot + text) --------------------
-def _extract_text_from_pdf_bytes(pdf_bytes: bytes, tmp_path: str) -> str:
+def _extract_text_from_pdf_file(pdf_path: str) -> str:
+    fitz = _lazy_import("fitz")
     if fitz is not None:
         try:
-            with fitz.open(tmp_path) as pdf:
+            with fitz.open(pdf_path) as pdf:
                 parts = []
                 for page in pdf:
                     t = page.get_text() or ""
@@ -195,7 +398,7 @@ def _extract_text_from_pdf_bytes(pdf_bytes: bytes, tmp_path: str) -> str:
             pass
     try:
         from pdfminer.high_level import extract_text as pdf_extract_text
-        with io.BytesIO(pdf_bytes) as f:
+        with open(pdf_path, "rb") as f:
             txt = pdf_extract_text(f) or ""
         if txt:
             return _clean_ws(txt)
@@ -203,14 +406,17 @@ def _extract_text_from_pdf_bytes(pdf_bytes: bytes, tmp_path: str) -> str:
         pass
     try:
         import PyPDF2
-        with io.BytesIO(pdf_bytes) as f:
+        with open(pdf_path, "rb") as f:
             reader = PyPDF2.PdfReader(f)
             pages = [page.extract_text() or "" for page in reader.pages]
         return _clean_ws("\n\n".join(pages))
     except Exception:
         return ""
 
+@metrics.instrument("pdf_camelot")
 def _camelot_tables_to_tsv_list(pdf_path: str):
+    # Camelot pulls in OpenCV and Ghostscript bindings; only load it once a PDF shows up
+    camelot = _lazy_import("camelot")
     if camelot is None:
         return []
     def _run(flavor: str):
@@ -232,22 +438,15 @@ def _camelot_tables_to_tsv_list(pdf_path: str):
         tables = _run(CAMELOT_FALLBACK_FLAVOR)
     return tables
 
-def _pdf_bytes_to_text_plus_tables(pdf_bytes: bytes) -> str:
-    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
-        tmp.write(pdf_bytes)
-        tmp_path = tmp.name
-    try:
-        text = _extract_text_from_pdf_bytes(pdf_bytes, tmp_path)
-        tables_list = _camelot_tables_to_tsv_list(tmp_path)
-        combined = text or ""
-        if tables_list:
-            combined = (combined + "\n\nTABLES:\n" + "\n\n".join(tables_list)).strip()
-        return combined
-    finally:
-        try:
-            os.remove(tmp_path)
-        except Exception:
-            pass
+@metrics.instrument("pdf_extract")
+@profiled("pdf_extract")
+def _pdf_file_to_text_plus_tables(pdf_path: str) -> str:
+    text = _extract_text_from_pdf_file(pdf_path)
+    tables_list = _camelot_tables_to_tsv_list(pdf_path)
+    combined = text or ""
+    if tables_list:
+        combined = (combined + "\n\nTABLES:\n" + "\n\n".join(tables_list)).strip()
+    return combined
 
 def fetch_inoreader_articles(folder_name, access_token):
     """
@@ -269,12 +468,13 @@ def fetch_inoreader_articles(folder_name, access_token):
     continuation = None
     # Build the stream URL.
     stream_id = urllib.parse.quote(f"user/-/label/{folder_name}", safe='')
-    base_url = f"https://www.inoreader.com/reader/api/0/stream/contents/{stream_id}"
+    base_url = f"{INOREADER_API_URL}/stream/contents/{stream_id}"
     headers = {
         "Authorization": f"GoogleLogin auth={access_token}",
         "AppId": CLIENT_ID,  # Add the AppId header
         "appKey": APP_KEY
     }
+    relogged_in = False
     # Loop until no continuation token is returned.
     while True:
         # Set parameters: using r="o" (oldest first) and ot with the start time.
@@ -288,6 +488,17 @@ def fetch_inoreader_articles(folder_name, access_token):
             params["c"] = continuation
         
         response = requests.get(base_url, headers=headers, params=params)
+        if response.status_code == 401 and not relogged_in:
+            # cached ClientLogin token was revoked: drop it and log in again once
+            relogged_in = True
+            logger.warning("Inoreader rejected the access token; logging in again.")
+            invalidate_client_login()
+            access_token = client_login()
+            if not access_token:
+                logger.error("Re-login to Inoreader failed.")
+                break
+            headers["Authorization"] = f"GoogleLogin auth={access_token}"
+            continue
         if response.status_code == 200:
             json_data = response.json()
             items = json_data.get("items", [])
@@ -308,17 +519,48 @@ def fetch_inoreader_articles(folder_name, access_token):
     return articles
 
 
-def build_df_for_folder(folder_name, access_token):
+def build_batch_for_folder(folder_name, access_token):
+    """Fetches the past week's items of an Inoreader folder as an ArticleBatch."""
     response = fetch_inoreader_articles(folder_name, access_token)
-    df = parse_inoreader_feed(response)
-    return df
+    return ArticleBatch.from_records(parse_inoreader_items(response))
 
-# -------------------- Playwright URL resolver --------------------
-def resolve_with_playwright(url):
-    logging.info("Resolving URL via Playwright: %s", url)
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
+# -------------------- URL resolution (HTTP first, Playwright on escalation) --------------------
+def _resolve_with_http(url: str):
+    """Follows HTTP redirects without reading the body; returns the final URL, or None if that did not work."""
+    try:
+        resp = get_session().get(url, allow_redirects=True, stream=True, timeout=RESOLVE_TIMEOUT_S, headers={
+            "User-Agent": ("Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+                           "(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"),
+        })
+    except Exception as e:
+        logger.info(f"HTTP resolution failed for {url}: {e}")
+        return None
+    with resp:
+        if resp.status_code >= 400:
+            return None
+        final_url = resp.url or url
+    if urlparse(final_url).hostname in JS_REDIRECT_HOSTS:
+        return None
+    return final_url
+
+@metrics.instrument("url_resolve")
+def resolve_url(url):
+    """
+    Resolves a feed URL to the article URL. Plain HTTP redirects are followed first;
+    only links that need JavaScript (Google News) or that fail over HTTP escalate to
+    a headless browser via resolve_with_playwright.
+    """
+    final_url = _resolve_with_http(url)
+    if final_url:
+        return final_url
+    if not RESOLVE_WITH_PLAYWRIGHT:
+        return url
+    return resolve_with_playwright(url)
+
+def _resolve_on_page(browser, url):
+    context = browser.new_context()
+    try:
+        page = context.new_page()
         def block_resource(route, request):
             if request.resource_type in ["image", "stylesheet", "font"]:
                 return route.abort()
@@ -329,21 +571,197 @@ def resolve_with_playwright(url):
             page.wait_for_timeout(1000)
         except Exception as e:
             logging.error("Error during page.goto: %s", e)
-        final_url = page.url
-        browser.close()
-        return final_url
+        return page.url
+    finally:
+        context.close()
+
+class _BrowserPool:
+    """
+    Long-lived headless Chromium instances for URL resolution. Playwright's sync API is
+    bound to the thread that started it, so each browser lives on its own thread and
+    URLs are handed over through a queue. Browsers are launched on first use and kept
+    until shutdown(), so later resolutions (and later runs of a persistent worker, see
+    scheduler.py) skip the launch; every URL still gets a fresh browser context.
+    """
+
+    def __init__(self, size=PLAYWRIGHT_BROWSERS):
+        self.size = max(1, size)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._registered = False
+
+    def _ensure_started(self):
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self.size:
+                t = threading.Thread(target=self._serve, name=f"browser-{len(self._threads)}", daemon=True)
+                t.start()
+                self._threads.append(t)
+            if not self._registered:
+                atexit.register(self.shutdown)
+                self._registered = True
+
+    def resolve(self, url):
+        self._ensure_started()
+        future = Future()
+        self._queue.put((url, future))
+        try:
+            return future.result(timeout=PLAYWRIGHT_RESOLVE_TIMEOUT_S)
+        except Exception:
+            future.cancel()
+            raise
+
+    def running(self):
+        with self._lock:
+            return sum(t.is_alive() for t in self._threads)
+
+    def _serve(self):
+        sync_api = _lazy_import("playwright.sync_api")
+        pw = browser = None
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                url, future = item
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    if browser is None or not browser.is_connected():
+                        if pw is None:
+                            pw = sync_api.sync_playwright().start()
+                        browser = pw.chromium.launch(headless=True)
+                    future.set_result(_resolve_on_page(browser, url))
+                except Exception as e:
+                    future.set_exception(e)
+                    # relaunch on the next URL rather than reuse a browser in an unknown state
+                    if browser is not None:
+                        try:
+                            browser.close()
+                        except Exception:
+                            pass
+                        browser = None
+        finally:
+            try:
+                if browser is not None:
+                    browser.close()
+                if pw is not None:
+                    pw.stop()
+            except Exception as e:
+                logger.info(f"Closing browser failed: {e}")
+
+    def shutdown(self):
+        """Closes all browsers; the pool restarts on the next resolve()."""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+        for t in threads:
+            t.join(timeout=30)
+
+_browser_pool = _BrowserPool()
+
+def shutdown_browsers():
+    _browser_pool.shutdown()
+
+def browsers_running():
+    return _browser_pool.running()
+
+@metrics.instrument("playwright_resolve")
+def resolve_with_playwright(url):
+    if _lazy_import("playwright.sync_api") is None:
+        return url
+    logging.info("Resolving URL via Playwright: %s", url)
+    try:
+        return _browser_pool.resolve(url)
+    except Exception as e:
+        logging.error("Playwright resolution failed for %s: %s", url, e)
+        return url
+
+# -------------------- Main-text extractors --------------------
+def _extract_with_trafilatura(html: str, url: str) -> str:
+    trafilatura = _lazy_import("trafilatura")
+    if not trafilatura:
+        return ""
+    extracted = trafilatura.extract(html, url=url, include_tables=False,
+                                    no_fallback=False, favor_recall=True)
+    return (extracted or "").strip()
+
+def _extract_with_newspaper(html: str, url: str) -> str:
+    newspaper = _lazy_import("newspaper")
+    if newspaper is None:
+        return ""
+    art = newspaper.Article(url)
+    art.set_html(html)
+    art.parse()
+    return (art.text or "").strip()
+
+def _extract_with_soup(html: str, url: str) -> str:
+    soup = _soup(html)
+    for tag in soup(["script", "style", "noscript", "svg", "form", "iframe"]):
+        tag.decompose()
+    article = soup.find("article")
+    return _clean_ws(article.get_text(" ", strip=True) if article else soup.get_text(" ", strip=True))
+
+_EXTRACTORS = {
+    "trafilatura": _extract_with_trafilatura,
+    "newspaper": _extract_with_newspaper,
+    "soup": _extract_with_soup,
+}
+
+@metrics.instrument("html_extract")
+@profiled("html_extract")
+def _extract_main_text(html: str, url: str, site: str, order: list) -> str:
+    """Runs the extractors in `order`, stopping at the first non-empty result."""
+    for name in order:
+        t0 = time.monotonic()
+        try:
+            text = _EXTRACTORS[name](html, url)
+        except Exception:
+            text = ""
+        domain_profiles.record_extractor(site, name, bool(text), time.monotonic() - t0)
+        if text:
+            return text
+    return ""
+
+# -------------------- Fetch routes --------------------
+def _fetch_route(route: str, url: str, sess: requests.Session, headers: dict, deadline: float, site: str):
+    """Fetches `url` through `route` ('direct' or 'archive') and records the outcome for `site`."""
+    if route == "direct":
+        target = url
+    else:
+        snap = archive.lookup_snapshot(url)
+        target = archive.raw_snapshot_url(snap) if snap else f"http://web.archive.org/web/{url}"
+    t0 = time.monotonic()
+    dl = _bounded_get(sess, target, headers, deadline)
+    ok = bool(dl) and 200 <= dl["status"] < 300 and dl["kind"] in ("html", "pdf")
+    domain_profiles.record_route(site, route, ok, time.monotonic() - t0)
+    return dl
 
 # -------------------- Main fetcher (HTML + PDF + tables) --------------------
+@metrics.instrument("article_fetch")
 def fetch_full_article_text(row):
     """
     Returns main text plus a TABLES: block (TSV) when any tables are found.
     Handles HTML pages + PDFs (Camelot).
+
+    Bodies are streamed under per-type byte budgets and a total deadline of
+    ARTICLE_DEADLINE_S per article; media we cannot use are dropped after the first bytes.
+    The fetch route and main-text extractor that last worked for the article's domain
+    are tried first (see src/domain_profiles.py), with a periodic full re-probe.
     """
     real_url = row.get("url", "")
     logger = logging.getLogger(__name__)
+    cached = extraction_cache.get(real_url)
+    if cached is not None:
+        logger.info(f"Using cached article text for URL: {real_url}")
+        metrics.add("article_fetch", cache_hits=1)
+        return cached
     logger.info(f"Fetching article text for URL: {real_url}")
 
-    sess = requests.Session()
+    deadline = time.monotonic() + ARTICLE_DEADLINE_S
+    sess = get_session()
     headers = {
         "User-Agent": ("Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
                        "(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"),
@@ -353,121 +771,113 @@ def fetch_full_article_text(row):
 
     # If Wayback wrapper without timestamp, resolve to a concrete snapshot
     if "web.archive.org" in real_url:
-        real_url = _wayback_resolve_latest(real_url, sess, timeout=10)
+        real_url = _wayback_resolve_latest(real_url)
 
-    # Fast path: explicit .pdf
-    if ALLOW_PDF and _looks_like_pdf_path(real_url):
-        try:
-            r = sess.get(real_url, headers=headers, timeout=20, allow_redirects=True)
-            r.raise_for_status()
-            return _pdf_bytes_to_text_plus_tables(r.content)
-        except Exception as e:
-            logger.error(f"PDF fetch failed for {real_url}: {e}")
-            return ""
-
-    # 1) Try a plain HTTP GET
+    site = domain_profiles.domain_of(real_url)
+    reprobe = domain_profiles.start_article(site)
+    route = None if reprobe else domain_profiles.preferred_route(site)
+    if "web.archive.org" in real_url:
+        route = "direct"
     try:
-        resp = sess.get(real_url, headers=headers, timeout=20, allow_redirects=True)
-    except Exception as e:
-        logger.error(f"Error fetching {real_url}: {e}")
-        return ""
+        if route == "archive":
+            # Domain is known to block us: go straight to Archive.org, falling back to a plain GET
+            logger.info(f"Known blocking domain {site}—fetching via Archive.org")
+            dl = _fetch_route("archive", real_url, sess, headers, deadline, site)
+            if not dl or dl["status"] != 200:
+                dl = _fetch_route("direct", real_url, sess, headers, deadline, site)
+        else:
+            # 1) Try a plain HTTP GET
+            dl = _fetch_route("direct", real_url, sess, headers, deadline, site)
+            # 2) If blocked, retry via Archive.org
+            if dl is not None and dl["status"] == 403:
+                logger.info(f"403 detected—retrying via Archive.org: {real_url}")
+                dl = _fetch_route("archive", real_url, sess, headers, deadline, site)
+        text = _text_from_download(dl, real_url, sess, deadline, site, reprobe)
+        extraction_cache.put(real_url, text)
+        return text
+    finally:
+        domain_profiles.save_profiles()
 
-    # 2) If blocked, retry via Archive.org
-    if resp.status_code == 403:
-        archive_url = f"http://web.archive.org/web/{real_url}"
-        logger.info(f"403 detected—retrying via Archive.org: {archive_url}")
-        try:
-            resp = sess.get(archive_url, headers=headers, timeout=20, allow_redirects=True)
-        except Exception as e:
-            logger.error(f"Error fetching archive URL {archive_url}: {e}")
-            return ""
+def _text_from_download(dl, real_url: str, sess: requests.Session, deadline: float, site: str, reprobe: bool) -> str:
+    if dl is None:
+        return ""
 
     # 3) Ensure OK
-    try:
-        resp.raise_for_status()
-    except Exception as e:
-        logger.error(f"Final fetch failed ({resp.status_code}): {e}")
+    if not 200 <= dl["status"] < 300:
+        logger.error(f"Final fetch failed ({dl['status']}) for {dl['url']}")
+        return ""
+    if dl["kind"] == "unusable":
         return ""
 
-    # If server actually served a PDF, route to PDF pipeline
-    if ALLOW_PDF and _response_is_pdf(resp):
+    # Server served a PDF (by path, header or magic bytes): route to PDF pipeline
+    if dl["kind"] == "pdf":
         try:
-            return _pdf_bytes_to_text_plus_tables(resp.content)
+            return _pdf_file_to_text_plus_tables(dl["pdf_path"])
         except Exception as e:
-            logger.error(f"PDF parse failed for {resp.url}: {e}")
+            logger.error(f"PDF parse failed for {dl['url']}: {e}")
             return ""
+        finally:
+            try:
+                os.remove(dl["pdf_path"])
+            except Exception:
+                pass
 
     # 4) HTML path
-    html = resp.text or ""
-    # Wayback pages sometimes iframe the real content
-    if "web.archive.org" in (resp.url or real_url):
-        html = _wayback_follow_iframe(html, sess, timeout=10)
-
-    # Main text (trafilatura → newspaper3k → soup.get_text)
-    main_txt = ""
-    if trafilatura:
-        try:
-            extracted = trafilatura.extract(html, url=resp.url, include_tables=False,
-                                            no_fallback=False, favor_recall=True)
-            if extracted:
-                main_txt = extracted.strip()
-        except Exception:
-            pass
-    if not main_txt:
-        try:
-            art = Article(resp.url)
-            art.set_html(html)
-            art.parse()
-            main_txt = (art.text or "").strip()
-        except Exception:
-            main_txt = ""
-    if not main_txt:
-        soup = BeautifulSoup(html, "html.parser")
-        for tag in soup(["script", "style", "noscript", "svg", "form", "iframe"]):
-            tag.decompose()
-        article = soup.find("article")
-        main_txt = _clean_ws(article.get_text(" ", strip=True) if article else soup.get_text(" ", strip=True))
+    html = dl["html"]
+    final_url = dl["url"]
+    # Wayback pages sometimes iframe the real content (raw id_ snapshots never do)
+    if "web.archive.org" in (final_url or real_url) and "id_/" not in (final_url or ""):
+        html = _wayback_follow_iframe(html, sess, timeout=10, deadline=deadline)
+
+    # Main text (trafilatura → newspaper3k → soup.get_text, last winner first)
+    order = list(domain_profiles.EXTRACTORS) if reprobe else domain_profiles.extractor_order(site)
+    main_txt = _extract_main_text(html, final_url, site, order)
 
     # Tables from HTML
     tables_block = _extract_tables_from_html(html)
     if tables_block:
         return (main_txt + "\n\nTABLES:\n" + tables_block).strip()
     return main_txt
-    real_url = row.get("url", "")
-    logger = logging.getLogger(__name__)
-    logger.info(f"Fetching article text for URL: {real_url}")
-
-    # 1) Try a plain HTTP GET to check status
-    try:
-        resp = requests.get(real_url, timeout=15)
-    except Exception as e:
-        logger.error(f"Error fetching {real_url}: {e}")
-        return ""
 
-    # 2) If we got blocked, retry via Archive.org
-    if resp.status_code == 403:
-        archive_url = f"http://web.archive.org/web/{real_url}"
-        logger.info(f"403 detected—retrying via Archive.org: {archive_url}")
-        try:
-            resp = requests.get(archive_url, timeout=15)
-        except Exception as e:
-            logger.error(f"Error fetching archive URL {archive_url}: {e}")
-            return ""
-
-    # 3) Make sure we now have a 200
-    try:
-        resp.raise_for_status()
-    except Exception as e:
-        logger.error(f"Final fetch failed ({resp.status_code}): {e}")
-        return ""
-
-    # 4) Parse whatever HTML we got back
-    html = resp.text
-    article = Article(real_url)        # keeps metadata tied to original URL
-    article.set_html(html)
-    article.parse()
-
-    text = (article.text or "").strip()
-    if not text:
-        logger.warning("No text extracted after parsing HTML from %s", resp.url)
-    return text
+# -------------------- Archive.org prefetch --------------------
+def _fetch_archived_text(url: str, snapshot: dict) -> str:
+    sess = get_session()
+    headers = {
+        "User-Agent": ("Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+                       "(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"),
+        "Accept": "text/html,application/pdf;q=0.9,*/*;q=0.8",
+    }
+    deadline = time.monotonic() + ARTICLE_DEADLINE_S
+    site = domain_profiles.domain_of(url)
+    raw_url = archive.raw_snapshot_url(snapshot)
+    t0 = time.monotonic()
+    dl = _bounded_get(sess, raw_url, headers, deadline)
+    ok = bool(dl) and 200 <= dl["status"] < 300 and dl["kind"] in ("html", "pdf")
+    domain_profiles.record_route(site, "archive", ok, time.monotonic() - t0)
+    return _text_from_download(dl, url, sess, deadline, site, reprobe=False)
+
+def prefetch_archived_articles(urls) -> int:
+    """
+    Starts background Archive.org fetches for the urls whose domain is known to block
+    direct requests. Snapshot availability is looked up for the whole batch at once and
+    the raw `id_` snapshots are downloaded concurrently; the extracted texts land in the
+    extraction cache, where fetch_full_article_text picks them up.
+    Returns the number of fetches started.
+    """
+    blocked = [
+        u for u in dict.fromkeys(urls)
+        if u and "web.archive.org" not in u and not extraction_cache.has(u)
+        and domain_profiles.preferred_route(domain_profiles.domain_of(u)) == "archive"
+    ]
+    if not blocked:
+        return 0
+    logger.info("Prefetching %d article(s) from Archive.org", len(blocked))
+    snapshots = archive.lookup_snapshots(blocked)
+    started = 0
+    for url in blocked:
+        snap = snapshots.get(url)
+        if not snap:
+            continue
+        extraction_cache.put_pending(url, archive.executor().submit(_fetch_archived_text, url, snap))
+        started += 1
+    return started
@@ -0,0 +1,221 @@
+import json
+import os
+import time
+import logging
+import threading
+import functools
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Counters every stage may report (anything else passed to add() is kept too)
+COUNTERS = ["bytes", "prompt_tokens", "completion_tokens", "cached_tokens", "retries", "cost_usd"]
+
+# USD per million tokens: (prompt, cached prompt, completion). Looked up by the longest
+# prefix of the requested model name, so dated snapshots ("gpt-4.1-2025-04-14") match too.
+MODEL_PRICES = {
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "text-embedding-3-small": (0.02, 0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.13, 0.0),
+}
+
+
+def usage_cost(model, prompt_tokens, completion_tokens, cached_tokens=0):
+    """USD cost of one call's tokens at MODEL_PRICES; 0.0 for unknown models."""
+    matches = [m for m in MODEL_PRICES if model and model.startswith(m)]
+    if not matches:
+        return 0.0
+    prompt, cached, completion = MODEL_PRICES[max(matches, key=len)]
+    uncached = max(prompt_tokens - cached_tokens, 0)
+    return (uncached * prompt + cached_tokens * cached + completion_tokens * completion) / 1e6
+
+
+def _percentile(sorted_vals, pct):
+    if not sorted_vals:
+        return 0.0
+    k = (len(sorted_vals) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (k - lo)
+
+
+class RunMetrics:
+    """
+    Thread-safe per-run collector of stage timings and counters.
+
+    Every observation is filed under its stage and, when recorded inside
+    folder_scope(), under the current folder as well, so both a run-wide and a
+    per-folder breakdown are available.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self, run_id=None):
+        with self._lock:
+            self.run_id = run_id
+            self.started_at = time.time()
+            self._stages = {}
+
+    # -------------------- recording --------------------
+    def _folder(self):
+        return getattr(self._local, "folder", None)
+
+    def current_folder(self):
+        """The folder this thread is recording under (None outside folder_scope())."""
+        return self._folder()
+
+    @contextmanager
+    def folder_scope(self, folder):
+        """Labels everything recorded on this thread with `folder`."""
+        prev = self._folder()
+        self._local.folder = folder
+        try:
+            yield
+        finally:
+            self._local.folder = prev
+
+    def _entry(self, stage, folder):
+        key = (stage, folder)
+        entry = self._stages.get(key)
+        if entry is None:
+            entry = {"count": 0, "errors": 0, "durations": [], "counters": {}}
+            self._stages[key] = entry
+        return entry
+
+    def _targets(self, stage):
+        folder = self._folder()
+        return [self._entry(stage, None)] + ([self._entry(stage, folder)] if folder else [])
+
+    def observe(self, stage, seconds, error=False):
+        with self._lock:
+            for entry in self._targets(stage):
+                entry["count"] += 1
+                entry["errors"] += int(bool(error))
+                entry["durations"].append(seconds)
+
+    def add(self, stage, **counters):
+        """Adds to a stage's counters, e.g. add("article_fetch", bytes=1234)."""
+        with self._lock:
+            for entry in self._targets(stage):
+                for name, value in counters.items():
+                    if value:
+                        entry["counters"][name] = entry["counters"].get(name, 0) + value
+
+    def add_usage(self, stage, usage, model=None):
+        """
+        Records token usage from an OpenAI response's `usage` object; with `model`, also
+        its cost (cost_usd) at MODEL_PRICES. Returns (prompt + completion tokens, cost).
+        """
+        if usage is None:
+            return 0, 0.0
+        details = getattr(usage, "prompt_tokens_details", None)
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        cached_tokens = (getattr(details, "cached_tokens", 0) or 0) if details is not None else 0
+        cost = usage_cost(model, prompt_tokens, completion_tokens, cached_tokens)
+        self.add(
+            stage,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cached_tokens=cached_tokens,
+            cost_usd=cost,
+        )
+        return prompt_tokens + completion_tokens, cost
+
+    @contextmanager
+    def timed(self, stage):
+        t0 = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - t0, error=error)
+
+    def instrument(self, stage):
+        """Decorator form of timed()."""
+        def wrap(fn):
+            @functools.wraps(fn)
+            def inner(*args, **kwargs):
+                with self.timed(stage):
+                    return fn(*args, **kwargs)
+            return inner
+        return wrap
+
+    # -------------------- reporting --------------------
+    def summary(self, folder=None) -> dict:
+        """
+        Per-stage summary: count, errors, total/mean/p50/p95/max wall seconds and counters.
+        With `folder`, only observations recorded for that folder.
+        """
+        with self._lock:
+            items = [(stage, dict(e, durations=list(e["durations"]), counters=dict(e["counters"])))
+                     for (stage, f), e in self._stages.items() if f == folder]
+        stages = {}
+        for stage, e in sorted(items):
+            durs = sorted(e["durations"])
+            total = sum(durs)
+            stages[stage] = {
+                "count": e["count"],
+                "errors": e["errors"],
+                "total_s": round(total, 3),
+                "mean_s": round(total / len(durs), 3) if durs else 0.0,
+                "p50_s": round(_percentile(durs, 50), 3),
+                "p95_s": round(_percentile(durs, 95), 3),
+                "max_s": round(durs[-1], 3) if durs else 0.0,
+                **{k: round(v, 6) if isinstance(v, float) else v for k, v in e["counters"].items()},
+            }
+        return stages
+
+    def folders(self):
+        with self._lock:
+            return sorted({f for (_, f) in self._stages if f})
+
+    def run_summary(self) -> dict:
+        return {
+            "run_id": self.run_id,
+            "started_at": self.started_at,
+            "wall_s": round(time.time() - self.started_at, 3),
+            "stages": self.summary(),
+            "folders": {f: self.summary(f) for f in self.folders()},
+        }
+
+    def write_json(self, path, extra=None):
+        data = self.run_summary()
+        if extra:
+            data.update(extra)
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2, default=str)
+            logger.info("Run metrics written to %s", path)
+        except Exception as e:
+            logger.warning("Could not write run metrics to %s: %s", path, e)
+        return data
+
+    def sheet_rows(self, folder=None):
+        """Header + one row per stage, for the optional 'Run Metrics' worksheet."""
+        stages = self.summary(folder)
+        extra = sorted({k for s in stages.values() for k in s} - {
+            "count", "errors", "total_s", "mean_s", "p50_s", "p95_s", "max_s"})
+        counters = [c for c in COUNTERS if c in extra] + [c for c in extra if c not in COUNTERS]
+        header = ["stage", "count", "errors", "total_s", "mean_s", "p50_s", "p95_s", "max_s"] + counters
+        rows = [header]
+        for stage, s in stages.items():
+            rows.append([stage] + [s.get(col, 0) for col in header[1:]])
+        return rows
+
+
+# The collector for the current run (one run at a time per process)
+metrics = RunMetrics()
+timed = metrics.timed
+instrument = metrics.instrument
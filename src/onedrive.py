@@ -1,20 +1,26 @@
 import os
+import io
+import time
+import tempfile
 import requests
 from dotenv import load_dotenv
+from src.tokens import get_token_manager
+from src.metrics import metrics
 load_dotenv()
-def get_graph_api_token(tenant_id, client_id, client_secret):
-    """
-    Obtains an access token for Microsoft Graph using the client credentials flow.
-    
-    Parameters:
-      - tenant_id: Your Azure AD Tenant ID.
-      - client_id: Your application's Client ID.
-      - client_secret: Your application's Client Secret.
-    
-    Returns:
-      - The access token as a string if successful, or None otherwise.
-    """
-    token_url = f"https://login.microsoftonline.com/{tenant_id}/oauth2/v2.0/token"
+
+# Overridable so uploads can be pointed at a local mock Graph server
+GRAPH_BASE_URL = os.getenv("GRAPH_BASE_URL", "https://graph.microsoft.com/v1.0").rstrip("/")
+GRAPH_LOGIN_URL = os.getenv("GRAPH_LOGIN_URL", "https://login.microsoftonline.com").rstrip("/")
+
+# Graph requires upload-session chunks to be multiples of 320 KiB (and < 60 MiB)
+UPLOAD_CHUNK_BYTES = 10 * 320 * 1024
+UPLOAD_MAX_RETRIES = 5
+UPLOAD_BACKOFF_S = 1.0
+UPLOAD_TIMEOUT_S = 60
+
+def _request_graph_api_token(tenant_id, client_id, client_secret):
+    """Runs the client credentials flow; returns (token, expires_in_seconds) or (None, 0)."""
+    token_url = f"{GRAPH_LOGIN_URL}/{tenant_id}/oauth2/v2.0/token"
     data = {
         "client_id": client_id,
         "scope": "https://graph.microsoft.com/.default",
@@ -23,36 +29,180 @@ def get_graph_api_token(tenant_id, client_id, client_secret):
     }
     response = requests.post(token_url, data=data)
     if response.ok:
-        token = response.json().get("access_token")
+        payload = response.json()
         print("Obtained Graph API token.")
-        return token
+        return payload.get("access_token"), int(payload.get("expires_in") or 3599)
     else:
         print("Failed to obtain token:", response.status_code, response.text)
+        return None, 0
+
+def get_graph_api_token(tenant_id, client_id, client_secret):
+    """
+    Obtains an access token for Microsoft Graph using the client credentials flow.
+    Tokens are cached until shortly before they expire (see src/tokens.py), so repeated
+    calls within a run or across scheduled runs do not go back to Azure AD.
+
+    Parameters:
+      - tenant_id: Your Azure AD Tenant ID.
+      - client_id: Your application's Client ID.
+      - client_secret: Your application's Client Secret.
+
+    Returns:
+      - The access token as a string if successful, or None otherwise.
+    """
+    return get_token_manager().get(
+        f"graph:{tenant_id}:{client_id}",
+        lambda: _request_graph_api_token(tenant_id, client_id, client_secret),
+    )
+
+def _as_seekable_stream(data):
+    """
+    Returns (stream, total_size, owned) for bytes, a path, or a file object.
+    Non-seekable streams are spooled to a temp file first; `owned` streams are closed by the caller.
+    """
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return io.BytesIO(data), len(data), True
+    if isinstance(data, (str, os.PathLike)):
+        f = open(data, "rb")
+        return f, os.fstat(f.fileno()).st_size, True
+    try:
+        start = data.tell()
+        total = data.seek(0, io.SEEK_END) - start
+        data.seek(start)
+        return data, total, False
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        spool = tempfile.SpooledTemporaryFile(max_size=UPLOAD_CHUNK_BYTES)
+        while True:
+            block = data.read(UPLOAD_CHUNK_BYTES)
+            if not block:
+                break
+            spool.write(block)
+        total = spool.tell()
+        spool.seek(0)
+        return spool, total, True
+
+def create_upload_session(drive_id, parent_item_id, file_name, access_token):
+    """
+    Starts a Graph upload session for `file_name` under the parent folder, replacing any existing file.
+    Returns the session's uploadUrl, or None on failure.
+    """
+    url = f"{GRAPH_BASE_URL}/drives/{drive_id}/items/{parent_item_id}:/{file_name}:/createUploadSession"
+    headers = {"Authorization": f"Bearer {access_token}", "Content-Type": "application/json"}
+    body = {"item": {"@microsoft.graph.conflictBehavior": "replace"}}
+    response = requests.post(url, headers=headers, json=body, timeout=UPLOAD_TIMEOUT_S)
+    if response.ok:
+        return response.json().get("uploadUrl")
+    print("Failed to create upload session:", response.status_code, response.text)
+    return None
+
+def _put_empty_file(drive_id, parent_item_id, file_name, access_token):
+    """
+    Uploads an empty file with a simple PUT; an upload session cannot take a zero-byte
+    body (there is no valid Content-Range for it). Returns the item JSON, or None.
+    """
+    url = f"{GRAPH_BASE_URL}/drives/{drive_id}/items/{parent_item_id}:/{file_name}:/content"
+    headers = {"Authorization": f"Bearer {access_token}", "Content-Type": "application/octet-stream"}
+    response = requests.put(url, headers=headers, data=b"", timeout=UPLOAD_TIMEOUT_S)
+    if response.ok:
+        return response.json()
+    print("Failed to upload empty file:", response.status_code, response.text)
+    return None
+
+def _next_expected_offset(upload_url):
+    """Asks the upload session where to resume; None if the session is gone."""
+    response = requests.get(upload_url, timeout=UPLOAD_TIMEOUT_S)
+    if response.status_code == 404:
         return None
+    response.raise_for_status()
+    ranges = response.json().get("nextExpectedRanges") or []
+    if not ranges:
+        return None
+    return int(str(ranges[0]).split("-")[0])
+
+def _upload_chunks(stream, base, total, upload_url):
+    """
+    PUTs the stream to `upload_url` in UPLOAD_CHUNK_BYTES pieces, resuming from the
+    session's next expected range after a failure. Returns the item JSON, or raises.
+    """
+    offset = 0
+    failures = 0
+    while True:
+        stream.seek(base + offset)
+        chunk = stream.read(min(UPLOAD_CHUNK_BYTES, total - offset))
+        end = offset + len(chunk) - 1
+        headers = {
+            "Content-Length": str(len(chunk)),
+            "Content-Range": f"bytes {offset}-{end}/{total}",
+        }
+        try:
+            # the upload URL is pre-authorized; Graph rejects an Authorization header here
+            response = requests.put(upload_url, headers=headers, data=chunk, timeout=UPLOAD_TIMEOUT_S)
+            if response.status_code in (200, 201):
+                return response.json()
+            if response.status_code == 202:
+                failures = 0
+                ranges = response.json().get("nextExpectedRanges") or []
+                offset = int(str(ranges[0]).split("-")[0]) if ranges else end + 1
+                continue
+            if response.status_code == 404:
+                raise FileNotFoundError("upload session expired")
+            if response.status_code < 500 and response.status_code not in (408, 409, 416, 429):
+                raise RuntimeError(f"chunk rejected ({response.status_code}): {response.text}")
+            raise ConnectionError(f"retryable status {response.status_code}")
+        except (requests.RequestException, ConnectionError) as e:
+            failures += 1
+            metrics.add("onedrive_upload", retries=1)
+            if failures > UPLOAD_MAX_RETRIES:
+                raise
+            time.sleep(UPLOAD_BACKOFF_S * (2 ** (failures - 1)))
+            print(f"Chunk upload failed ({e}); resuming upload session.")
+            resume_at = _next_expected_offset(upload_url)
+            if resume_at is None:
+                raise FileNotFoundError("upload session expired")
+            offset = resume_at
 
+@metrics.instrument("onedrive_upload")
 def upload_file_to_onedrive(file_bytes, drive_id, parent_item_id, file_name, access_token):
     """
-    Uploads file content (in bytes) to a OneDrive folder specified by the drive ID and the parent folder's item ID.
-    
+    Uploads file content to a OneDrive folder specified by the drive ID and the parent folder's item ID,
+    through a resumable Graph upload session sent in fixed-size chunks.
+
     Parameters:
-      - file_bytes: The file content as a bytes object.
+      - file_bytes: The file content as bytes, a binary file object, or a local file path.
       - drive_id: The ID of the target drive (e.g., the News screening drive).
       - parent_item_id: The ID of the target folder (e.g., for "Output the results folder").
       - file_name: The name with which the file will be saved on OneDrive.
       - access_token: A valid Microsoft Graph API access token.
-    
+
     Returns:
       - The JSON response from the API if the upload is successful, or None otherwise.
     """
-    url = f"https://graph.microsoft.com/v1.0/drives/{drive_id}/items/{parent_item_id}:/{file_name}:/content"
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/octet-stream"
-    }
-    response = requests.put(url, headers=headers, data=file_bytes)
-    if response.status_code in (200, 201):
-        print("File uploaded successfully.")
-        return response.json()
-    else:
-        print("Failed to upload file:", response.status_code, response.text)
+    stream, total, owned = _as_seekable_stream(file_bytes)
+    base = stream.tell()
+    try:
+        if total == 0:
+            item = _put_empty_file(drive_id, parent_item_id, file_name, access_token)
+            if item:
+                print("File uploaded successfully.")
+            return item
+        for attempt in range(2):
+            upload_url = create_upload_session(drive_id, parent_item_id, file_name, access_token)
+            if not upload_url:
+                return None
+            try:
+                item = _upload_chunks(stream, base, total, upload_url)
+                metrics.add("onedrive_upload", bytes=total)
+                print("File uploaded successfully.")
+                return item
+            except FileNotFoundError:
+                # the session expired mid-upload; start a fresh one once
+                print("Upload session expired; starting a new session.")
+                continue
+            except Exception as e:
+                print("Failed to upload file:", e)
+                return None
+        print("Failed to upload file: upload session kept expiring.")
         return None
+    finally:
+        if owned:
+            stream.close()
@@ -0,0 +1,184 @@
+import os
+import re
+import json
+import math
+import time
+import logging
+import datetime
+import threading
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+STATE_DIR = os.getenv("PIPELINE_STATE_DIR", ".pipeline_state")
+STATS_PATH = os.getenv("PRIORITY_STATS_PATH", os.path.join(STATE_DIR, "priority_stats.json"))
+
+# "score": fetch and extract the most promising articles first; "feed": feed order
+ARTICLE_ORDER = os.getenv("ARTICLE_ORDER", "score").lower()
+
+# Weights of the signals in score(); each signal is in [0, 1]
+TECH_WEIGHT = 0.35
+COMPANY_WEIGHT = 0.25
+SOURCE_WEIGHT = 0.25
+RECENCY_WEIGHT = 0.15
+# Technology keyword hits that count as a full tech signal
+TECH_HITS_FULL = 2
+# Beta prior on a source's share of articles that passed the project gate
+PRIOR_PROJECTS = 0.3
+PRIOR_SEEN = 1.0
+# Age at which the recency signal halves
+RECENCY_HALF_LIFE_DAYS = 7.0
+# Companies remembered per folder (most frequent kept)
+MAX_COMPANIES = 2000
+
+# Words in the technology names that carry no signal on their own
+_STOP = {"for", "to", "and", "or", "the", "of", "use", "using", "based", "green", "production", "process",
+         "imported", "furnace", "iron", "steel", "storage", "utilization"}
+# Keywords added for every folder: project news that names no specific technology
+_GENERIC = ["hydrogen", "carbon capture", "low-carbon", "fossil-free", "decarboni", "electrolys", "net zero", "net-zero"]
+
+_lock = threading.Lock()
+_stats = None
+_keyword_cache = {}
+
+
+def _load():
+    global _stats
+    if _stats is None:
+        try:
+            with open(STATS_PATH, "r", encoding="utf-8") as f:
+                _stats = json.load(f)
+        except FileNotFoundError:
+            _stats = {}
+        except Exception as e:
+            logger.warning("Could not read article priority statistics from %s: %s", STATS_PATH, e)
+            _stats = {}
+    return _stats
+
+
+def save_stats():
+    """Atomically writes the in-memory statistics to STATS_PATH."""
+    with _lock:
+        if _stats is None:
+            return
+        data = json.dumps(_stats, indent=1, sort_keys=True)
+    try:
+        os.makedirs(os.path.dirname(STATS_PATH) or ".", exist_ok=True)
+        tmp_path = f"{STATS_PATH}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, STATS_PATH)
+    except Exception as e:
+        logger.warning("Could not persist article priority statistics to %s: %s", STATS_PATH, e)
+
+
+def tech_keywords(tech_list):
+    """
+    Lower-case keywords from the names of a technology list (STEEL_IRON_TECH / CEMENT_TECH):
+    the acronyms and the phrases in and around the parentheses, e.g. "eaf", "h-dri",
+    "eletric arc furnace", "sponge iron", "blast furnace", plus a few generic terms.
+    """
+    key = id(tech_list)
+    if key in _keyword_cache:
+        return _keyword_cache[key]
+    words = set(_GENERIC)
+    for item in tech_list:
+        names = item.keys() if isinstance(item, dict) else [str(item)]
+        for name in names:
+            for chunk in re.split(r"[()+,]| for | to | or | and | using ", name):
+                chunk = chunk.strip().lower()
+                if len(chunk) >= 3 and chunk not in _STOP:
+                    words.add(chunk)
+    pattern = re.compile(r"(?<![\w-])(" + "|".join(sorted((re.escape(w) for w in words), key=len, reverse=True)) + ")",
+                         re.IGNORECASE)
+    _keyword_cache[key] = pattern
+    return pattern
+
+
+def source_of(url: str) -> str:
+    host = (urlparse(url or "").netloc or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def _published_ts(value: str):
+    """Unix time of a feed item's published value (epoch seconds or ISO 8601); None if unknown."""
+    value = (value or "").strip()
+    if not value or value == "Unknown":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        dt = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return dt.timestamp()
+
+
+def score(folder: str, title: str, url: str, published: str, keywords, now=None) -> float:
+    """
+    Expected value of fetching and extracting an article, from cheap signals only:
+    technology keyword hits in the headline, a company seen in earlier project articles
+    of the folder, the source's historical share of articles that passed the project gate,
+    and recency.
+    """
+    text = title or ""
+    hits = len({m.group(1).lower() for m in keywords.finditer(text)})
+    tech = min(hits, TECH_HITS_FULL) / TECH_HITS_FULL
+
+    with _lock:
+        folder_stats = _load().get(folder, {})
+        companies = folder_stats.get("companies", {})
+        source = folder_stats.get("sources", {}).get(source_of(url), {})
+    lowered = text.lower()
+    company = 1.0 if any(name in lowered for name in companies if len(name) >= 4) else 0.0
+    reputation = (source.get("projects", 0) + PRIOR_PROJECTS) / (source.get("seen", 0) + PRIOR_SEEN)
+
+    ts = _published_ts(published)
+    if ts is None:
+        recency = 0.5
+    else:
+        age_days = max(0.0, ((now or time.time()) - ts) / 86400)
+        recency = math.pow(0.5, age_days / RECENCY_HALF_LIFE_DAYS)
+
+    return TECH_WEIGHT * tech + COMPANY_WEIGHT * company + SOURCE_WEIGHT * reputation + RECENCY_WEIGHT * recency
+
+
+def order_articles(folder: str, batch, verdicts, tech_list):
+    """
+    Row indices of `batch` in processing order: headlines screened out ("no") need no
+    fetch or GPT call and go last; the rest by descending score() (feed order on ties,
+    and throughout with ARTICLE_ORDER=feed).
+    """
+    indices = list(range(len(batch)))
+    if ARTICLE_ORDER != "score":
+        return indices
+    keywords = tech_keywords(tech_list)
+    now = time.time()
+    scores = [
+        0.0 if verdicts[i] == "no" else score(folder, batch.titles[i], batch.urls[i], batch.published[i], keywords, now)
+        for i in indices
+    ]
+    return sorted(indices, key=lambda i: (verdicts[i] == "no", -scores[i]))
+
+
+def record_outcome(folder: str, article):
+    """Learns from a processed article: its source's project rate and, for projects, the company."""
+    if article.outcome != "relevant" or article.gate is None:
+        return
+    is_project = article.gate == "yes"
+    with _lock:
+        folder_stats = _load().setdefault(folder, {})
+        source = folder_stats.setdefault("sources", {}).setdefault(source_of(article.url), {"seen": 0, "projects": 0})
+        source["seen"] += 1
+        source["projects"] += int(is_project)
+        company = str(article.details.get("company") or "").strip().lower()
+        if is_project and len(company) >= 4:
+            companies = folder_stats.setdefault("companies", {})
+            companies[company] = companies.get(company, 0) + 1
+            if len(companies) > MAX_COMPANIES:
+                keep = sorted(companies.items(), key=lambda kv: -kv[1])[:MAX_COMPANIES]
+                folder_stats["companies"] = dict(keep)
@@ -0,0 +1,202 @@
+import io
+import os
+import sys
+import cProfile
+import pstats
+import logging
+import threading
+import functools
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+# Opt-in: PIPELINE_PROFILE=1 or `python main.py --profile`
+PROFILE_ENABLED = os.getenv("PIPELINE_PROFILE", "0").lower() in ("1", "true", "yes")
+PROFILE_TOP_N = int(os.getenv("PIPELINE_PROFILE_TOP", 25))
+# One frame is enough to group allocations by line and keeps tracing overhead down
+TRACEMALLOC_FRAMES = 1
+# Allocation diffs (snapshot before/after, ~seconds each on a warm process) are taken
+# for this many calls per stage, skipping the first call which pays one-off import costs
+PROFILE_SNAPSHOT_CALLS = int(os.getenv("PIPELINE_PROFILE_SNAPSHOTS", 1))
+
+# From Python 3.12 cProfile is built on sys.monitoring, which allows one active profiler
+# per process: enabling a second one (e.g. on another folder thread) raises ValueError
+_ONE_PROFILER_PER_PROCESS = sys.version_info >= (3, 12)
+_cprofile_slot = threading.Lock()
+
+
+class StageProfiler:
+    """
+    Collects cProfile statistics and tracemalloc allocation snapshots per pipeline stage.
+
+    Each call of a profiled function runs under its own cProfile.Profile and the results
+    are merged per stage. Up to Python 3.11 profilers are per thread, so calls on the
+    folder threads are profiled side by side; from 3.12 only one profiler can be active
+    per process, so a call that starts while another is being profiled runs without
+    cProfile (counted as unprofiled in the summary; tracemalloc still applies).
+
+    For allocations, the traced-memory peak of every call is measured, and for
+    PROFILE_SNAPSHOT_CALLS calls of a stage (after the first) tracemalloc snapshots are
+    taken before and after; the diff of the call that grew most is kept. tracemalloc is
+    process wide, so with several folders running the allocation figures are approximate.
+
+    Nested profiled calls on the same thread are attributed to the outer stage.
+    """
+
+    def __init__(self, enabled=PROFILE_ENABLED):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._started_tracing = False
+        self._reset()
+
+    def _reset(self):
+        self._stats = {}
+        self._calls = {}
+        self._peak = {}
+        self._diffs = {}
+        self._unprofiled = {}
+
+    def enable(self):
+        self.enabled = True
+
+    def start(self):
+        """Clears previous results and starts tracemalloc; no-op unless enabled."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._reset()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._started_tracing = True
+
+    def stop(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def profiled(self, stage):
+        """Decorator: profiles every call of the function under `stage` when profiling is enabled."""
+        def wrap(fn):
+            @functools.wraps(fn)
+            def inner(*args, **kwargs):
+                if not self.enabled or getattr(self._local, "active", False):
+                    return fn(*args, **kwargs)
+                return self._run(stage, fn, args, kwargs)
+            return inner
+        return wrap
+
+    @staticmethod
+    def _start_cprofile():
+        """An enabled cProfile.Profile, or None when another profiler is active."""
+        if _ONE_PROFILER_PER_PROCESS and not _cprofile_slot.acquire(blocking=False):
+            return None
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+        except ValueError:
+            # another tool (debugger, coverage) holds the profiling hook
+            if _ONE_PROFILER_PER_PROCESS:
+                _cprofile_slot.release()
+            return None
+        return prof
+
+    @staticmethod
+    def _stop_cprofile(prof):
+        if prof is not None:
+            prof.disable()
+            if _ONE_PROFILER_PER_PROCESS:
+                _cprofile_slot.release()
+
+    def _run(self, stage, fn, args, kwargs):
+        tracing = tracemalloc.is_tracing()
+        before, snap_before = 0, None
+        if tracing:
+            with self._lock:
+                want_snapshot = 1 <= self._calls.get(stage, 0) <= PROFILE_SNAPSHOT_CALLS
+            if want_snapshot:
+                snap_before = _snapshot()
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        self._local.active = True
+        prof = self._start_cprofile()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self._stop_cprofile(prof)
+            self._local.active = False
+            growth = tracemalloc.get_traced_memory()[1] - before if tracing else 0
+            diff = _snapshot().compare_to(snap_before, "lineno") if snap_before is not None else None
+            self._record(stage, prof, growth, diff)
+
+    def _record(self, stage, prof, growth, diff):
+        with self._lock:
+            if prof is None:
+                self._unprofiled[stage] = self._unprofiled.get(stage, 0) + 1
+            elif stage not in self._stats:
+                self._stats[stage] = pstats.Stats(prof)
+            else:
+                self._stats[stage].add(prof)
+            self._calls[stage] = self._calls.get(stage, 0) + 1
+            self._peak[stage] = max(self._peak.get(stage, 0), growth)
+            if diff is not None:
+                total = sum(d.size_diff for d in diff)
+                if stage not in self._diffs or total > self._diffs[stage][0]:
+                    self._diffs[stage] = (total, diff)
+
+    def write_report(self, out_dir):
+        """
+        Writes <stage>.prof (pstats, e.g. for snakeviz) and <stage>.alloc.txt per stage, plus
+        summary.txt with the top functions by cumulative time and the top allocation sites.
+        Returns the summary path, or None when nothing was profiled.
+        """
+        with self._lock:
+            stages = sorted(self._stats)
+            if not stages:
+                return None
+            os.makedirs(out_dir, exist_ok=True)
+            summary = []
+            for stage in stages:
+                stats = self._stats[stage]
+                stats.dump_stats(os.path.join(out_dir, f"{stage}.prof"))
+                growth = self._peak.get(stage, 0)
+                diff = self._diffs.get(stage, (0, None))[1]
+
+                buf = io.StringIO()
+                stats.stream = buf
+                stats.sort_stats("cumulative").print_stats(PROFILE_TOP_N)
+                stats.stream = sys.stdout
+                unprofiled = self._unprofiled.get(stage, 0)
+                summary.append(
+                    f"==== {stage}: {self._calls[stage]} calls"
+                    f"{f' ({unprofiled} without cProfile)' if unprofiled else ''}, {stats.total_tt:.2f}s profiled, "
+                    f"largest call peaked {growth / 2 ** 20:.1f} MiB above its start ====\n"
+                )
+                summary.append(buf.getvalue())
+
+                if diff is not None:
+                    top = [d for d in diff if d.size_diff > 0][:PROFILE_TOP_N]
+                    alloc_lines = [f"{d.size_diff / 1024:+10.1f} KiB {d.count_diff:+8d} blocks  {d.traceback}" for d in top]
+                    with open(os.path.join(out_dir, f"{stage}.alloc.txt"), "w", encoding="utf-8") as f:
+                        f.write("\n".join(alloc_lines) + "\n")
+                    summary.append("Allocations retained by the largest sampled call:\n" + "\n".join(alloc_lines[:10]) + "\n\n")
+
+            path = os.path.join(out_dir, "summary.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("".join(summary))
+        logger.info("Profiles written to %s", out_dir)
+        return path
+
+
+def _snapshot():
+    return tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, pstats.__file__),
+        tracemalloc.Filter(False, cProfile.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ])
+
+
+profiler = StageProfiler()
+profiled = profiler.profiled
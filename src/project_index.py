@@ -0,0 +1,309 @@
+import os
+import re
+import csv
+import json
+import time
+import logging
+import threading
+from collections import deque
+
+from src.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+STATE_DIR = os.getenv("PIPELINE_STATE_DIR", ".pipeline_state")
+# Projects learned from earlier runs (details as last extracted)
+INDEX_PATH = os.getenv("KNOWN_PROJECTS_PATH", os.path.join(STATE_DIR, "known_projects.json"))
+# Curated list of tracked projects; optional. Columns (header names as in the Stage 2 sheet
+# or snake_case): Internal ID, Project name, Company, Aliases (';'-separated),
+# Updated GEM Plant ID, GEM wiki page link, and optionally Folder / Domain (steel, iron, cement)
+CSV_PATH = os.getenv("KNOWN_PROJECTS_CSV", os.path.join("data", "known_projects.csv"))
+
+# "on": articles about a known project get the lighter update extraction; "off": index unused
+PROJECT_INDEX = os.getenv("PROJECT_INDEX", "on").lower()
+# Names shorter than this (after normalisation) are too ambiguous to match on
+MIN_NAME_CHARS = 4
+# Only the start of long articles is scanned
+MATCH_CHARS = 50000
+
+# Fields kept from an extraction as the project's last known details. Numeric facts and
+# their quotes are not: they belong to the article they were extracted from.
+DETAIL_KEYS = [
+    "scale", "project_name", "timeline", "technology", "company", "projects mentioned", "partners",
+    "continent", "country", "project_status",
+]
+
+_CSV_COLUMNS = {
+    "internal_id": "internal_id",
+    "project_name": "project_name",
+    "company": "company",
+    "aliases": "aliases",
+    "updated_gem_plant_id": "gem_plant_id",
+    "gem_plant_id": "gem_plant_id",
+    "gem_wiki_page_link": "gem_wiki_url",
+    "gem_wiki_url": "gem_wiki_url",
+    "folder": "folder",
+    "domain": "folder",
+}
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text: str) -> str:
+    """Lower-case words separated by single spaces, padded with a space on each side."""
+    return f" {_NON_ALNUM.sub(' ', (text or '').lower()).strip()} "
+
+
+class Automaton:
+    """
+    Aho–Corasick automaton: finds every occurrence of many patterns in one pass over the
+    text, so matching an article against thousands of project names costs about as much
+    as reading it once.
+    """
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+
+    def add(self, pattern: str, value):
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[node][ch] = nxt
+            node = nxt
+        self._out[node].append(value)
+
+    def build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+        return self
+
+    def find(self, text: str):
+        """Yields (end offset, value) for every pattern occurrence in `text`."""
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for value in out[node]:
+                yield i, value
+
+
+class ProjectIndex:
+    """
+    Known projects per folder, from the curated CSV and from the Stage 2 rows of earlier
+    runs, with their IDs and last known details.
+
+    match() scans an article for the projects' names and aliases (and their companies) with
+    one Aho–Corasick pass; learn() files the details extracted for a project so the next
+    run can recognise it. Learned entries are saved to INDEX_PATH by save().
+    """
+
+    def __init__(self, index_path=INDEX_PATH, csv_path=CSV_PATH):
+        self.index_path = index_path
+        self.csv_path = csv_path
+        self._lock = threading.Lock()
+        self._entries = None
+        self._automata = {}
+
+    # -------------------- loading --------------------
+    def _load(self):
+        if self._entries is not None:
+            return self._entries
+        entries = {}
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning("Could not read the known-project index %s: %s", self.index_path, e)
+        for folder_entries in entries.values():
+            for entry in folder_entries.values():
+                entry["source"] = "run"
+                entry["details"] = {k: v for k, v in entry.get("details", {}).items() if k in DETAIL_KEYS}
+        loaded = self._load_csv(entries)
+        if loaded:
+            logger.info("Known-project index: %d projects from %s", loaded, self.csv_path)
+        self._entries = entries
+        return entries
+
+    def _load_csv(self, entries) -> int:
+        if not self.csv_path or not os.path.exists(self.csv_path):
+            return 0
+        count = 0
+        try:
+            with open(self.csv_path, newline="", encoding="utf-8-sig") as f:
+                for raw in csv.DictReader(f):
+                    row = {}
+                    for header, value in raw.items():
+                        field = _CSV_COLUMNS.get(_NON_ALNUM.sub("_", (header or "").strip().lower()).strip("_"))
+                        if field:
+                            row[field] = (value or "").strip()
+                    if not row.get("project_name"):
+                        continue
+                    folders = [row["folder"]] if row.get("folder") else ["*"]
+                    for folder in folders:
+                        folder_key = folder if folder == "*" or folder.startswith("LeadIT-") else f"LeadIT-{folder.title()}"
+                        key = row.get("internal_id") or normalize(row["project_name"]).strip()
+                        # keep the details learned for this project in earlier runs
+                        learned = entries.get(folder_key, {}).pop(normalize(row["project_name"]).strip(), {})
+                        entries.setdefault(folder_key, {})[key] = {
+                            "project_name": row["project_name"],
+                            "company": row.get("company", ""),
+                            "aliases": [a.strip() for a in row.get("aliases", "").split(";") if a.strip()],
+                            "internal_id": row.get("internal_id", ""),
+                            "gem_plant_id": row.get("gem_plant_id", ""),
+                            "gem_wiki_url": row.get("gem_wiki_url", ""),
+                            "details": learned.get("details", {}),
+                            "last_seen": learned.get("last_seen"),
+                            "source": "csv",
+                        }
+                        count += 1
+        except Exception as e:
+            logger.warning("Could not read known projects from %s: %s", self.csv_path, e)
+        return count
+
+    def _folder_entries(self, folder):
+        entries = self._load()
+        merged = dict(entries.get("*", {}))
+        merged.update(entries.get(folder, {}))
+        return merged
+
+    def _automaton(self, folder):
+        """(automaton over normalised names, entries) for `folder`, rebuilt after learn()."""
+        cached = self._automata.get(folder)
+        if cached is not None:
+            return cached
+        entries = self._folder_entries(folder)
+        automaton = Automaton()
+        for key, entry in entries.items():
+            for name in [entry.get("project_name", "")] + list(entry.get("aliases", [])):
+                pattern = normalize(name)
+                if len(pattern.strip()) >= MIN_NAME_CHARS:
+                    automaton.add(pattern, (key, "name"))
+            company = normalize(entry.get("company", ""))
+            if len(company.strip()) >= MIN_NAME_CHARS:
+                automaton.add(company, (key, "company"))
+        cached = (automaton.build(), entries)
+        self._automata[folder] = cached
+        return cached
+
+    # -------------------- matching --------------------
+    def match(self, folder: str, text: str):
+        """
+        The known project `text` is about, or None. A project matches when one of its
+        names or aliases occurs in the text; names learned from earlier runs (rather than
+        the curated CSV) also need the project's company in the text, since GPT-extracted
+        names can be generic. With several candidates, the one whose company is mentioned
+        and whose names occur most often wins. The entry's "company_confirmed" tells
+        whether its company was mentioned.
+        """
+        if PROJECT_INDEX != "on" or not text:
+            return None
+        with metrics.timed("project_index"), self._lock:
+            automaton, entries = self._automaton(folder)
+            hits = {}
+            for _, (key, kind) in automaton.find(normalize(text[:MATCH_CHARS])):
+                name_hits, company_hit = hits.get(key, (0, False))
+                hits[key] = (name_hits + (kind == "name"), company_hit or kind == "company")
+            candidates = [
+                (company_hit, name_hits, key) for key, (name_hits, company_hit) in hits.items()
+                if name_hits and (company_hit or entries[key].get("source") == "csv")
+            ]
+            if not candidates:
+                return None
+            company_hit, _, key = max(candidates)
+            entry = dict(entries[key], key=key, company_confirmed=company_hit)
+        metrics.add("project_index", matched=1)
+        return entry
+
+    # -------------------- learning --------------------
+    def learn(self, folder: str, details: dict, matched=None):
+        """
+        Files the details extracted for a Stage 2 project (under the matched entry if any).
+        The extracted name becomes an alias of the matched entry only when the match was
+        confirmed by the company.
+        """
+        name = str(details.get("project_name") or "").strip()
+        if not name or not str(details.get("company") or "").strip():
+            return
+        snapshot = {k: details[k] for k in DETAIL_KEYS if details.get(k)}
+        with self._lock:
+            entries = self._load()
+            if matched is not None:
+                key = matched["key"]
+                scope = "*" if key in entries.get("*", {}) and key not in entries.get(folder, {}) else folder
+            else:
+                key, scope = normalize(name).strip(), folder
+            if len(key) < MIN_NAME_CHARS and matched is None:
+                return
+            folder_entries = entries.setdefault(scope, {})
+            entry = folder_entries.get(key)
+            if entry is None:
+                entry = folder_entries[key] = {
+                    "project_name": name, "company": snapshot.get("company", ""), "aliases": [],
+                    "internal_id": "", "gem_plant_id": "", "gem_wiki_url": "", "details": {}, "source": "run",
+                }
+            elif (matched is not None and matched.get("company_confirmed")
+                    and normalize(name) != normalize(entry.get("project_name", ""))
+                    and name not in entry.setdefault("aliases", [])):
+                entry["aliases"].append(name)
+            entry.setdefault("details", {}).update(snapshot)
+            entry["last_seen"] = time.strftime("%Y-%m-%d")
+            self._automata.pop(folder, None)
+            if scope == "*":
+                self._automata.clear()
+
+    def save(self):
+        """Atomically writes the index to INDEX_PATH (CSV entries keep only their learned details)."""
+        with self._lock:
+            if self._entries is None:
+                return
+            data = {}
+            for folder, folder_entries in self._entries.items():
+                for key, entry in folder_entries.items():
+                    if entry.get("source") == "csv":
+                        if not entry.get("details"):
+                            continue
+                        # re-attached to the CSV row by project name on load
+                        key = normalize(entry["project_name"]).strip()
+                        entry = {"project_name": entry["project_name"], "details": entry["details"],
+                                 "last_seen": entry.get("last_seen")}
+                    data.setdefault(folder, {})[key] = {k: v for k, v in entry.items() if k != "source"}
+            text = json.dumps(data, indent=1, sort_keys=True)
+        try:
+            os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+            tmp_path = f"{self.index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, self.index_path)
+        except Exception as e:
+            logger.warning("Could not persist the known-project index to %s: %s", self.index_path, e)
+
+
+def known_ids(entry) -> dict:
+    """Workbook ID columns for a matched entry (see results.build_detailed_row)."""
+    return {
+        "internal_id": entry.get("internal_id", ""),
+        "gem_plant_id": entry.get("gem_plant_id", ""),
+        "gem_wiki_url": entry.get("gem_wiki_url", ""),
+    }
+
+
+project_index = ProjectIndex()
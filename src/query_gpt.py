@@ -1,20 +1,207 @@
-from openai import OpenAI
 import os
-import pandas as pd
-import string
+import math
+import time
+import random
 import json
 from src.questions import PROJECT_STATUS
+from src.rate_limit import gpt_limiter, gpt_breaker, CircuitOpenError
+from src.metrics import metrics
+from src import question_order
+from src.budget import run_budget, BudgetExceededError
+from src.structured import (
+    YES_NO, CORE_DETAILS, ADDITIONAL_DETAILS, PROJECT_UPDATE, NUMERIC_FACTS, NUMERIC_FACTS_CEMENT,
+    StructuredOutputError, parse_reply,
+)
 import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 
 logger = logging.getLogger(__name__)
 
+# Model cascade for the yes/no calls: the stages in CASCADE_STAGES ask SMALL_MODEL first and
+# escalate to the main model only when its answer is not valid JSON or its probability for
+# the yes/no token is below CASCADE_MIN_CONFIDENCE. Detail extraction always uses the main model.
+GPT_CASCADE = os.getenv("GPT_CASCADE", "on").lower() not in ("0", "off", "false", "no")
+SMALL_MODEL = os.getenv("GPT_SMALL_MODEL", "gpt-4.1-mini")
+CASCADE_MIN_CONFIDENCE = float(os.getenv("GPT_CASCADE_MIN_CONFIDENCE", "0.9"))
+CASCADE_STAGES = [s.strip() for s in os.getenv("GPT_CASCADE_STAGES", "gpt_relevance,gpt_project_gate").split(",") if s.strip()]
+
+# Call policy (_call_with_policy): each attempt gets GPT_TIMEOUT_S, retryable errors are
+# retried with jittered exponential backoff until GPT_MAX_RETRIES or the per-call
+# GPT_CALL_DEADLINE_S, and the shared gpt_breaker pauses all callers during an outage
+GPT_TIMEOUT_S = float(os.getenv("GPT_TIMEOUT_S", "60"))
+GPT_CALL_DEADLINE_S = float(os.getenv("GPT_CALL_DEADLINE_S", "300"))
+GPT_MAX_RETRIES = int(os.getenv("GPT_MAX_RETRIES", "5"))
+GPT_RETRY_BASE_S = float(os.getenv("GPT_RETRY_BASE_S", "1"))
+GPT_RETRY_MAX_S = float(os.getenv("GPT_RETRY_MAX_S", "30"))
+_RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+_RETRYABLE_ERRORS = {"APITimeoutError", "APIConnectionError", "TimeoutError", "ConnectionError"}
+# Hedged requests for the short yes/no calls: when an attempt has not answered after the
+# stage's recent p95 latency (at least GPT_HEDGE_MIN_S), an identical second request is
+# sent and whichever answers first is used
+GPT_HEDGE = os.getenv("GPT_HEDGE", "on").lower() not in ("0", "off", "false", "no")
+GPT_HEDGE_MIN_S = float(os.getenv("GPT_HEDGE_MIN_S", "2"))
+HEDGE_MIN_SAMPLES = 20
+HEDGE_STAGES = [s.strip() for s in os.getenv(
+    "GPT_HEDGE_STAGES", "gpt_relevance,gpt_relevance_small,gpt_project_gate,gpt_project_gate_small").split(",") if s.strip()]
+_hedge_pool = ThreadPoolExecutor(max_workers=int(os.getenv("GPT_HEDGE_THREADS", "16")), thread_name_prefix="gpt-hedge")
+_latencies = {}
+_latencies_lock = threading.Lock()
+
+# Clients per API key; reused across runs so a persistent worker keeps its connections warm
+_clients = {}
+_clients_lock = threading.Lock()
+
 def new_openai_session(openai_apikey):
-    os.environ["OPENAI_API_KEY"] = openai_apikey
-    client = OpenAI()
+    # the openai package takes ~0.4s to import; only pay for it when a client is created
+    with _clients_lock:
+        client = _clients.get(openai_apikey)
+        if client is None:
+            from openai import OpenAI
+            os.environ["OPENAI_API_KEY"] = openai_apikey
+            # retries and timeouts are handled per call by _call_with_policy
+            client = OpenAI(max_retries=0, timeout=GPT_TIMEOUT_S)
+            _clients[openai_apikey] = client
     gpt_model = "gpt-4.1" 
     max_num_chars = 10
     return client, gpt_model, max_num_chars
 
+class _HedgeCancelled(Exception):
+    """An attempt that was not sent because the other copy of a hedged request already answered."""
+
+
+def _is_retryable(error) -> bool:
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in _RETRYABLE_STATUS
+    return any(cls.__name__ in _RETRYABLE_ERRORS for cls in type(error).__mro__)
+
+def _backoff_s(retry, error) -> float:
+    """Full-jitter exponential backoff, but never shorter than the server's Retry-After."""
+    delay = random.uniform(0, min(GPT_RETRY_MAX_S, GPT_RETRY_BASE_S * 2 ** (retry - 1)))
+    response = getattr(error, "response", None)
+    try:
+        retry_after = float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        retry_after = 0.0
+    return max(delay, min(retry_after, GPT_RETRY_MAX_S))
+
+def _record_latency(stage, seconds):
+    with _latencies_lock:
+        _latencies.setdefault(stage, deque(maxlen=200)).append(seconds)
+
+def _hedge_after_s(stage):
+    """Seconds to wait before hedging a call on `stage`; None when it is not hedged."""
+    if not GPT_HEDGE or stage not in HEDGE_STAGES:
+        return None
+    with _latencies_lock:
+        recent = sorted(_latencies.get(stage, ()))
+    if len(recent) < HEDGE_MIN_SAMPLES:
+        return None
+    return max(GPT_HEDGE_MIN_S, recent[int(0.95 * (len(recent) - 1))])
+
+def _hedged(stage, send, timeout):
+    """
+    Runs send(timeout, cancelled) and, if it has not answered after _hedge_after_s(stage),
+    a second copy; returns the first successful response. The losing request cannot be
+    aborted once sent (its tokens are still counted); one still waiting for the rate
+    limiter is dropped.
+    """
+    hedge_after = _hedge_after_s(stage)
+    if hedge_after is None or hedge_after >= timeout:
+        return send(timeout, None)
+    folder = metrics.current_folder()
+    cancelled = threading.Event()
+
+    def attempt():
+        with metrics.folder_scope(folder):
+            return send(timeout, cancelled)
+
+    primary = _hedge_pool.submit(attempt)
+    done, _ = wait([primary], timeout=hedge_after)
+    if done:
+        return primary.result()
+    metrics.add(stage, hedged=1)
+    hedge = _hedge_pool.submit(attempt)
+    pending, error = {primary, hedge}, None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                cancelled.set()
+                if future is hedge:
+                    metrics.add(stage, hedge_wins=1)
+                return future.result()
+            error = future.exception()
+    raise error
+
+def _call_with_policy(stage, endpoint, kwargs):
+    """
+    Sends endpoint.create(**kwargs) under the shared rate limit, per-attempt timeout,
+    retries, hedging and circuit breaker. Wall time, token usage and cost of every attempt
+    are recorded under `stage`, along with retries, retries_exhausted, hedged and hedge_wins,
+    and charged to the run budget; once that is spent, BudgetExceededError is raised instead.
+    Time paused by the breaker does not count against GPT_CALL_DEADLINE_S; a call that runs
+    out of retries while the breaker is open raises CircuitOpenError.
+    """
+    def send(timeout, cancelled):
+        with gpt_limiter:
+            if cancelled is not None and cancelled.is_set():
+                raise _HedgeCancelled()
+            t0 = time.perf_counter()
+            with metrics.timed(stage):
+                response = endpoint.with_raw_response.create(timeout=timeout, **kwargs).parse()
+        _record_latency(stage, time.perf_counter() - t0)
+        tokens, cost = metrics.add_usage(stage, getattr(response, "usage", None), model=kwargs.get("model"))
+        run_budget.charge(stage, cost, tokens)
+        return response
+
+    deadline = time.monotonic() + GPT_CALL_DEADLINE_S
+    retry = 0
+    while True:
+        run_budget.check(stage)
+        paused = gpt_breaker.wait()
+        if paused:
+            metrics.add("gpt_breaker", paused_s=paused)
+            # the call deadline covers the call itself, not waiting out an outage
+            deadline += paused
+        remaining = deadline - time.monotonic()
+        try:
+            response = _hedged(stage, send, max(1.0, min(GPT_TIMEOUT_S, remaining)))
+        except Exception as e:
+            if not _is_retryable(e):
+                # the API answered (e.g. a 400), so it is up
+                gpt_breaker.record_success()
+                raise
+            if gpt_breaker.record_failure():
+                metrics.add("gpt_breaker", opened=1)
+            retry += 1
+            delay = _backoff_s(retry, e)
+            if retry > GPT_MAX_RETRIES or time.monotonic() + delay > deadline:
+                metrics.add(stage, retries_exhausted=1)
+                if gpt_breaker.state != "closed":
+                    # an outage, not a bad request: let the caller defer the article
+                    raise CircuitOpenError(f"{stage} call failed while the {gpt_breaker.name} circuit is open: {e}") from e
+                raise
+            metrics.add(stage, retries=1)
+            logger.warning("%s call failed (%s: %s); retry %d in %.1fs", stage, type(e).__name__, e, retry, delay)
+            time.sleep(delay)
+            continue
+        gpt_breaker.record_success()
+        return response
+
+def _create_completion(gpt_client, stage="gpt", **kwargs):
+    """
+    All chat completions go through here so concurrent folders share one rate limit and
+    one call policy (timeouts, retries, hedging, circuit breaker; see _call_with_policy).
+    """
+    return _call_with_policy(stage, gpt_client.chat.completions, kwargs)
+
+def _create_embeddings(gpt_client, stage="embeddings", **kwargs):
+    """Embeddings counterpart of _create_completion (same rate limit, policy and metrics)."""
+    return _call_with_policy(stage, gpt_client.embeddings, kwargs)
+
 def create_gpt_messages(query, run_on_full_text):
     text_label = "collection of text excerpts"
     if run_on_full_text:
@@ -31,29 +218,91 @@ def create_gpt_messages(query, run_on_full_text):
         {"role": "user", "content": query},
     ]
 
-def chat_gpt_query(gpt_client, gpt_model, msgs):
-    response = gpt_client.chat.completions.create(
+def _yes_no_confidence(choice, answer):
+    """
+    Probability the model put on `answer` ("yes"/"no"), read from the logprobs of the first
+    yes/no token of the reply; spelling variants (" Yes", "yes") among the top alternatives
+    are added up. None when the response carries no logprobs.
+    """
+    logprobs = getattr(choice, "logprobs", None)
+    tokens = getattr(logprobs, "content", None) if logprobs is not None else None
+    for tok in tokens or []:
+        if _token_word(tok.token) not in ("yes", "no"):
+            continue
+        alternatives = getattr(tok, "top_logprobs", None) or [tok]
+        return min(sum(math.exp(alt.logprob) for alt in alternatives if _token_word(alt.token) == answer), 1.0)
+    return None
+
+def _token_word(token):
+    return token.strip(' "\'').lower()
+
+def _small_model_answer(gpt_client, msgs, stage):
+    """
+    Asks SMALL_MODEL (recorded under "<stage>_small"). Returns (answer dict, None) when the
+    answer can be used, else (None, reason) with reason "bad_json", "low_confidence" or "error".
+    """
+    small_stage = f"{stage}_small"
+    try:
+        response = _create_completion(
+            gpt_client,
+            stage=small_stage,
+            model=SMALL_MODEL,
+            temperature=0,
+            top_p=1,
+            frequency_penalty=0,
+            seed=999,
+            presence_penalty=0,
+            response_format=YES_NO.response_format(),
+            logprobs=True,
+            top_logprobs=5,
+            messages=msgs,
+        )
+    except (CircuitOpenError, BudgetExceededError):
+        raise
+    except Exception as e:
+        logger.warning("%s call to %s failed, escalating: %s", stage, SMALL_MODEL, e)
+        return None, "error"
+    try:
+        json_response = parse_reply(response, YES_NO, small_stage)
+    except StructuredOutputError:
+        return None, "bad_json"
+    answer = json_response["answer"]
+    confidence = _yes_no_confidence(response.choices[0], answer)
+    if confidence is not None and confidence < CASCADE_MIN_CONFIDENCE:
+        logger.debug("%s: %s answered %r with p=%.3f, escalating", stage, SMALL_MODEL, answer, confidence)
+        return None, "low_confidence"
+    return json_response, None
+
+def chat_gpt_query(gpt_client, gpt_model, msgs, stage="gpt_yes_no"):
+    """
+    Asks a yes/no question and returns the validated reply, {"answer": "yes"|"no"}; raises
+    StructuredOutputError when the reply is unusable. For the stages in CASCADE_STAGES the
+    small model is tried first (see _small_model_answer); its routing is counted on the
+    "<stage>_small" metrics stage as answered/escalated.
+    """
+    if GPT_CASCADE and stage in CASCADE_STAGES and SMALL_MODEL != gpt_model:
+        json_response, reason = _small_model_answer(gpt_client, msgs, stage)
+        if json_response is not None:
+            metrics.add(f"{stage}_small", answered=1)
+            return json_response
+        metrics.add(f"{stage}_small", escalated=1, **{f"escalated_{reason}": 1})
+    response = _create_completion(
+        gpt_client,
+        stage=stage,
         model=gpt_model,
         temperature=0,
         top_p=1,      
         frequency_penalty=0,
         seed=999,
         presence_penalty=0,
-        response_format={"type": "json_object"},
+        response_format=YES_NO.response_format(),
         messages=msgs,
     )
-    # For safety, parse the returned content as JSON.
-    content = response.choices[0].message.content.strip()
-    try:
-        json_response = json.loads(content)
-    except Exception as e:
-        # If parsing fails, log the content and raise the error.
-        raise ValueError(f"Failed to parse JSON from GPT response: {content}\nError: {e}")
-    return json_response
+    return parse_reply(response, YES_NO, stage)
 
-def fetch_variable_info(gpt_client, gpt_model, query, run_on_full_text):
+def fetch_variable_info(gpt_client, gpt_model, query, run_on_full_text, stage="gpt_yes_no"):
     msgs = create_gpt_messages(query, run_on_full_text)
-    return chat_gpt_query(gpt_client, gpt_model, msgs)
+    return chat_gpt_query(gpt_client, gpt_model, msgs, stage=stage)
 
 def extract_numeric_facts_with_quotes(gpt_client, gpt_model, article_text: str, domain: str = "steel") -> dict:
     """
@@ -80,7 +329,7 @@ def extract_numeric_facts_with_quotes(gpt_client, gpt_model, article_text: str,
             "1) What is the expected carbon capture capacity?\n"
             "2) What is the investment size?\n"
         )
-        keys = ["cc_capacity","cc_quote","investment","investment_quote"]
+        output_schema = NUMERIC_FACTS_CEMENT
     else:
         schema = (
             "{\n"
@@ -103,13 +352,8 @@ def extract_numeric_facts_with_quotes(gpt_client, gpt_model, article_text: str,
             "4) What is the iron production capacity?\n"
             "5) What is the steel production capacity?\n"
         )
-        keys = [
-            "cc_capacity","cc_quote",
-            "h2_capacity","h2_quote",
-            "investment","investment_quote",
-            "iron_capacity","iron_quote",
-            "steel_capacity","steel_quote",
-        ]
+        output_schema = NUMERIC_FACTS
+    keys = output_schema.fields
 
     schema_prompt = (
         "You are an extraction assistant. Using ONLY the text below, answer the following.\n"
@@ -132,14 +376,17 @@ def extract_numeric_facts_with_quotes(gpt_client, gpt_model, article_text: str,
         {"role": "user", "content": schema_prompt},
     ]
     try:
-        resp = gpt_client.chat.completions.create(
+        resp = _create_completion(
+            gpt_client,
+            stage="gpt_numeric_facts",
             model=gpt_model,
             temperature=0,
-            response_format={"type": "json_object"},
+            response_format=output_schema.response_format(),
             messages=msgs,
         )
-        out = resp.choices[0].message.content.strip()
-        data = json.loads(out)
+        data = parse_reply(resp, output_schema, "gpt_numeric_facts")
+    except (CircuitOpenError, BudgetExceededError):
+        raise
     except Exception as e:
         print(f"Error extracting numeric facts: {e}")
         data = {}
@@ -161,79 +408,51 @@ def extract_numeric_facts_with_quotes(gpt_client, gpt_model, article_text: str,
 
     return data
 
-def query_gpt_for_relevance_iterative(df, target_questions, run_on_full_text, gpt_client, gpt_model):
-    """
-    Iterates through target_questions for each article in df.
-    For each article, it asks each question until one returns "yes".
-    If any question returns "yes", the article is marked as irrelevant ("no").
-    Otherwise, it's marked as relevant ("yes").
-    
-    Returns:
-        pd.DataFrame: A DataFrame with one row per article including the article index, title, and a "relevant" flag.
+def query_gpt_for_relevance(headline_text, target_questions, run_on_full_text, gpt_client, gpt_model, folder=None):
     """
-    results = []
-    for index, row in df.iterrows():
-        is_irrelevant = False
-        for question in target_questions:
-            query = (
-                f'Forget all previous instructions. Answer the following question to the best of your ability: {question}. '
-                f'Please analyze the headline and respond ONLY as JSON in the format exactly like: '
-                f'{{ "answer": "yes" }} or {{ "answer": "no" }}. '
-                f'Here is the headline: {row["text_column"]}'
-            )
-            response_dict = fetch_variable_info(gpt_client, gpt_model, query, run_on_full_text)
-            raw_answer = response_dict.get("answer", "no")
-            # Clean up the response.
-            clean_answer = raw_answer.strip().lower()
-            if clean_answer not in ["yes", "no"]:
-                print(f"Warning: Unrecognized answer format '{clean_answer}' from GPT. Defaulting to 'no'.")
-                clean_answer = "no"
-            if clean_answer == "yes":
-                is_irrelevant = True
-                print("Skipping article due to query: ", query)
-                break
-        results.append({
-            "index": index,
-            "title": row.get("title", "Unknown Title"),
-            "relevant": "no" if is_irrelevant else "yes"
-        })
-    return pd.DataFrame(results)
+    Asks each of target_questions about one headline until one returns "yes".
+    Returns "no" (irrelevant) if any question returned "yes", otherwise "yes" (relevant).
 
+    With `folder`, the questions are asked in the order learned from that folder's
+    historical hit rates (src/question_order.py) and every answer is counted towards them.
+    """
+    if folder is not None:
+        target_questions = question_order.order_questions(folder, target_questions)
+    metrics.add("gpt_relevance", headlines=1)
+    for question in target_questions:
+        metrics.add("gpt_relevance", questions=1)
+        query = (
+            f'Forget all previous instructions. Answer the following question to the best of your ability: {question}. '
+            f'Please analyze the headline and respond ONLY as JSON in the format exactly like: '
+            f'{{ "answer": "yes" }} or {{ "answer": "no" }}. '
+            f'Here is the headline: {headline_text}'
+        )
+        try:
+            response_dict = fetch_variable_info(gpt_client, gpt_model, query, run_on_full_text, stage="gpt_relevance")
+            clean_answer = response_dict["answer"]
+        except StructuredOutputError as e:
+            print(f"Warning: Unusable answer from GPT ({e.reason}). Defaulting to 'no'.")
+            clean_answer = "no"
+        if folder is not None:
+            question_order.record_answer(folder, question, clean_answer == "yes")
+        if clean_answer == "yes":
+            print("Skipping article due to query: ", query)
+            return "no"
+    return "yes"
 
 def query_gpt_for_project_details(gpt_client, gpt_model, article_text, tech_list, domain):
     """
     Uses GPT to extract project details from the article text in two rounds.
     Returns a dictionary with all keys. Missing details are returned as empty strings.
+
+    Close to the run budget the article text is truncated and the numeric facts are
+    skipped (src/budget.py). Replies are constrained to the schemas in src/structured.py. An unusable core-details
+    reply raises StructuredOutputError (the caller records why the article has no details);
+    an unusable additional-details reply leaves those fields empty.
     """
 
-    def _parse_json_to_dict(raw: str, context: str) -> dict:
-        """Best-effort parse: handle code fences, list-wrapping, and non-dict outputs."""
-        try:
-            cleaned = raw.strip()
-            if cleaned.startswith("```json"):
-                cleaned = cleaned[len("```json"):].strip()
-            if cleaned.startswith("```"):
-                cleaned = cleaned[3:].strip()
-            if cleaned.endswith("```"):
-                cleaned = cleaned[:-3].strip()
-
-            parsed = json.loads(cleaned)
-
-            # If GPT gave a list, try to use the first dict element
-            if isinstance(parsed, list):
-                if parsed and isinstance(parsed[0], dict):
-                    return parsed[0]
-                else:
-                    logger.warning("JSON parsed as list but no dict element found (%s)", context)
-                    return {}
-            elif isinstance(parsed, dict):
-                return parsed
-            else:
-                logger.warning("JSON parsed as %s, expected dict (%s)", type(parsed), context)
-                return {}
-        except Exception as e:
-            logger.error("Failed to parse JSON for %s: %s\nRaw: %s", context, e, raw)
-            return {}
+    # close to the run budget, long articles are cut (see src/budget.py)
+    article_text = run_budget.truncate(article_text)
 
     entries = []
     for item in tech_list:
@@ -264,27 +483,18 @@ def query_gpt_for_project_details(gpt_client, gpt_model, article_text, tech_list
         {"role": "user", "content": core_prompt},
     ]
 
-    try:
-        response_core = gpt_client.chat.completions.create(
-            model=gpt_model,
-            temperature=0,
-            messages=msgs_core,
-        )
-        output_core = response_core.choices[0].message.content or ""
-    except Exception as e:
-        logger.error("Error calling GPT for core project details: %s", e)
-        output_core = ""
-
-    core_details = _parse_json_to_dict(output_core, context="core_details")
-
-    # Ensure required keys exist
-    for key in ["scale", "project_name", "timeline", "technology"]:
-        if not isinstance(core_details, dict):
-            core_details = {}
-        if key not in core_details or core_details[key] is None:
-            core_details[key] = ""
+    response_core = _create_completion(
+        gpt_client,
+        stage="gpt_core_details",
+        model=gpt_model,
+        temperature=0,
+        response_format=CORE_DETAILS.response_format(),
+        messages=msgs_core,
+    )
+    core_details = parse_reply(response_core, CORE_DETAILS, "gpt_core_details")
 
-    if any(core_details.get(k, "") for k in ["scale", "project_name", "timeline", "technology"]):
+    additional_details = {key: "" for key in ADDITIONAL_DETAILS.fields}
+    if any(core_details.get(k, "") for k in CORE_DETAILS.fields):
         additional_prompt = (
             "You are an assistant that extracts additional project details from text. Given the article text below, "
             "extract the following details if available, inferring when necessary:\n"
@@ -306,41 +516,90 @@ def query_gpt_for_project_details(gpt_client, gpt_model, article_text, tech_list
         ]
 
         try:
-            response_additional = gpt_client.chat.completions.create(
+            response_additional = _create_completion(
+                gpt_client,
+                stage="gpt_additional_details",
                 model=gpt_model,
                 temperature=0,
+                response_format=ADDITIONAL_DETAILS.response_format(),
                 messages=msgs_additional,
             )
-            output_additional = response_additional.choices[0].message.content or ""
+            additional_details = parse_reply(response_additional, ADDITIONAL_DETAILS, "gpt_additional_details")
+        except (CircuitOpenError, BudgetExceededError):
+            raise
         except Exception as e:
-            logger.error("Error calling GPT for additional project details: %s", e)
-            output_additional = ""
-
-        additional_details = _parse_json_to_dict(output_additional, context="additional_details")
-
-        if not isinstance(additional_details, dict):
-            additional_details = {}
-
-        for key in ["company", "projects mentioned", "partners", "continent", "country", "project_status"]:
-            if key not in additional_details or additional_details[key] is None:
-                additional_details[key] = ""
-    else:
-        additional_details = {
-            "company": "",
-            "projects mentioned": "",
-            "partners": "",
-            "continent": "",
-            "country": "",
-            "project_status": "",
-        }
+            logger.error("Error getting additional project details: %s", e)
 
     combined_details = {**core_details, **additional_details}
 
+    if run_budget.skip_numeric():
+        return combined_details
     try:
         num = extract_numeric_facts_with_quotes(gpt_client, gpt_model, article_text, domain=domain)
         combined_details.update(num)
+    except (CircuitOpenError, BudgetExceededError):
+        raise
     except Exception as e:
         logger.error("Numeric extraction error: %s", e)
 
     return combined_details
 
+def query_gpt_for_project_update(gpt_client, gpt_model, article_text, known, tech_list, domain):
+    """
+    Lighter extraction for an article matched to a project in the known-project index
+    (src/project_index.py): one call that checks the article is about that project and
+    updates its core and additional details, instead of the two detail rounds. Numeric
+    facts and their quotes always come from this article (left empty close to the run
+    budget), never from the index. Returns the same keys as query_gpt_for_project_details
+    plus the project's IDs, or None when the article is not about the known project.
+    """
+    from src.project_index import known_ids
+
+    article_text = run_budget.truncate(article_text)
+    fields = CORE_DETAILS.fields + ADDITIONAL_DETAILS.fields
+    record = {k: v for k, v in known.get("details", {}).items() if k in fields}
+    record.setdefault("project_name", known.get("project_name", ""))
+    record.setdefault("company", known.get("company", ""))
+    tech_names = [name for item in tech_list for name in (item.keys() if isinstance(item, dict) else [str(item)])]
+
+    prompt = (
+        "You are an assistant that updates the record of a known project from a new article.\n"
+        "Known record:\n" + json.dumps(record, ensure_ascii=False, indent=1) + "\n\n"
+        "First decide whether the article below is about this same project (same project and company, "
+        "not just a similar name): about_known_project is 'yes' or 'no'. If 'yes', using ONLY the article text, "
+        "return the project's current details. Keep a known value unless the article gives a newer or more "
+        "specific one, fill in details the record lacks, and return an empty string for anything neither gives.\n"
+        "- scale: one of 'pilot', 'demonstration', or 'full scale'\n"
+        "- timeline: the year to be online (skip if not explicitly stated)\n"
+        f"- technology: one or more of: {', '.join(tech_names)}\n"
+        "- projects mentioned: the number of projects mentioned (Multiple or one main one)\n"
+        f"- project_status: one of the following statuses: {', '.join(PROJECT_STATUS)}\n\n"
+        "Article text:\n\"\"\"\n" + article_text + "\n\"\"\""
+    )
+    msgs = [
+        {"role": "system", "content": "You are an assistant that keeps project records up to date."},
+        {"role": "user", "content": prompt},
+    ]
+    response = _create_completion(
+        gpt_client,
+        stage="gpt_project_update",
+        model=gpt_model,
+        temperature=0,
+        response_format=PROJECT_UPDATE.response_format(),
+        messages=msgs,
+    )
+    update = parse_reply(response, PROJECT_UPDATE, "gpt_project_update")
+    if update.pop("about_known_project") != "yes":
+        metrics.add("gpt_project_update", not_same_project=1)
+        return None
+
+    details = update
+    if not run_budget.skip_numeric():
+        try:
+            details.update(extract_numeric_facts_with_quotes(gpt_client, gpt_model, article_text, domain=domain))
+        except (CircuitOpenError, BudgetExceededError):
+            raise
+        except Exception as e:
+            logger.error("Numeric extraction error: %s", e)
+    details.update(known_ids(known))
+    return details
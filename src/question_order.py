@@ -0,0 +1,109 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+STATE_DIR = os.getenv("PIPELINE_STATE_DIR", ".pipeline_state")
+STATS_PATH = os.getenv("QUESTION_STATS_PATH", os.path.join(STATE_DIR, "question_stats.json"))
+
+# "learned": ask the exclusion questions in order of their historical hit rate; "source": as listed
+QUESTION_ORDER = os.getenv("QUESTION_ORDER", "learned").lower()
+# Beta prior on each question's hit rate (a 10% rate worth 5 observations), so questions
+# with little history neither jump to the front nor sink to the back
+PRIOR_HITS = 0.5
+PRIOR_ASKED = 5.0
+
+_lock = threading.Lock()
+_stats = None
+
+
+def _key(question: str) -> str:
+    return hashlib.sha1(question.encode("utf-8")).hexdigest()[:16]
+
+
+def _load():
+    global _stats
+    if _stats is None:
+        try:
+            with open(STATS_PATH, "r", encoding="utf-8") as f:
+                _stats = json.load(f)
+        except FileNotFoundError:
+            _stats = {}
+        except Exception as e:
+            logger.warning("Could not read question statistics from %s: %s", STATS_PATH, e)
+            _stats = {}
+    return _stats
+
+
+def _entry(folder: str, question: str) -> dict:
+    questions = _load().setdefault(folder, {})
+    entry = questions.get(_key(question))
+    if entry is None:
+        entry = {"question": question[:80], "asked": 0, "yes": 0}
+        questions[_key(question)] = entry
+    return entry
+
+
+def save_stats():
+    """Atomically writes the in-memory statistics to STATS_PATH."""
+    with _lock:
+        if _stats is None:
+            return
+        data = json.dumps(_stats, indent=1, sort_keys=True)
+    try:
+        os.makedirs(os.path.dirname(STATS_PATH) or ".", exist_ok=True)
+        tmp_path = f"{STATS_PATH}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, STATS_PATH)
+    except Exception as e:
+        logger.warning("Could not persist question statistics to %s: %s", STATS_PATH, e)
+
+
+def record_answer(folder: str, question: str, hit: bool):
+    """Counts one answer to `question` for a headline of `folder`; hit means it answered "yes" (exclude)."""
+    with _lock:
+        entry = _entry(folder, question)
+        entry["asked"] += 1
+        entry["yes"] += int(bool(hit))
+
+
+def hit_rates(folder: str, questions):
+    """Smoothed hit rate per question, in the order given."""
+    with _lock:
+        folder_stats = _load().get(folder, {})
+        rates = []
+        for q in questions:
+            entry = folder_stats.get(_key(q), {})
+            rates.append((entry.get("yes", 0) + PRIOR_HITS) / (entry.get("asked", 0) + PRIOR_ASKED))
+    return rates
+
+
+def order_questions(folder: str, questions):
+    """
+    Returns `questions` in the order to ask them. Asking stops at the first "yes", so with
+    equal cost per call the expected number of calls is smallest when the questions most
+    likely to hit come first. Ties (e.g. no history yet) keep the source order.
+
+    Hit rates are measured only when a question is actually asked, i.e. conditional on the
+    questions before it having answered "no"; the ordering is therefore greedy rather than
+    exactly optimal when questions overlap.
+    """
+    questions = list(questions)
+    if QUESTION_ORDER != "learned":
+        return questions
+    rates = hit_rates(folder, questions)
+    order = sorted(range(len(questions)), key=lambda i: -rates[i])
+    return [questions[i] for i in order]
+
+
+def expected_calls(rates):
+    """Expected calls per headline when asking in the order of `rates`, stopping at the first hit."""
+    total, reach = 0.0, 1.0
+    for p in rates:
+        total += reach
+        reach *= 1.0 - p
+    return total
@@ -0,0 +1,149 @@
+import os
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """
+    Token bucket shared by every thread that calls a rate-limited API.
+    Allows `rate_per_minute` calls per minute (with bursts up to `burst`)
+    and at most `max_concurrency` calls in flight at once.
+
+    Use as a context manager around each call:
+        with gpt_limiter:
+            client.chat.completions.create(...)
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int = None, max_concurrency: int = None):
+        self.rate = float(rate_per_minute) / 60.0
+        self.capacity = float(burst if burst is not None else max(1, int(self.rate * 10)))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+
+    def acquire(self):
+        if self._slots is not None:
+            self._slots.acquire()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def release(self):
+        if self._slots is not None:
+            self._slots.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised to a caller that stayed paused by an open circuit for longer than allowed."""
+
+
+class CircuitBreaker:
+    """
+    Pauses every caller of an API during an outage instead of letting each call fail.
+
+    After `failure_threshold` consecutive failures the circuit opens and wait() blocks for
+    the cooldown (doubled on every reopen, up to `max_cooldown_s`). Then a single probe call
+    is let through: its success closes the circuit and releases everyone, its failure
+    reopens it. A caller paused for longer than `max_pause_s` gets CircuitOpenError, so a
+    long outage ends the run (to be resumed from its checkpoint) rather than hanging it.
+
+        gpt_breaker.wait()
+        try:
+            call()
+        except RetryableError:
+            gpt_breaker.record_failure()
+        else:
+            gpt_breaker.record_success()
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, cooldown_s: float = 30.0,
+                 max_cooldown_s: float = 600.0, max_pause_s: float = 1800.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_cooldown_s = cooldown_s
+        self.max_cooldown_s = max_cooldown_s
+        self.max_pause_s = max_pause_s
+        self.state = "closed"
+        self._failures = 0
+        self._cooldown_s = cooldown_s
+        self._reopen_at = 0.0
+        self._probing = False
+        self._cond = threading.Condition()
+
+    def wait(self) -> float:
+        """Blocks while the circuit is open; returns the seconds spent paused."""
+        started = None
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if self.state == "open" and now >= self._reopen_at:
+                    self.state = "half_open"
+                    self._probing = False
+                if self.state == "closed" or (self.state == "half_open" and not self._probing):
+                    if self.state == "half_open":
+                        self._probing = True
+                    return 0.0 if started is None else now - started
+                if started is None:
+                    started = now
+                elif now - started > self.max_pause_s:
+                    raise CircuitOpenError(f"{self.name} circuit open for more than {self.max_pause_s:.0f}s")
+                until = self._reopen_at - now if self.state == "open" else 1.0
+                self._cond.wait(timeout=max(0.05, min(until, self.max_pause_s)))
+
+    def record_success(self):
+        with self._cond:
+            self._failures = 0
+            if self.state != "closed":
+                logger.warning("%s circuit closed; resuming calls.", self.name)
+                self.state = "closed"
+                self._cooldown_s = self.base_cooldown_s
+                self._probing = False
+                self._cond.notify_all()
+
+    def record_failure(self) -> bool:
+        """Counts a failed call; returns True when this failure opened the circuit."""
+        with self._cond:
+            self._failures += 1
+            if self.state == "half_open":
+                self._cooldown_s = min(self._cooldown_s * 2, self.max_cooldown_s)
+            elif self.state != "closed" or self._failures < self.failure_threshold:
+                return False
+            self.state = "open"
+            self._probing = False
+            self._reopen_at = time.monotonic() + self._cooldown_s
+            logger.warning("%s circuit open after %d consecutive failures; pausing calls for %.1fs.",
+                           self.name, self._failures, self._cooldown_s)
+            return True
+
+
+# Shared by all folder workers so concurrent folders stay inside the account's OpenAI limits
+gpt_limiter = RateLimiter(
+    rate_per_minute=float(os.getenv("GPT_MAX_RPM", 300)),
+    max_concurrency=int(os.getenv("GPT_MAX_CONCURRENCY", 6)),
+)
+
+# Shared by all folder workers so an OpenAI outage pauses every folder at once
+gpt_breaker = CircuitBreaker(
+    "OpenAI",
+    failure_threshold=int(os.getenv("GPT_BREAKER_FAILURES", 5)),
+    cooldown_s=float(os.getenv("GPT_BREAKER_COOLDOWN_S", 30)),
+    max_pause_s=float(os.getenv("GPT_BREAKER_MAX_PAUSE_S", 1800)),
+)
@@ -67,16 +67,23 @@ def parse_inoreader_feed(json_data):
     Returns:
         pd.DataFrame: DataFrame containing the extracted article information.
     """
+    return pd.DataFrame(parse_inoreader_items(json_data))
+
+def parse_inoreader_items(json_data):
+    """
+    Same as parse_inoreader_feed, but returns the list of article dicts without
+    building a DataFrame (see src/article.py ArticleBatch).
+    """
     if isinstance(json_data, str):
         try:
             json_data = json.loads(json_data)
         except json.JSONDecodeError:
             print("Error: Failed to decode JSON. Ensure it's properly formatted.")
-            return pd.DataFrame()
+            return []
 
     if not isinstance(json_data, list):
         print("Error: Invalid JSON structure. Expected a list of articles.")
-        return pd.DataFrame()
+        return []
 
     articles = []
     for item in json_data:
@@ -112,4 +119,4 @@ def parse_inoreader_feed(json_data):
         }
         articles.append(article_info)
 
-    return pd.DataFrame(articles)
+    return articles
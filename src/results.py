@@ -203,10 +203,32 @@
 
 from datetime import datetime
 import os
+import tempfile
 import pandas as pd
-from src.validation import get_check_results_flag
-import io
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from src.validation import get_check_results_flag, verify_quotes, format_quote_checks
 from src.onedrive import get_graph_api_token, upload_file_to_onedrive
+from src.metrics import metrics
+from src.profiling import profiled
+
+# Workbooks stay in memory up to this size, then spill to a temp file
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+# Adds a "Run Metrics" sheet (per-stage timings, tokens, bytes) to each workbook
+RUN_METRICS_SHEET = os.getenv("RUN_METRICS_SHEET", "0").lower() in ("1", "true", "yes")
+
+SIMPLE_COLS = ["title", "url"]
+ALL_ARTICLES_COLS = ["title", "url", "Discarded"]
+COMMON_COLS = [
+    "Internal ID", "Justification", "Project name", "Project scale",
+    "Planned commissioning year", "Technology to be used", "Company",
+    "Potential Partners", "Company type", "Project type",
+    "Company has climate goals?", "Production plant", "Updated GEM Plant ID",
+    "GEM wiki page link", "Latitude", "Longitude", "Coordinate accuracy",
+    "Continent", "Country", "Project status",
+    "References 1", "Reference Article", "Check Results",
+]
 
 def get_output_fname(folder, filetype="xlsx"):
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -248,34 +270,19 @@ def _pick_quote(article, singular_key, plural_key):
         return _join_vals(article[plural_key])
     return _join_vals(article.get(singular_key, ""))
 
-def output_results_excel(relevant_articles, irrelevant_articles, output_path, domain: str = "steel"):
-    """
-    Writes one workbook per domain with four sheets:
-      - Relevant Stage 1
-      - Relevant Stage 2
-      - Irrelevant
-      - All Articles
-    Only domain-appropriate columns are included in Stage 2.
-    """
-    domain = (domain or "steel").lower()
-
-    if isinstance(relevant_articles, pd.DataFrame):
-        relevant_articles = relevant_articles.to_dict("records")
-    if isinstance(irrelevant_articles, pd.DataFrame):
-        irrelevant_articles = irrelevant_articles.to_dict("records")
-
-    simple_cols = ["title", "url"]
-
-    common_cols = [
-        "Internal ID", "Justification", "Project name", "Project scale",
-        "Planned commissioning year", "Technology to be used", "Company",
-        "Potential Partners", "Company type", "Project type",
-        "Company has climate goals?", "Production plant", "Updated GEM Plant ID",
-        "GEM wiki page link", "Latitude", "Longitude", "Coordinate accuracy",
-        "Continent", "Country", "Project status",
-        "References 1", "Reference Article", "Check Results",
-    ]
+def _cell_value(v):
+    """Excel cell value: None for missing/NaN/empty, otherwise the value unchanged."""
+    if v is None or (isinstance(v, str) and v == ""):
+        return None
+    try:
+        if pd.isna(v):
+            return None
+    except (TypeError, ValueError):
+        pass
+    return v
 
+def detailed_columns(domain: str = "steel"):
+    """Stage 2 columns; only domain-appropriate numeric columns are included."""
     if domain == "cement":
         numeric_cols = [
             "Expected CO2 capture capacity (plain English)",
@@ -292,99 +299,174 @@ def output_results_excel(relevant_articles, irrelevant_articles, output_path, do
             "Iron production capacity (plain English)", "Iron quote(s)",
             "Steel production capacity (plain English)", "Steel quote(s)",
         ]
+    numeric_cols.append("Quote offsets")
+    return COMMON_COLS[:-3] + numeric_cols + COMMON_COLS[-3:]
 
-    detailed_cols = common_cols[:-3] + numeric_cols + common_cols[-3:]
+def _quote_keys(domain: str):
+    if domain == "cement":
+        return ["cc_quote", "investment_quote"]
+    return ["cc_quote", "h2_quote", "investment_quote", "iron_quote", "steel_quote"]
+
+def build_detailed_row(article, domain: str = "steel"):
+    """Maps one Stage 2 article dict onto the Stage 2 columns (as a dict)."""
+    row = {c: "" for c in detailed_columns(domain)}
+
+    # core fields
+    row["Project name"] = _as_text(article.get("project_name"))
+    row["Project scale"] = _as_text(article.get("scale"))
+    row["Planned commissioning year"] = _as_text(article.get("timeline"))
+    row["Technology to be used"] = _as_text(article.get("technology"))
+    row["Company"] = _as_text(article.get("company"))
+    row["Potential Partners"] = _as_text(article.get("partners"))
+    row["Continent"] = _as_text(article.get("continent"))
+    row["Country"] = _as_text(article.get("country"))
+    row["Project status"] = _as_text(article.get("project_status"))
+
+    # known-project IDs (src/project_index.py)
+    row["Internal ID"] = _as_text(article.get("internal_id"))
+    row["Updated GEM Plant ID"] = _as_text(article.get("gem_plant_id"))
+    row["GEM wiki page link"] = _as_text(article.get("gem_wiki_url"))
+
+    # references
+    row["Reference Article"] = _as_text(article.get("title"))
+    row["References 1"] = _as_text(article.get("url"))
+
+    # numeric facts (domain-aware)
+    row["Expected CO2 capture capacity (plain English)"] = _as_text(article.get("cc_capacity"))
+    row["Capture quote(s)"] = _as_text(article.get("cc_quote"))
+    row["Investment size (plain English)"] = _as_text(article.get("investment"))
+    row["Investment quote(s)"] = _as_text(article.get("investment_quote"))
+
+    if domain != "cement":
+        row["Hydrogen generation capacity (plain English)"] = _as_text(article.get("h2_capacity"))
+        row["Hydrogen quote(s)"] = _as_text(article.get("h2_quote"))
+        row["Iron production capacity (plain English)"] = _as_text(article.get("iron_capacity"))
+        row["Iron quote(s)"] = _as_text(article.get("iron_quote"))
+        row["Steel production capacity (plain English)"] = _as_text(article.get("steel_capacity"))
+        row["Steel quote(s)"] = _as_text(article.get("steel_quote"))
+
+    # fuzzy check (the checks read the text from the run's text store when they need it)
+    full_text = article.get("full_text")
+    if full_text:
+        core = {k: _as_text(article.get(k)) for k in ["project_name", "scale", "timeline", "technology"]}
+        flag, _ = get_check_results_flag(core, full_text)
+        row["Check Results"] = flag
+
+        # quotes must be verbatim: record where each one sits in the article text
+        quotes = {k: _as_text(article.get(k)) for k in _quote_keys(domain)}
+        row["Quote offsets"] = format_quote_checks(verify_quotes(quotes, full_text))
+    return row
+
+
+class ResultsWorkbook:
+    """
+    Streams one domain's results into a write-only openpyxl workbook as articles finish.
+    Produces the same four sheets as before:
+      - Relevant Stage 1
+      - Relevant Stage 2
+      - Irrelevant
+      - All Articles
+    Stage rows are written straight to the sheets, so the article dicts (and their
+    full text) can be dropped as soon as they are added. Only the short
+    (title, url, discarded) rows needed to order 'All Articles' are kept until save().
+    """
 
-    # filter newly irrelevant
-    newly_irrelevant, filtered_relevant = [], []
-    for art in relevant_articles:
-        if art.get("irrelevant"):
-            newly_irrelevant.append(art)
-        else:
-            filtered_relevant.append(art)
-    irrelevant_articles.extend(newly_irrelevant)
-
-    # split Stage 1 / Stage 2
-    stage1, stage2 = [], []
-    for art in filtered_relevant:
-        if _nonempty_text(art.get("company")) and _nonempty_text(art.get("project_name")):
-            stage2.append(art)
+    def __init__(self, domain: str = "steel"):
+        self.domain = (domain or "steel").lower()
+        self.detailed_cols = detailed_columns(self.domain)
+        self._wb = Workbook(write_only=True)
+        self._stage1 = self._add_sheet("Relevant Stage 1", SIMPLE_COLS)
+        self._stage2 = self._add_sheet("Relevant Stage 2", self.detailed_cols)
+        self._irrelevant = self._add_sheet("Irrelevant", SIMPLE_COLS)
+        self._all = self._add_sheet("All Articles", ALL_ARTICLES_COLS)
+        self._all_stage1, self._all_stage2, self._all_irrelevant = [], [], []
+        # relevant articles re-flagged as irrelevant go after the original irrelevant ones
+        self._late_irrelevant = []
+        self.counts = {"stage1": 0, "stage2": 0, "irrelevant": 0}
+
+    def _add_sheet(self, title, columns):
+        ws = self._wb.create_sheet(title)
+        header = []
+        for col in columns:
+            cell = WriteOnlyCell(ws, value=col)
+            cell.font = Font(bold=True)
+            header.append(cell)
+        ws.append(header)
+        return ws
+
+    @profiled("excel_rows")
+    def add_relevant(self, article):
+        """Adds an article that passed the headline screen to Stage 1 or Stage 2."""
+        if article.get("irrelevant"):
+            self._late_irrelevant.append((article.get("title"), article.get("url")))
+            return
+        title, url = article.get("title", ""), article.get("url", "")
+        if _nonempty_text(article.get("company")) and _nonempty_text(article.get("project_name")):
+            row = build_detailed_row(article, self.domain)
+            self._stage2.append([_cell_value(row[c]) for c in self.detailed_cols])
+            self._all_stage2.append((title, url, ""))
+            self.counts["stage2"] += 1
         else:
-            stage1.append(art)
-
-    df_stage1 = pd.DataFrame(stage1, columns=simple_cols)
-    df_irrelevant = pd.DataFrame(irrelevant_articles, columns=simple_cols)
-
-    def build_detailed_row(article):
-        row = {c: "" for c in detailed_cols}
-
-        # core fields
-        row["Project name"] = _as_text(article.get("project_name"))
-        row["Project scale"] = _as_text(article.get("scale"))
-        row["Planned commissioning year"] = _as_text(article.get("timeline"))
-        row["Technology to be used"] = _as_text(article.get("technology"))
-        row["Company"] = _as_text(article.get("company"))
-        row["Potential Partners"] = _as_text(article.get("partners"))
-        row["Continent"] = _as_text(article.get("continent"))
-        row["Country"] = _as_text(article.get("country"))
-        row["Project status"] = _as_text(article.get("project_status"))
-
-        # references
-        row["Reference Article"] = _as_text(article.get("title"))
-        row["References 1"] = _as_text(article.get("url"))
-
-        # numeric facts (domain-aware)
-        row["Expected CO2 capture capacity (plain English)"] = _as_text(article.get("cc_capacity"))
-        row["Capture quote(s)"] = _as_text(article.get("cc_quote"))
-        row["Investment size (plain English)"] = _as_text(article.get("investment"))
-        row["Investment quote(s)"] = _as_text(article.get("investment_quote"))
-
-        if domain != "cement":
-            row["Hydrogen generation capacity (plain English)"] = _as_text(article.get("h2_capacity"))
-            row["Hydrogen quote(s)"] = _as_text(article.get("h2_quote"))
-            row["Iron production capacity (plain English)"] = _as_text(article.get("iron_capacity"))
-            row["Iron quote(s)"] = _as_text(article.get("iron_quote"))
-            row["Steel production capacity (plain English)"] = _as_text(article.get("steel_capacity"))
-            row["Steel quote(s)"] = _as_text(article.get("steel_quote"))
-
-        # fuzzy check
-        full_text = article.get("full_text")
-        if _as_text(full_text):
-            core = {k: _as_text(article.get(k)) for k in ["project_name", "scale", "timeline", "technology"]}
-            flag, _ = get_check_results_flag(core, full_text)
-            row["Check Results"] = flag
-        return row
-
-
-    df_stage2 = pd.DataFrame([build_detailed_row(a) for a in stage2], columns=detailed_cols)
-
-    # All Articles sheet
-    all_art = []
-    for art in stage1:
-        discarded = "Discarded before Stage 2"
-        if art.get("discard_reason"):
-            discarded += f" ({art['discard_reason']})"
-        all_art.append({"title": art.get("title", ""), "url": art.get("url", ""), "Discarded": discarded})
-    for art in stage2:
-        all_art.append({"title": art.get("title", ""), "url": art.get("url", ""), "Discarded": ""})
+            self._stage1.append([_cell_value(article.get("title")), _cell_value(article.get("url"))])
+            discarded = "Discarded before Stage 2"
+            if article.get("discard_reason"):
+                discarded += f" ({article.get('discard_reason')})"
+            self._all_stage1.append((title, url, discarded))
+            self.counts["stage1"] += 1
+
+    def add_irrelevant(self, article):
+        self._irrelevant.append([_cell_value(article.get("title")), _cell_value(article.get("url"))])
+        self._all_irrelevant.append((article.get("title", ""), article.get("url", ""), "Discarded before Stage 1"))
+        self.counts["irrelevant"] += 1
+
+    def add_metrics_sheet(self, rows):
+        """Adds a 'Run Metrics' sheet; `rows` is a header row followed by value rows (see RunMetrics.sheet_rows)."""
+        if not rows:
+            return
+        ws = self._add_sheet("Run Metrics", rows[0])
+        for row in rows[1:]:
+            ws.append([_cell_value(v) for v in row])
+
+    @metrics.instrument("excel_write")
+    @profiled("excel_write")
+    def save(self):
+        """
+        Finishes the workbook and returns it as a binary file object positioned at 0
+        (in memory while small, spilled to disk beyond SPOOL_MAX_BYTES).
+        The workbook cannot be added to afterwards.
+        """
+        for title, url in self._late_irrelevant:
+            self.add_irrelevant({"title": title, "url": url})
+        self._late_irrelevant = []
+        for rows in (self._all_stage1, self._all_stage2, self._all_irrelevant):
+            for title, url, discarded in rows:
+                self._all.append([_cell_value(title), _cell_value(url), _cell_value(discarded)])
+        self._all_stage1, self._all_stage2, self._all_irrelevant = [], [], []
+
+        out = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+        self._wb.save(out)
+        metrics.add("excel_write", bytes=out.tell())
+        out.seek(0)
+        return out
+
+
+def write_results_workbook(relevant_articles, irrelevant_articles, domain: str = "steel"):
+    """Builds the four-sheet results workbook for one domain; returns a file object at position 0."""
+    if isinstance(relevant_articles, pd.DataFrame):
+        relevant_articles = relevant_articles.to_dict("records")
+    if isinstance(irrelevant_articles, pd.DataFrame):
+        irrelevant_articles = irrelevant_articles.to_dict("records")
+
+    workbook = ResultsWorkbook(domain)
     for art in irrelevant_articles:
-        all_art.append({"title": art.get("title", ""), "url": art.get("url", ""), "Discarded": "Discarded before Stage 1"})
-    df_all = pd.DataFrame(all_art, columns=["title", "url", "Discarded"])
-
-    buf = io.BytesIO()
-    with pd.ExcelWriter(buf, engine="openpyxl") as writer:
-        df_stage1.to_excel(writer, sheet_name="Relevant Stage 1", index=False)
-        df_stage2.to_excel(writer, sheet_name="Relevant Stage 2", index=False)
-        df_irrelevant.to_excel(writer, sheet_name="Irrelevant", index=False)
-        df_all.to_excel(writer, sheet_name="All Articles", index=False)
-    buf.seek(0)
-    file_bytes = buf.getvalue()
-
-    # os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
-    # with open(output_path, "wb") as f:
-    #     f.write(file_bytes)
-    # print(f"Results written to {output_path}")
+        workbook.add_irrelevant(art)
+    for art in relevant_articles:
+        workbook.add_relevant(art)
+    return workbook.save()
+
 
+def _onedrive_target():
+    """Returns (drive_id, parent_item_id, token) for the results folder, or raises RuntimeError."""
     tenant_id = os.getenv("OD_TENANT_ID")
     client_id = os.getenv("OD_CLIENT_ID")
     client_secret = os.getenv("OD_CLIENT_VALUE")
@@ -409,12 +491,38 @@ def output_results_excel(relevant_articles, irrelevant_articles, output_path, do
         msg = "Could not obtain Graph API token; skipping OneDrive upload."
         print(msg)
         raise RuntimeError(msg)
+    return drive_id, parent_item_id, token
+
+
+def _upload_name(output_path):
+    return output_path.replace("\\", "/").lstrip("/")
+
 
+def upload_results(workbook_file, output_path):
+    """Uploads a finished results workbook (file object or bytes) to the configured OneDrive folder."""
+    drive_id, parent_item_id, token = _onedrive_target()
+    upload_name = _upload_name(output_path)
     try:
-        upload_name = output_path.replace("\\", "/").lstrip("/")
-        upload_file_to_onedrive(file_bytes, drive_id, parent_item_id, upload_name, token)
-        print(f"Results uploaded to OneDrive as {upload_name}")
+        item = upload_file_to_onedrive(workbook_file, drive_id, parent_item_id, upload_name, token)
     except Exception as e:
-        msg = f"OneDrive upload failed: {e}"
+        item = None
+        print(f"OneDrive upload failed: {e}")
+    if not item:
+        msg = f"OneDrive upload failed for {upload_name}"
         print(msg)
-        raise RuntimeError(msg)
\ No newline at end of file
+        raise RuntimeError(msg)
+    print(f"Results uploaded to OneDrive as {upload_name}")
+
+
+def output_results_excel(relevant_articles, irrelevant_articles, output_path, domain: str = "steel"):
+    """
+    Writes one workbook per domain with four sheets:
+      - Relevant Stage 1
+      - Relevant Stage 2
+      - Irrelevant
+      - All Articles
+    Only domain-appropriate columns are included in Stage 2.
+    """
+    workbook_file = write_results_workbook(relevant_articles, irrelevant_articles, domain=domain)
+    with workbook_file:
+        upload_results(workbook_file, output_path)
@@ -0,0 +1,301 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+from src.metrics import metrics
+from src.query_gpt import _create_embeddings
+
+logger = logging.getLogger(__name__)
+
+STATE_DIR = os.getenv("PIPELINE_STATE_DIR", ".pipeline_state")
+
+# off: GPT screens every headline (no embeddings)
+# shadow: GPT screens every headline; local decisions are only compared against it (default)
+# on: confident local decisions replace the GPT screen, borderline headlines still go to GPT
+SCREEN_MODE = os.getenv("HEADLINE_SCREEN", "shadow").lower()
+# "openai" (embeddings API) or "local" (sentence-transformers on CPU, if installed)
+SCREEN_BACKEND = os.getenv("SCREEN_BACKEND", "openai").lower()
+EMBEDDING_MODEL = os.getenv("SCREEN_EMBEDDING_MODEL", "text-embedding-3-small")
+LOCAL_MODEL = os.getenv("SCREEN_LOCAL_MODEL", "all-MiniLM-L6-v2")
+EMBED_BATCH = 256
+
+# A headline is decided locally when an earlier GPT-screened headline of the same folder is
+# a near-duplicate of it (REPEAT_SIM, e.g. the same story syndicated again), or when at least
+# MIN_NEIGHBOURS of them are NEIGHBOUR_SIM-similar and their similarity-weighted verdicts
+# agree to AGREEMENT; failing that, when it is QUESTION_SIM-similar to an exclusion question
+REPEAT_SIM = float(os.getenv("SCREEN_REPEAT_SIM", 0.98))
+NEIGHBOURS = 7
+MIN_NEIGHBOURS = 3
+NEIGHBOUR_SIM = float(os.getenv("SCREEN_NEIGHBOUR_SIM", 0.85))
+AGREEMENT = float(os.getenv("SCREEN_AGREEMENT", 0.9))
+QUESTION_SIM = float(os.getenv("SCREEN_QUESTION_SIM", 0.75))
+# Share of confident local decisions that still go to GPT in "on" mode, to keep measuring agreement
+AUDIT_RATE = float(os.getenv("SCREEN_AUDIT_RATE", 0.1))
+# Most recent labelled headlines kept per folder
+MAX_LABELS = 20000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    model TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    vec BLOB NOT NULL,
+    PRIMARY KEY (model, text_hash)
+);
+CREATE TABLE IF NOT EXISTS labels (
+    folder TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    text TEXT NOT NULL,
+    verdict TEXT NOT NULL,
+    updated_at REAL,
+    PRIMARY KEY (folder, text_hash)
+);
+"""
+
+# verdict: "yes" (keep) / "no" (screened out) / None (borderline, ask GPT)
+Decision = namedtuple("Decision", ["verdict", "score", "reason"])
+BORDERLINE = Decision(None, 0.0, "borderline")
+
+
+def _hash(text):
+    return hashlib.sha256(text.encode("utf-8", "replace")).hexdigest()
+
+
+def _normalize(mat):
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (mat / norms).astype(np.float32)
+
+
+def _audited(text):
+    """Deterministic per headline, so a resumed run audits the same ones."""
+    return int(_hash(text)[:8], 16) / 0xFFFFFFFF < AUDIT_RATE
+
+
+class HeadlineScreen:
+    """
+    Embedding-based pre-screen for the headline relevance questions.
+
+    Headlines and the folder's exclusion questions are embedded in batches (embeddings
+    are cached on disk in .pipeline_state/screening.sqlite, keyed by model and text hash)
+    and compared with one matrix product each: against earlier headlines of the same
+    folder whose GPT verdict is known (kept in the same file, see record()) and against
+    the exclusion questions. Confident cases are decided locally; the rest are borderline
+    and go through the GPT question loop as before. Every GPT verdict is stored as a new
+    label and, when a local decision exists for it, counted as an agreement or disagreement
+    under the 'headline_screen' run metric.
+    """
+
+    def __init__(self, path=None, mode=SCREEN_MODE, backend=SCREEN_BACKEND):
+        self.path = path or os.path.join(STATE_DIR, "screening.sqlite")
+        self.mode = mode
+        self.backend = backend
+        self.model = EMBEDDING_MODEL if backend == "openai" else f"local:{LOCAL_MODEL}"
+        self._lock = threading.Lock()
+        self._db = None
+        self._local_model = None
+        self._disabled = False
+        self._recent = {}
+        self._labels = {}
+
+    @property
+    def enabled(self):
+        return self.mode in ("shadow", "on") and not self._disabled
+
+    def start_run(self):
+        """Drops per-run state; labels are reloaded from disk on first use."""
+        with self._lock:
+            self._recent = {}
+            self._labels = {}
+            self._disabled = False
+
+    # -------------------- storage --------------------
+    def _conn(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_SCHEMA)
+        return self._db
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._conn().execute(sql, params).fetchall()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    # -------------------- embeddings --------------------
+    def _embed_batch(self, gpt_client, texts):
+        if self.backend == "local":
+            if self._local_model is None:
+                from sentence_transformers import SentenceTransformer
+                self._local_model = SentenceTransformer(LOCAL_MODEL, device="cpu")
+            with metrics.timed("embeddings"):
+                return np.asarray(self._local_model.encode(texts, batch_size=EMBED_BATCH), dtype=np.float32)
+        response = _create_embeddings(gpt_client, stage="embeddings", model=self.model, input=texts)
+        return np.asarray([d.embedding for d in sorted(response.data, key=lambda d: d.index)], dtype=np.float32)
+
+    def embed(self, gpt_client, texts):
+        """Returns unit-length embeddings (one row per text), embedding only what is not cached."""
+        hashes = [_hash(t) for t in texts]
+        vecs = {}
+        with self._lock:
+            for h in hashes:
+                if h in self._recent:
+                    vecs[h] = self._recent[h]
+        missing = [h for h in dict.fromkeys(hashes) if h not in vecs]
+        for i in range(0, len(missing), 500):
+            chunk = missing[i:i + 500]
+            rows = self._execute(
+                f"SELECT text_hash, vec FROM embeddings WHERE model = ? AND text_hash IN ({','.join('?' * len(chunk))})",
+                (self.model, *chunk),
+            )
+            for h, blob in rows:
+                vecs[h] = np.frombuffer(blob, dtype=np.float32)
+
+        todo = {}
+        for h, t in zip(hashes, texts):
+            if h not in vecs:
+                todo.setdefault(h, t)
+        todo = list(todo.items())
+        for i in range(0, len(todo), EMBED_BATCH):
+            batch = todo[i:i + EMBED_BATCH]
+            mat = _normalize(self._embed_batch(gpt_client, [t for _, t in batch]))
+            with self._lock:
+                self._conn().executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, text_hash, vec) VALUES (?, ?, ?)",
+                    [(self.model, h, mat[j].tobytes()) for j, (h, _) in enumerate(batch)],
+                )
+            for j, (h, _) in enumerate(batch):
+                vecs[h] = mat[j]
+        if todo:
+            metrics.add("headline_screen", embedded=len(todo))
+
+        with self._lock:
+            for h in hashes:
+                self._recent[h] = vecs[h]
+        if not hashes:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.vstack([vecs[h] for h in hashes])
+
+    # -------------------- labels --------------------
+    def _folder_labels(self, gpt_client, folder):
+        """(matrix of labelled headline embeddings, bool array verdict == 'yes') for `folder`."""
+        with self._lock:
+            cached = self._labels.get(folder)
+        if cached is not None:
+            return cached
+        rows = self._execute(
+            "SELECT text, verdict FROM labels WHERE folder = ? ORDER BY updated_at DESC LIMIT ?", (folder, MAX_LABELS)
+        )
+        if rows:
+            mat = self.embed(gpt_client, [t for t, _ in rows])
+            labels = (mat, np.array([v == "yes" for _, v in rows]))
+        else:
+            labels = (np.zeros((0, 0), dtype=np.float32), np.zeros(0, dtype=bool))
+        with self._lock:
+            self._labels.setdefault(folder, labels)
+            return self._labels[folder]
+
+    def record(self, folder, text, verdict, decision=BORDERLINE):
+        """Stores the GPT verdict for `text` as a label and scores the local decision against it."""
+        if not self.enabled:
+            return
+        if decision.verdict is not None:
+            metrics.add("headline_screen", agree=int(decision.verdict == verdict),
+                        disagree=int(decision.verdict != verdict))
+        h = _hash(text)
+        self._execute(
+            "INSERT OR REPLACE INTO labels (folder, text_hash, text, verdict, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (folder, h, text, verdict, time.time()),
+        )
+        with self._lock:
+            vec = self._recent.get(h)
+            current = self._labels.get(folder)
+            if vec is not None and current is not None:
+                mat, yes = current
+                mat = vec[None, :] if mat.size == 0 else np.vstack([mat, vec])
+                self._labels[folder] = (mat, np.append(yes, verdict == "yes"))
+
+    # -------------------- decisions --------------------
+    def decide(self, gpt_client, folder, texts, questions):
+        """Returns one Decision per headline in `texts`."""
+        if not self.enabled or not texts:
+            return [BORDERLINE] * len(texts)
+        try:
+            with metrics.timed("headline_screen"):
+                heads = self.embed(gpt_client, texts)
+                qmat = self.embed(gpt_client, list(questions))
+                labels, yes = self._folder_labels(gpt_client, folder)
+                decisions = decide_matrix(heads, qmat, labels, yes)
+        except Exception as e:
+            logger.warning("Headline screening unavailable for this run, using GPT only: %s", e)
+            with self._lock:
+                self._disabled = True
+            return [BORDERLINE] * len(texts)
+        metrics.add("headline_screen", confident=sum(d.verdict is not None for d in decisions),
+                    borderline=sum(d.verdict is None for d in decisions))
+        return decisions
+
+    def use_local(self, decision, text):
+        """True when `decision` replaces the GPT screen for `text` (mode 'on', confident, not audited)."""
+        use = self.mode == "on" and decision.verdict is not None and not _audited(text)
+        if use:
+            metrics.add("headline_screen", local=1)
+        return use
+
+
+def decide_matrix(heads, qmat, labels, yes, exclude_self=False):
+    """
+    Vectorised decision rule for `heads` (n x d, unit rows) given exclusion question
+    embeddings `qmat` (m x d) and labelled headlines `labels` (k x d) with verdicts `yes`.
+    With `exclude_self`, heads[i] is labels[i] and is left out of its own neighbours
+    (leave-one-out evaluation).
+    """
+    n = heads.shape[0]
+    qmax = (heads @ qmat.T).max(axis=1) if qmat.size else np.zeros(n, dtype=np.float32)
+    frac = np.full(n, np.nan)
+    count = np.zeros(n, dtype=int)
+    best_sim = np.full(n, -1.0)
+    best_yes = np.zeros(n, dtype=bool)
+    if labels.size:
+        sims = heads @ labels.T
+        if exclude_self:
+            np.fill_diagonal(sims, -1.0)
+        k = min(NEIGHBOURS, sims.shape[1])
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        top_sims = np.take_along_axis(sims, top, axis=1)
+        best = top_sims.argmax(axis=1)
+        best_sim = top_sims[np.arange(n), best]
+        best_yes = yes[top[np.arange(n), best]]
+        weights = np.where(top_sims >= NEIGHBOUR_SIM, top_sims, 0.0)
+        count = (weights > 0).sum(axis=1)
+        total = weights.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            frac = (weights * yes[top]).sum(axis=1) / total
+
+    decisions = []
+    for i in range(n):
+        if best_sim[i] >= REPEAT_SIM:
+            decisions.append(Decision("yes" if best_yes[i] else "no", float(best_sim[i]), "repeat"))
+        elif count[i] >= MIN_NEIGHBOURS and frac[i] >= AGREEMENT:
+            decisions.append(Decision("yes", float(frac[i]), "neighbours"))
+        elif count[i] >= MIN_NEIGHBOURS and frac[i] <= 1 - AGREEMENT:
+            decisions.append(Decision("no", float(1 - frac[i]), "neighbours"))
+        elif qmax[i] >= QUESTION_SIM and not (count[i] and frac[i] >= 0.5):
+            decisions.append(Decision("no", float(qmax[i]), "question"))
+        else:
+            decisions.append(BORDERLINE)
+    return decisions
+
+
+headline_screen = HeadlineScreen()
@@ -0,0 +1,138 @@
+import re
+import json
+import logging
+
+from src.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+try:
+    # orjson parses the replies several times faster than json; optional
+    import orjson
+
+    def _loads(raw: str):
+        return orjson.loads(raw)
+except ImportError:
+    _loads = json.loads
+
+_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+class StructuredOutputError(ValueError):
+    """A GPT reply that does not parse as, or does not validate against, the expected schema."""
+
+    def __init__(self, schema: str, reason: str, raw: str):
+        super().__init__(f"{schema}: {reason}")
+        self.schema = schema
+        self.reason = reason
+        self.raw = raw
+
+
+class OutputSchema:
+    """
+    Expected reply of one call type: a flat JSON object with string fields, some of them
+    restricted to a set of values.
+
+    response_format() is the strict JSON-schema response format sent with the request, so
+    the API itself constrains the reply; parse() validates what came back and returns a
+    dict with exactly the schema's fields (None -> "", numbers and lists -> strings).
+    Code fences and list-wrapped objects are still unwrapped for models or endpoints that
+    ignore the response format.
+    """
+
+    def __init__(self, name: str, fields, enums=None):
+        self.name = name
+        self.fields = list(fields)
+        self.enums = dict(enums or {})
+
+    def response_format(self) -> dict:
+        properties = {}
+        for field in self.fields:
+            prop = {"type": "string"}
+            if field in self.enums:
+                prop["enum"] = list(self.enums[field])
+            properties[field] = prop
+        return {
+            "type": "json_schema",
+            "json_schema": {
+                "name": self.name,
+                "strict": True,
+                "schema": {
+                    "type": "object",
+                    "properties": properties,
+                    "required": list(self.fields),
+                    "additionalProperties": False,
+                },
+            },
+        }
+
+    def parse(self, raw: str) -> dict:
+        text = _FENCE_RE.sub("", (raw or "").strip())
+        if not text:
+            raise StructuredOutputError(self.name, "empty reply", raw)
+        try:
+            parsed = _loads(text)
+        except ValueError as e:
+            raise StructuredOutputError(self.name, f"invalid JSON ({e})", raw)
+        if isinstance(parsed, list) and parsed and isinstance(parsed[0], dict):
+            parsed = parsed[0]
+        if not isinstance(parsed, dict):
+            raise StructuredOutputError(self.name, f"expected an object, got {type(parsed).__name__}", raw)
+
+        data = {}
+        for field in self.fields:
+            value = parsed.get(field)
+            if value is None:
+                value = ""
+            elif isinstance(value, list):
+                value = ", ".join(str(v) for v in value if v is not None)
+            elif not isinstance(value, str):
+                value = str(value)
+            if field in self.enums:
+                value = value.strip().lower()
+                if value not in self.enums[field]:
+                    raise StructuredOutputError(self.name, f"{field}={value!r} not one of {self.enums[field]}", raw)
+            data[field] = value
+        return data
+
+
+def parse_reply(response, schema: OutputSchema, stage: str) -> dict:
+    """
+    Parses the first choice of a chat completion against `schema`. Every reply is counted on
+    `stage` as parsed or parse_failures, so the run metrics show the failure rate per call
+    type; failures (including refusals) are logged and raised as StructuredOutputError.
+    """
+    message = response.choices[0].message
+    refusal = getattr(message, "refusal", None)
+    try:
+        if refusal:
+            raise StructuredOutputError(schema.name, f"refused ({refusal})", "")
+        data = schema.parse(message.content)
+    except StructuredOutputError as e:
+        metrics.add(stage, parse_failures=1)
+        logger.warning("Unusable %s reply on %s: %s\nRaw: %.300s", schema.name, stage, e.reason, e.raw)
+        raise
+    metrics.add(stage, parsed=1)
+    return data
+
+
+YES_NO = OutputSchema("yes_no", ["answer"], enums={"answer": ["yes", "no"]})
+CORE_DETAILS = OutputSchema("core_details", ["scale", "project_name", "timeline", "technology"])
+ADDITIONAL_DETAILS = OutputSchema(
+    "additional_details",
+    ["company", "projects mentioned", "partners", "continent", "country", "project_status"],
+)
+PROJECT_UPDATE = OutputSchema(
+    "project_update",
+    ["about_known_project"] + CORE_DETAILS.fields + ADDITIONAL_DETAILS.fields,
+    enums={"about_known_project": ["yes", "no"]},
+)
+NUMERIC_FACTS_CEMENT = OutputSchema(
+    "numeric_facts_cement",
+    ["cc_capacity", "cc_quote", "investment", "investment_quote"],
+)
+NUMERIC_FACTS = OutputSchema(
+    "numeric_facts",
+    ["cc_capacity", "cc_quote", "h2_capacity", "h2_quote", "investment", "investment_quote",
+     "iron_capacity", "iron_quote", "steel_capacity", "steel_quote"],
+)
@@ -0,0 +1,170 @@
+import os
+import mmap
+import atexit
+import logging
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+STATE_DIR = os.getenv("PIPELINE_STATE_DIR", ".pipeline_state")
+
+
+class TextHandle:
+    """
+    Reference to one text in a TextStore: byte offset and length in the store file plus
+    the length in characters. Small enough to keep in caches and on Article records in
+    place of the text itself.
+    """
+
+    __slots__ = ("store", "offset", "nbytes", "nchars")
+
+    def __init__(self, store, offset, nbytes, nchars):
+        self.store = store
+        self.offset = offset
+        self.nbytes = nbytes
+        self.nchars = nchars
+
+    def __len__(self):
+        return self.nchars
+
+    def __repr__(self):
+        return f"TextHandle(offset={self.offset}, chars={self.nchars})"
+
+    def read(self, start=0, end=None):
+        """Returns the text, or the [start:end] slice of it (character offsets)."""
+        return self.store.read(self, start, end)
+
+
+class TextStore:
+    """
+    Run-scoped, append-only store for extracted article texts.
+
+    Texts are appended UTF-8 encoded to one file and read back through a read-only mmap of it,
+    so only the handles (offset, length) stay on the heap. The map is extended as the file
+    grows, and pages that were read are released again with madvise where available, so
+    resident memory does not grow with the number of stored articles. For ASCII texts,
+    slices are read directly at their byte offsets. Other texts are decoded in full and
+    then sliced.
+    """
+
+    def __init__(self, path=None, directory=None):
+        if path is None:
+            os.makedirs(directory or STATE_DIR, exist_ok=True)
+            fd, path = tempfile.mkstemp(prefix="texts_", suffix=".bin", dir=directory or STATE_DIR)
+            os.close(fd)
+        self.path = path
+        self._file = open(path, "w+b")
+        self._size = 0
+        self._map = None
+        self._lock = threading.Lock()
+
+    def put(self, text):
+        """Appends `text` and returns its TextHandle (None for empty text)."""
+        if not text:
+            return None
+        data = text.encode("utf-8")
+        with self._lock:
+            if self._file is None:
+                raise ValueError("text store is closed")
+            offset = self._size
+            self._file.write(data)
+            self._file.flush()
+            self._size += len(data)
+        return TextHandle(self, offset, len(data), len(text))
+
+    def read(self, handle, start=0, end=None):
+        end = handle.nchars if end is None else min(end, handle.nchars)
+        start = max(0, start)
+        if start >= end:
+            return ""
+        ascii_only = handle.nbytes == handle.nchars
+        lo, hi = (handle.offset + start, handle.offset + end) if ascii_only else \
+            (handle.offset, handle.offset + handle.nbytes)
+        with self._lock:
+            data = self._view()[lo:hi]
+            self._release_pages(lo, hi)
+        text = data.decode("utf-8")
+        return text if ascii_only else text[start:end]
+
+    def _view(self):
+        if self._file is None:
+            raise ValueError("text store is closed")
+        if self._map is None or len(self._map) < self._size:
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._file.fileno(), self._size, access=mmap.ACCESS_READ)
+        return self._map
+
+    def _release_pages(self, lo, hi):
+        if not hasattr(mmap, "MADV_DONTNEED"):
+            return
+        page = mmap.PAGESIZE
+        lo -= lo % page
+        try:
+            self._map.madvise(mmap.MADV_DONTNEED, lo, hi - lo)
+        except (OSError, ValueError):
+            pass
+
+    def size(self):
+        return self._size
+
+    def close(self, remove=True):
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        if remove:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+_store_lock = threading.Lock()
+_store = None
+
+
+def open_run_store(run_id):
+    """Starts a fresh store for run `run_id` (closing any previous one); returns it."""
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+        _store = TextStore(directory=os.path.join(STATE_DIR, "texts"))
+        logger.info("Text store for run %s at %s", run_id, _store.path)
+        return _store
+
+
+def close_run_store():
+    """Closes and deletes the current store; handles into it can no longer be read."""
+    global _store
+    with _store_lock:
+        store, _store = _store, None
+    if store is not None:
+        logger.info("Text store closed (%.2f MB spilled)", store.size() / 2 ** 20)
+        store.close()
+
+
+def put(text):
+    """Spills `text` to the current run's store (opened on demand) and returns its handle."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = TextStore(directory=os.path.join(STATE_DIR, "texts"))
+        store = _store
+    return store.put(text)
+
+
+# a store opened on demand outside run_pipeline (or by a late background fetch) is not left behind
+atexit.register(close_run_store)
+
+
+def read_text(value):
+    """Text behind a TextHandle; plain strings are returned as-is and None as ''."""
+    if isinstance(value, TextHandle):
+        return value.read()
+    return value or ""
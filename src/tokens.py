@@ -0,0 +1,125 @@
+import os
+import json
+import time
+import logging
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Tokens are refreshed once they are this close to expiring
+REFRESH_MARGIN_S = 300
+# Optional encrypted on-disk store (Fernet key from `Fernet.generate_key()`); memory-only when unset
+TOKEN_CACHE_PATH = os.getenv("TOKEN_CACHE_PATH", os.path.join(os.getenv("PIPELINE_STATE_DIR", ".pipeline_state"), "tokens.bin"))
+TOKEN_CACHE_KEY = os.getenv("TOKEN_CACHE_KEY")
+
+
+class TokenManager:
+    """
+    Caches auth tokens with their expiry so each one is requested once and reused
+    across folders, uploads and scheduled runs.
+
+    Tokens live in memory and, when a Fernet key is configured, in an encrypted file.
+    A token is refreshed proactively once it is within REFRESH_MARGIN_S of expiring;
+    if the refresh fails the old token is kept for as long as it is still valid.
+    """
+
+    def __init__(self, store_path=None, key=None):
+        self._lock = threading.Lock()
+        self._name_locks = {}
+        self._tokens = {}
+        self._fernet = None
+        self._store_path = store_path
+        if store_path and key:
+            try:
+                from cryptography.fernet import Fernet
+                self._fernet = Fernet(key.encode() if isinstance(key, str) else key)
+            except ImportError:
+                logger.warning("cryptography is not installed; token cache stays in memory only.")
+            except Exception as e:
+                logger.warning("Invalid TOKEN_CACHE_KEY (%s); token cache stays in memory only.", e)
+        self._load()
+
+    def _load(self):
+        if not self._fernet or not os.path.exists(self._store_path):
+            return
+        try:
+            with open(self._store_path, "rb") as f:
+                self._tokens = json.loads(self._fernet.decrypt(f.read()))
+        except Exception as e:
+            logger.warning("Could not read token cache %s: %s", self._store_path, e)
+            self._tokens = {}
+
+    def _persist(self):
+        if not self._fernet:
+            return
+        try:
+            os.makedirs(os.path.dirname(self._store_path) or ".", exist_ok=True)
+            payload = self._fernet.encrypt(json.dumps(self._tokens).encode())
+            tmp_path = f"{self._store_path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, self._store_path)
+        except Exception as e:
+            logger.warning("Could not write token cache %s: %s", self._store_path, e)
+
+    def _name_lock(self, name):
+        with self._lock:
+            return self._name_locks.setdefault(name, threading.Lock())
+
+    def peek(self, name):
+        """Returns the cached entry {"token", "expires_at"} for `name`, or None."""
+        with self._lock:
+            entry = self._tokens.get(name)
+            return dict(entry) if entry else None
+
+    def get(self, name, fetch):
+        """
+        Returns a valid token for `name`, calling `fetch()` only when there is no cached
+        token or it is about to expire. `fetch` returns (token, expires_in_seconds),
+        or (None, _) on failure.
+        """
+        # one refresh per name at a time; concurrent callers wait and reuse its result
+        with self._name_lock(name):
+            now = time.time()
+            entry = self.peek(name)
+            if entry and entry["expires_at"] - now > REFRESH_MARGIN_S:
+                return entry["token"]
+
+            try:
+                token, expires_in = fetch()
+            except Exception as e:
+                logger.error("Refreshing %s token failed: %s", name, e)
+                token, expires_in = None, 0
+            if not token:
+                if entry and entry["expires_at"] > now:
+                    logger.warning("Using cached %s token until it expires.", name)
+                    return entry["token"]
+                return None
+
+            with self._lock:
+                self._tokens[name] = {"token": token, "expires_at": now + float(expires_in)}
+                self._persist()
+            return token
+
+    def invalidate(self, name):
+        """Drops a token the server rejected so the next get() fetches a new one."""
+        with self._lock:
+            if self._tokens.pop(name, None) is not None:
+                self._persist()
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_token_manager() -> TokenManager:
+    """The process-wide TokenManager shared by the Inoreader and Graph clients."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = TokenManager(TOKEN_CACHE_PATH, TOKEN_CACHE_KEY)
+        return _manager
@@ -1,4 +1,8 @@
-from rapidfuzz import fuzz
+import re
+from array import array
+import numpy as np
+from rapidfuzz import fuzz, process
+from src.text_store import read_text
 STEEL_IRON_TECH = [
     "H-DRI (hydrogen direct reduced iron or sponge iron)",
     "CCS for BF-BOF (carbon capture storage for blast furnace)",
@@ -41,6 +45,15 @@ CEMENT_TECH = [
     "Kiln for calcined clay"
 ]
 
+# abbreviation (text before " (") -> full technology name, first entry wins
+TECH_BY_ABBR = {}
+for _tech in STEEL_IRON_TECH + CEMENT_TECH:
+    TECH_BY_ABBR.setdefault(_tech.split(" (")[0].strip().lower(), _tech)
+
+def normalize_article_text(article_text):
+    """Normalizes an article once so every field can be scored against the same string."""
+    return (article_text or "").lower()
+
 def check_detail_in_text_fuzzy(detail, article_text):
     """
     Returns the fuzzy matching score between detail and article_text.
@@ -50,33 +63,135 @@ def check_detail_in_text_fuzzy(detail, article_text):
     score = fuzz.partial_ratio(detail_norm, text_norm)
     return score
 
-def get_check_results_flag(extracted_details, article_text):
+def get_check_results_flag(extracted_details, article_text, normalized_text=None):
     """
     For each non-empty field in extracted_details, compute the fuzzy match score with article_text.
     For the 'technology' field, the full technology (with its descriptive text in parentheses) is used
     for matching if the abbreviation matches one of the full names in STEEL_IRON_TECH or CEMENT_TECH.
     If any score is below the threshold, return "CHECK RESULTS: " followed by the column names that flagged.
     Otherwise, return an empty string.
+
+    The article is normalized once (pass `normalized_text` to reuse an earlier normalization)
+    and all fields are scored in a single batched rapidfuzz pass. article_text may be a
+    TextHandle (src/text_store.py); it is only read when there is a field to check.
     """
     threshold = 80
-    scores = {}
-    flagged_columns = []
+    keys, details = [], []
     for key, value in extracted_details.items():
         if value.strip():
             detail_to_check = value
             # If this is the technology field, replace the abbreviation with the full technology name.
             if key.lower() == "technology":
-                all_techs = STEEL_IRON_TECH + CEMENT_TECH
-                for tech in all_techs:
-                    # Split on " (" to get the abbreviation part.
-                    abbr = tech.split(" (")[0].strip()
-                    if abbr.lower() == value.strip().lower():
-                        detail_to_check = tech
-                        break
-            score = check_detail_in_text_fuzzy(detail_to_check, article_text)
-            scores[key] = score
-            if score < threshold:
-                flagged_columns.append(key)
+                detail_to_check = TECH_BY_ABBR.get(value.strip().lower(), value)
+            keys.append(key)
+            details.append(detail_to_check.strip().lower())
+
+    scores = {}
+    if keys:
+        if normalized_text is None:
+            normalized_text = normalize_article_text(read_text(article_text))
+        matrix = process.cdist(details, [normalized_text], scorer=fuzz.partial_ratio,
+                               dtype=np.float64, workers=-1)
+        scores = {key: float(matrix[i, 0]) for i, key in enumerate(keys)}
+    flagged_columns = [key for key in keys if scores[key] < threshold]
     if flagged_columns:
         return "CHECK RESULTS: " + ", ".join(flagged_columns), scores
     return "", scores
+
+# -------------------- Quote verification --------------------
+QUOTE_FUZZY_THRESHOLD = 90
+_QUOTE_CHAR_MAP = str.maketrans({
+    "‘": "'", "’": "'", "‚": "'", "′": "'",
+    "“": '"', "”": '"', "„": '"', "″": '"',
+    "‐": "-", "‑": "-", "‒": "-", "–": "-", "—": "-", "−": "-",
+})
+_WS_RUN = re.compile(r"\s+")
+
+def normalize_quote_text(text):
+    """Lowercase, unify quote/dash variants and collapse whitespace runs to one space."""
+    return _WS_RUN.sub(" ", (text or "").translate(_QUOTE_CHAR_MAP).lower()).strip()
+
+def build_text_index(article_text):
+    """
+    Builds a normalized view of article_text (see normalize_quote_text) together with an
+    offset map from every normalized character back to its position in the original text.
+    Built in one linear pass; quotes are then located with plain substring search.
+    """
+    text = (article_text or "").translate(_QUOTE_CHAR_MAP)
+    parts = []
+    offsets = array("L")
+    pos = 0
+    for m in _WS_RUN.finditer(text):
+        _append_segment(text, pos, m.start(), parts, offsets)
+        parts.append(" ")
+        offsets.append(m.start())
+        pos = m.end()
+    _append_segment(text, pos, len(text), parts, offsets)
+    return {"norm": "".join(parts), "offsets": offsets, "length": len(text)}
+
+def _append_segment(text, start, end, parts, offsets):
+    if start >= end:
+        return
+    seg = text[start:end]
+    low = seg.lower()
+    parts.append(low)
+    if len(low) == len(seg):
+        offsets.extend(range(start, end))
+    else:
+        # a few characters lowercase to more than one character (e.g. 'İ')
+        for i, ch in enumerate(seg):
+            offsets.extend([start + i] * len(ch.lower()))
+
+def _to_original_span(index, norm_start, norm_end):
+    offsets = index["offsets"]
+    if norm_end <= norm_start or norm_start >= len(offsets):
+        return None, None
+    return offsets[norm_start], offsets[min(norm_end, len(offsets)) - 1] + 1
+
+def verify_quote(index, quote):
+    """
+    Locates quote in an index from build_text_index.
+    Returns {"status": "exact" | "fuzzy" | "missing", "start", "end", "score"} where
+    start/end are character offsets into the original article text (None when missing).
+    Exact normalized substring matches are tried first; fuzzy alignment only runs on misses.
+    """
+    q = normalize_quote_text(quote)
+    if not q:
+        return {"status": "missing", "start": None, "end": None, "score": 0.0}
+    norm = index["norm"]
+    pos = norm.find(q)
+    if pos >= 0:
+        start, end = _to_original_span(index, pos, pos + len(q))
+        return {"status": "exact", "start": start, "end": end, "score": 100.0}
+    aln = fuzz.partial_ratio_alignment(q, norm, score_cutoff=QUOTE_FUZZY_THRESHOLD)
+    if aln is None:
+        return {"status": "missing", "start": None, "end": None, "score": 0.0}
+    start, end = _to_original_span(index, aln.dest_start, aln.dest_end)
+    return {"status": "fuzzy", "start": start, "end": end, "score": round(aln.score, 1)}
+
+def verify_quotes(quotes, article_text, index=None):
+    """
+    Verifies every non-empty quote in `quotes` ({field: quote}) against article_text
+    (a string or TextHandle, read only when there is a quote to check), building the text
+    index once. Returns {field: verify_quote result}.
+    """
+    results = {}
+    for key, quote in quotes.items():
+        if not (quote or "").strip():
+            continue
+        if index is None:
+            index = build_text_index(read_text(article_text))
+        results[key] = verify_quote(index, quote)
+    return results
+
+def format_quote_checks(results):
+    """Renders verify_quotes output for the Stage 2 sheet, e.g. 'cc_quote: exact [120:187]'."""
+    parts = []
+    for key, res in results.items():
+        if res["status"] == "missing":
+            parts.append(f"{key}: NOT FOUND")
+        elif res["status"] == "fuzzy":
+            parts.append(f"{key}: fuzzy {res['score']:g} [{res['start']}:{res['end']}]")
+        else:
+            parts.append(f"{key}: exact [{res['start']}:{res['end']}]")
+    return "; ".join(parts)